@@ -0,0 +1,50 @@
+"""trigram name indexes
+
+Revision ID: 091e849dc2eb
+Revises: db7f9caeaeef
+Create Date: 2026-10-17 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '091e849dc2eb'
+down_revision: Union[str, Sequence[str], None] = 'db7f9caeaeef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, column), databases created before these were declared on the models do not have them
+TRGM_INDEXES = [
+    ("trgm_pool_name_idx", "pool", "name"),
+    ("trgm_sample_name_idx", "sample", "name"),
+    ("trgm_project_identifier_idx", "project", "identifier"),
+    ("trgm_project_title_idx", "project", "title"),
+    ("trgm_seq_request_name_idx", "seq_request", "name"),
+    ("trgm_experiment_name_idx", "experiment", "name"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # built concurrently, outside of the migration transaction, so searches and writes are not blocked
+    with op.get_context().autocommit_block():
+        for name, table, column in TRGM_INDEXES:
+            op.create_index(
+                name, table, [sa.literal_column(f'lower({column}) gin_trgm_ops')], unique=False,
+                postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the other indexes are part of the models before this revision
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'trgm_sample_name_idx', table_name='sample', postgresql_using='gin', postgresql_concurrently=True,
+            if_exists=True
+        )
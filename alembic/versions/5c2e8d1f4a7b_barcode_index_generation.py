@@ -0,0 +1,28 @@
+"""barcode index generation
+
+Revision ID: 5c2e8d1f4a7b
+Revises: 091e849dc2eb
+Create Date: 2026-10-17 14:02:17.318942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8d1f4a7b'
+down_revision: Union[str, Sequence[str], None] = '091e849dc2eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('barcode_index_generation'), if_not_exists=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.DropSequence(sa.Sequence('barcode_index_generation'), if_exists=True))
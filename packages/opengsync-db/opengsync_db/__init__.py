@@ -42,6 +42,8 @@ def to_utc(timestamp: dt.datetime) -> dt.datetime:
 from . import categories
 from .core.DBHandler import DBHandler  
 from .core.DBSession import DBSession  
+from .core.EngineRegistry import PoolConfig  
+from .core.ReplicaRouter import ReadPolicy  
 from .core import exceptions  
 
 
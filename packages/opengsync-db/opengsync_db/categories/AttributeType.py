@@ -22,8 +22,7 @@ class AttributeType(ExtendedEnum):
     @classmethod
     def get_attribute_by_label(cls, label: str) -> "AttributeType":
         label = label.lower().strip().replace(" ", "_")
-        for attribute in cls.as_list():
-            if attribute.label == label:
-                return attribute
+        if (attribute := cls.from_label(label)) is not None:
+            return attribute
             
         return cls.CUSTOM
\ No newline at end of file
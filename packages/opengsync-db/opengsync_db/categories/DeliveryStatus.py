@@ -14,6 +14,7 @@ class DeliveryStatus(ExtendedEnum):
     
     PENDING = DeliveryStatusEnum(0, "Pending", "🕒")
     DISPATCHED = DeliveryStatusEnum(1, "Dispatched", "📬")
+    FAILED = DeliveryStatusEnum(2, "Failed", "⚠️")
 
     @property
     def display_name(self) -> str:
@@ -1,11 +1,37 @@
 import enum
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass, fields
-from typing import Any, TypeVar
+from typing import Any, TypeVar, Mapping
 T = TypeVar("T", bound="ExtendedEnum")
+
+
+class ExtendedEnumType(enum.EnumType):
+    """ Builds the frozen id/label/abbreviation lookup tables once per enum class. """
+    def __new__(metacls, cls, bases, classdict, **kwargs):
+        enum_cls = super().__new__(metacls, cls, bases, classdict, **kwargs)
+        members = list(enum_cls)
+        enum_cls._lookup_ids = MappingProxyType({item.id: item for item in members})
+        enum_cls._lookup_labels = MappingProxyType({
+            item.label: item for item in reversed(members) if isinstance(getattr(item, "label", None), str)
+        })
+        enum_cls._lookup_abbreviations = MappingProxyType({
+            item.abbreviation: item for item in reversed(members) if isinstance(getattr(item, "abbreviation", None), str)
+        })
+        # members in id order, used for vectorized (index based) lookups
+        enum_cls._lookup_index = pd.Index([item.id for item in members], dtype="int64")
+        enum_cls._lookup_members = np.array(members + [None], dtype=object)
+        return enum_cls
+
     
-class ExtendedEnum(enum.IntEnum):
+class ExtendedEnum(enum.IntEnum, metaclass=ExtendedEnumType):
     id: int
+    _lookup_ids: Mapping[int, Any]
+    _lookup_labels: Mapping[str, Any]
+    _lookup_abbreviations: Mapping[str, Any]
+    _lookup_index: pd.Index
+    _lookup_members: np.ndarray
     
     def __new__(cls, data: Any):
         dataclass_fields = fields(data)
@@ -28,14 +54,28 @@ class ExtendedEnum(enum.IntEnum):
 
     @classmethod
     def _missing_(cls, value):
-        return cls.as_dict().get(value)  # type: ignore
+        return cls._lookup_ids.get(value)
     
     def __reduce_ex__(self, protocol):
         return int, (self._value_,)
 
     @classmethod
-    def to_categorical(cls, series: pd.Series) -> pd.Series:
-        return pd.Categorical(series, categories=list(cls), ordered=True)  # type: ignore
+    def _lookup_codes(cls, series: pd.Series) -> np.ndarray:
+        """ positions of the ids in the lookup table, -1 for missing or unknown values """
+        values = series.to_numpy(dtype=object, na_value=np.nan)
+        codes = np.full(len(values), -1, dtype=np.intp)
+        if (mask := pd.notna(values)).any():
+            codes[mask] = cls._lookup_index.get_indexer(pd.Index(values[mask], dtype=object))
+        return codes
+
+    @classmethod
+    def to_categorical(cls, series: pd.Series) -> pd.Categorical:
+        """ ordered categorical with the enum members as categories, backed by integer codes """
+        return pd.Categorical.from_codes(
+            cls._lookup_codes(series),
+            categories=pd.Index(cls._lookup_members[:-1], dtype=object),
+            ordered=True
+        )
 
     def __str__(self) -> str:
         return f"{self.__class__.__name__}[{self.name}]"
@@ -83,7 +123,7 @@ class ExtendedEnum(enum.IntEnum):
 
     @classmethod
     def as_dict(cls: type[T]) -> dict[int, T]:
-        return {item.id: item for item in cls}
+        return dict(cls._lookup_ids)
 
     @classmethod
     def as_tuples(cls: type[T]) -> list[tuple[int, T]]:
@@ -102,25 +142,36 @@ class ExtendedEnum(enum.IntEnum):
         if isinstance(value, cls):
             return value
         if isinstance(value, int):
-            member = cls._missing_(value)
+            member = cls._lookup_ids.get(value)
             if member is not None:
                 return member
         if isinstance(value, float):
             try:
                 int_value = int(value)
-                member = cls._missing_(int_value)
+                member = cls._lookup_ids.get(int_value)
                 if member is not None:
                     return member
             except ValueError:
                 pass
         raise ValueError(f"{value} is not a valid {cls.__name__}")
     
+    @classmethod
+    def from_label(cls: type[T], label: str) -> T | None:
+        return cls._lookup_labels.get(label)
+    
+    @classmethod
+    def from_abbreviation(cls: type[T], abbreviation: str) -> T | None:
+        return cls._lookup_abbreviations.get(abbreviation)
+    
     def __hash__(self):
         return hash(self.id)
     
     @classmethod
     def map_series(cls: type[T], series: pd.Series, na_action: str | None = "ignore") -> pd.Series:
-        return pd.Series([cls.get(val) if pd.notna(val) else None for val in series], dtype="object") if na_action == "ignore" else pd.Series([cls.get(val) for val in series], dtype="object")
+        codes = cls._lookup_codes(series)
+        if (invalid := (codes == -1) & (series.notna().to_numpy() | (na_action != "ignore"))).any():
+            raise ValueError(f"{series[invalid].iloc[0]} is not a valid {cls.__name__}")
+        return pd.Series(cls._lookup_members[codes], index=series.index, dtype="object")
         
 
 @dataclass(frozen=True)
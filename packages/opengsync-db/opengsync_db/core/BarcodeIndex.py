@@ -0,0 +1,264 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from .. import models
+from ..models.Base import Base
+from . import listeners
+
+if TYPE_CHECKING:
+    from .DBHandler import DBHandler
+
+_BASE_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    _BASE_CODES[ord(_base)] = _code
+
+_BASES_PER_WORD = 32
+_LOW_BITS = np.uint64(0x5555555555555555)
+_INVALIDATING_TABLES = {
+    models.Barcode.__tablename__, models.IndexKit.__tablename__,
+    models.Kit.__tablename__, models.Adapter.__tablename__
+}
+# generation counter shared by all processes, advanced after every commit writing one of the invalidating tables
+GENERATION = sa.Sequence("barcode_index_generation", metadata=Base.metadata)
+
+
+def _encode(sequence: str) -> np.ndarray:
+    return _BASE_CODES[np.frombuffer(sequence.upper().encode("ascii", errors="replace"), dtype=np.uint8)]
+
+
+def _pack(codes: list[np.ndarray], num_words: int) -> np.ndarray:
+    """ packs 2-bit base codes into (n, num_words) uint64, base i at bits 2*(i % 32) of word i // 32 """
+    padded = np.zeros((len(codes), num_words * _BASES_PER_WORD), dtype=np.uint64)
+    for i, c in enumerate(codes):
+        padded[i, :len(c)] = c
+    shifts = (2 * np.arange(_BASES_PER_WORD, dtype=np.uint64))
+    padded = padded.reshape(len(codes), num_words, _BASES_PER_WORD) << shifts
+    return np.bitwise_or.reduce(padded, axis=2)
+
+
+def _prefix_masks(lengths: np.ndarray, num_words: int) -> np.ndarray:
+    """ per-row masks of the low bit of every 2-bit base within the first `lengths` bases """
+    n = np.clip(lengths[:, None] - _BASES_PER_WORD * np.arange(num_words)[None, :], 0, _BASES_PER_WORD).astype(np.uint64)
+    full = n == _BASES_PER_WORD
+    masks = (np.left_shift(np.uint64(1), 2 * np.where(full, 0, n)) - np.uint64(1)) & _LOW_BITS
+    masks[full] = _LOW_BITS
+    return masks
+
+
+def hamming_distance(str1: str, str2: str) -> int:
+    min_length = min(len(str1), len(str2))
+    distance = sum(c1 != c2 for c1, c2 in zip(str1[:min_length], str2[:min_length]))
+    distance += abs(len(str1) - len(str2))
+    return distance
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    barcodes: pd.DataFrame
+    lengths: np.ndarray
+    packed: np.ndarray
+    regular: np.ndarray                                     # rows with only ACGT, searchable via `packed`
+    irregular: np.ndarray                                   # rows with other characters, compared as strings
+    kmers: dict[tuple[int, int, bytes], np.ndarray]         # (length, position, k-mer) -> regular rows
+    kits: dict[tuple[int, str], frozenset[int]]             # (barcode type, sequence) -> index kit ids
+    kit_info: pd.DataFrame
+    loaded_at: float
+    generation: int | None
+
+
+class BarcodeIndex:
+    """ Process-local in-memory index of all index kit barcodes for hamming-distance search and kit matching.
+    Rebuilt lazily after a commit of this process touches barcodes or index kits, when the shared generation
+    counter advanced (commits of other processes, checked every `check_interval_seconds`), or after
+    `max_age_seconds` (writes bypassing the ORM). """
+    KMER_SIZE = 4
+
+    def __init__(self, db: "DBHandler", max_age_seconds: int = 10 * 60, check_interval_seconds: float = 5.0):
+        self.db = db
+        self.max_age_seconds = max_age_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._snapshot: _Snapshot | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        listeners.register_commit_hook(self._on_commit)
+
+    def _on_commit(self, tags: set[str]) -> None:
+        if any(tag.split(":", 1)[0] in _INVALIDATING_TABLES for tag in tags):
+            self.invalidate()
+            self._publish()
+
+    def _publish(self) -> None:
+        """ advances the generation after the commit, so other processes cannot rebuild before the data is visible """
+        # hooks are process wide, a closed handler sees the commits of other handlers
+        if self.db._engine is None:
+            return
+        try:
+            with self.db._engine.begin() as conn:
+                conn.execute(sa.select(GENERATION.next_value()))
+        except sa.exc.DBAPIError as e:
+            self.db.warn(f"Could not advance barcode index generation: {e}")
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    def _generation(self) -> int | None:
+        """ current value of the shared generation counter, None if it is not available """
+        try:
+            with self.db._engine.connect() as conn:
+                # last_value is the start value until the first nextval()
+                row = conn.execute(sa.text(f"SELECT last_value, is_called FROM {GENERATION.name}")).one()
+                return row.last_value if row.is_called else 0
+        except sa.exc.DBAPIError as e:
+            self.db.warn(f"Barcode index generation not available: {e}")
+            return None
+
+    def _is_current(self, snapshot: _Snapshot | None) -> bool:
+        if snapshot is None or time.monotonic() - snapshot.loaded_at >= self.max_age_seconds:
+            return False
+        if time.monotonic() - self._checked_at < self.check_interval_seconds:
+            return True
+        self._checked_at = time.monotonic()
+        return snapshot.generation is None or self._generation() == snapshot.generation
+
+    @property
+    def snapshot(self) -> _Snapshot:
+        now = time.monotonic()
+        if (snapshot := self._snapshot) is not None and now - snapshot.loaded_at < self.max_age_seconds and now - self._checked_at < self.check_interval_seconds:
+            return snapshot
+
+        with self._lock:
+            if not self._is_current(snapshot := self._snapshot):
+                snapshot = self._snapshot = self._load()
+        return snapshot
+
+    def _load(self) -> _Snapshot:
+        query = sa.select(
+            models.Barcode.id.label("id"), models.Barcode.sequence.label("sequence"),
+            models.Barcode.well.label("well"), models.Barcode.name.label("name"),
+            models.Barcode.type_id.label("type_id"),
+            models.IndexKit.id.label("kit_id"), models.IndexKit.name.label("kit_name"),
+            models.IndexKit.identifier.label("kit_identifier"),
+            models.IndexKit.type_id.label("kit_type_id"),
+        ).join(
+            models.IndexKit,
+            models.IndexKit.id == models.Barcode.index_kit_id
+        ).order_by(models.Barcode.id)
+
+        # read before the barcodes, a write in between causes another rebuild instead of being missed
+        generation = self._generation()
+        loaded_at = time.monotonic()
+        self._checked_at = loaded_at
+        barcodes = pd.read_sql(query, self.db._engine)
+
+        codes = [_encode(seq) for seq in barcodes["sequence"]]
+        lengths = np.array([len(c) for c in codes], dtype=np.int64)
+        is_regular = np.array([bool((c != 255).all()) for c in codes], dtype=bool)
+        num_words = max(1, -(-int(lengths.max(initial=0)) // _BASES_PER_WORD))
+        packed = _pack([c if r else np.zeros(0, dtype=np.uint8) for c, r in zip(codes, is_regular)], num_words)
+
+        kmers: dict[tuple[int, int, bytes], list[int]] = {}
+        for row in np.flatnonzero(is_regular):
+            c = codes[row]
+            for pos in range(0, len(c) - self.KMER_SIZE + 1, self.KMER_SIZE):
+                kmers.setdefault((len(c), pos, c[pos:pos + self.KMER_SIZE].tobytes()), []).append(row)
+
+        kits: dict[tuple[int, str], set[int]] = {}
+        for type_id, sequence, kit_id in zip(barcodes["type_id"], barcodes["sequence"], barcodes["kit_id"]):
+            kits.setdefault((int(type_id), sequence), set()).add(int(kit_id))
+
+        kit_info = barcodes[["kit_id", "kit_name", "kit_identifier", "kit_type_id"]].drop_duplicates("kit_id").set_index("kit_id")
+
+        return _Snapshot(
+            barcodes=barcodes, lengths=lengths, packed=packed,
+            regular=np.flatnonzero(is_regular), irregular=np.flatnonzero(~is_regular),
+            kmers={key: np.array(rows, dtype=np.int64) for key, rows in kmers.items()},
+            kits={key: frozenset(kit_ids) for key, kit_ids in kits.items()},
+            kit_info=kit_info, loaded_at=loaded_at, generation=generation,
+        )
+
+    def _candidates(self, snapshot: _Snapshot, codes: np.ndarray, max_distance: int | None) -> np.ndarray:
+        """ regular rows that can be within max_distance of the query (pigeonhole over the query k-mers) """
+        num_kmers = len(codes) // self.KMER_SIZE
+        if max_distance is None or max_distance >= num_kmers or (codes == 255).any():
+            return snapshot.regular
+
+        # same length: max_distance mismatches can destroy at most max_distance of the query k-mers
+        rows = [
+            snapshot.kmers.get((len(codes), pos, codes[pos:pos + self.KMER_SIZE].tobytes()), np.zeros(0, dtype=np.int64))
+            for pos in range(0, num_kmers * self.KMER_SIZE, self.KMER_SIZE)
+        ]
+        # other lengths: length difference counts towards the distance
+        other_lengths = snapshot.regular[
+            (snapshot.lengths[snapshot.regular] != len(codes)) &
+            (np.abs(snapshot.lengths[snapshot.regular] - len(codes)) <= max_distance)
+        ]
+        return np.unique(np.concatenate(rows + [other_lengths]))
+
+    def distances(self, sequence: str, max_distance: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """ returns (rows, hamming distances) of the barcodes within max_distance of sequence (all if None) """
+        return self._distances(self.snapshot, sequence, max_distance)
+
+    def _distances(self, snapshot: _Snapshot, sequence: str, max_distance: int | None) -> tuple[np.ndarray, np.ndarray]:
+        """ rows index `snapshot`, callers that read the snapshot themselves must pass the same one """
+        codes = _encode(sequence)
+        num_words = snapshot.packed.shape[1]
+
+        rows = self._candidates(snapshot, codes, max_distance)
+        query_valid = codes != 255
+        query = _pack([np.where(query_valid, codes, 0)[:num_words * _BASES_PER_WORD]], num_words)[0]
+
+        lengths = snapshot.lengths[rows]
+        shared = np.minimum(lengths, len(codes))
+        masks = _prefix_masks(shared, num_words)
+        # bases that are not ACGT in the query mismatch every regular barcode
+        invalid_positions = np.flatnonzero(~query_valid)
+        invalid_mask = _pack([np.where(query_valid, 0, 1).astype(np.uint8)[:num_words * _BASES_PER_WORD]], num_words)[0]
+
+        diff = snapshot.packed[rows] ^ query
+        diff = (diff | (diff >> np.uint64(1))) & masks & ~invalid_mask
+        dists = np.bitwise_count(diff).sum(axis=1).astype(np.int64)
+        dists += np.searchsorted(invalid_positions, shared)
+        dists += np.abs(lengths - len(codes))
+
+        if len(snapshot.irregular) > 0:
+            rows = np.concatenate([rows, snapshot.irregular])
+            dists = np.concatenate([dists, np.array([
+                hamming_distance(seq, sequence) for seq in snapshot.barcodes["sequence"].values[snapshot.irregular]
+            ], dtype=np.int64)])
+
+        if max_distance is not None:
+            keep = dists <= max_distance
+            rows, dists = rows[keep], dists[keep]
+
+        return rows, dists
+
+    def query(self, sequence: str, limit: int = 10, max_distance: int | None = None) -> pd.DataFrame:
+        """ returns the `limit` barcodes closest to sequence (ties by id) with a 'hamming' column """
+        snapshot = self.snapshot
+        rows, dists = self._distances(snapshot, sequence, max_distance)
+        order = np.lexsort((snapshot.barcodes["id"].values[rows], dists))[:limit]
+
+        df = snapshot.barcodes.iloc[rows[order]].drop(columns=["kit_type_id"]).reset_index(drop=True)
+        df["hamming"] = dists[order]
+        return df
+
+    def match_kits(self, sequences: list[str], barcode_type_id: int, index_type_id: int | None = None) -> pd.DataFrame:
+        """ returns kit_id, kit_name, kit_identifier of the kits containing all sequences as barcodes of the given type """
+        snapshot = self.snapshot
+        kit_ids: frozenset[int] | None = None
+        for sequence in set(sequences):
+            matches = snapshot.kits.get((barcode_type_id, sequence), frozenset())
+            kit_ids = matches if kit_ids is None else kit_ids & matches
+            if not kit_ids:
+                break
+
+        kits = snapshot.kit_info.loc[sorted(kit_ids or [])]
+        if index_type_id is not None:
+            kits = kits[kits["kit_type_id"] == index_type_id]
+        return kits.drop(columns=["kit_type_id"]).reset_index()
@@ -1,13 +1,107 @@
+import json
+import math
+import base64
+from datetime import datetime
 from typing import Callable, TypeVar, Any, TYPE_CHECKING
 from functools import wraps
 
+import sqlalchemy as sa
+from sqlalchemy.orm import ColumnProperty
+from sqlalchemy.orm.query import Query
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.ext.compiler import compiles
+
 F = TypeVar('F', bound=Callable[..., Any])
 
 if TYPE_CHECKING:
     from .DBHandler import DBHandler
 
 
+class Explain(Executable, ClauseElement):
+    """ `EXPLAIN (FORMAT JSON) <statement>`, returns the planner's estimate without running the statement """
+    inherit_cache = False
+
+    def __init__(self, statement: sa.Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kwargs)}"
+
+
+class Page(list):
+    """ Rows of one page. Carries opaque keyset cursors for the neighbouring pages, if the ordering allows seeking. """
+    def __init__(self, rows=(), next_cursor: str | None = None, prev_cursor: str | None = None) -> None:
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+class Keyset:
+    """ Ordering by `sort_by` with the primary key as tie-breaker. Pages of a non-nullable column ordering can be
+    fetched by seeking from the last (or first) row of the neighbouring page, `WHERE (col, id) > (:col, :id)`,
+    instead of scanning and discarding `OFFSET page * limit` rows. """
+    def __init__(self, model: type, sort_by: str, descending: bool = False, nulls_last: bool = False) -> None:
+        self.sort_by = sort_by
+        self.descending = descending
+        self.nulls_last = nulls_last
+        self.attr = getattr(model, sort_by)
+        self.id = model.id  # type: ignore[attr-defined]
+
+        prop = getattr(self.attr, "property", None)
+        self.column = prop.columns[0] if isinstance(prop, ColumnProperty) else None
+        self.seekable = isinstance(self.column, sa.Column) and not self.column.nullable
+
+    @property
+    def columns(self) -> list:
+        return [self.attr] if self.sort_by == "id" else [self.attr, self.id]
+
+    def order_by(self, reverse: bool = False) -> list:
+        descending = self.descending != reverse
+        clauses = [col.desc() if descending else col.asc() for col in self.columns]
+        if self.nulls_last:
+            clauses[0] = sa.nulls_last(clauses[0])
+        return clauses
+
+    def cursor(self, row: Any, page: int, before: bool = False) -> str | None:
+        """ cursor for `page`, positioned after `row` (or before `row` if `before`) """
+        if not self.seekable:
+            return None
+        values = [getattr(row, col.key) for col in self.columns]
+        if not all(isinstance(value, (int, float, str, datetime)) for value in values):
+            return None
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+        payload = json.dumps([page, self.sort_by, self.descending, before, values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode(self, cursor: str, page: int) -> tuple[list, bool] | None:
+        """ returns (values, before) if the cursor is valid for `page` and this ordering, else None """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            cursor_page, sort_by, descending, before, values = payload
+            if (cursor_page, sort_by, descending) != (page, self.sort_by, self.descending):
+                return None
+            if len(values) != len(self.columns):
+                return None
+            if self.column is not None and self.column.type.python_type is datetime and isinstance(values[0], str):
+                values[0] = datetime.fromisoformat(values[0])
+            return values, bool(before)
+        except (ValueError, TypeError, NotImplementedError):
+            return None
+
+    def seek(self, query: Query, values: list, before: bool) -> Query:
+        columns = self.columns
+        params = [sa.literal(value, col.type) for col, value in zip(columns, values)]
+        if self.descending == before:
+            return query.where(sa.tuple_(*columns) > sa.tuple_(*params))
+        return query.where(sa.tuple_(*columns) < sa.tuple_(*params))
+
+
 class DBBlueprint:
+    EXACT_COUNT_THRESHOLD = 10_000
+    WORD_SIMILARITY_THRESHOLD = 0.3
+
     def __init__(self, name: str, db: "DBHandler") -> None:
         self.name = name
         self.db = db
@@ -38,6 +132,101 @@ class DBBlueprint:
                 return func(self, *args, **kwargs)
         return wrapped  # type: ignore[return-value]
 
+    def _count_for_pages(self, query: Query, exact: bool = False) -> tuple[int, bool]:
+        """ (count, is exact), exact if the planner estimates at most `EXACT_COUNT_THRESHOLD` rows, else the estimate """
+        query = query.enable_eagerloads(False).order_by(None)
+        if not exact:
+            plan = self.db.session.execute(Explain(query.statement)).scalar()
+            if (estimate := int(plan[0]["Plan"]["Plan Rows"])) > self.EXACT_COUNT_THRESHOLD:  # type: ignore[index]
+                return estimate, False
+        return query.count(), True
+
+    def fuzzy_search(
+        self, query: Query, word: str, *expressions: sa.ColumnElement[str], threshold: float | None = None
+    ) -> Query:
+        """ Keeps rows where `word` is similar to a word of one of `expressions` (pg_trgm `<%`), best match first.
+
+        Filters and orders on `lower(expression)`, the expression of the `gin_trgm_ops` indexes, so candidates come
+        from the index instead of computing similarity() for every row and sorting the whole table.
+        `pg_trgm.word_similarity_threshold` is set for the current transaction.
+        """
+        if threshold is None:
+            threshold = self.WORD_SIMILARITY_THRESHOLD
+        self.db.session.execute(
+            sa.select(sa.func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True))
+        )
+        word = word.lower()
+        lowered = [sa.func.lower(expression) for expression in expressions]
+        similarities = [sa.func.word_similarity(word, expression) for expression in lowered]
+        return query.where(
+            sa.or_(*[sa.literal(word).op("<%", is_comparison=True)(expression) for expression in lowered])
+        ).order_by(
+            (sa.func.greatest(*similarities) if len(similarities) > 1 else similarities[0]).desc()
+        )
+
+    def paginate(
+        self, query: Query, limit: int | None, page: int | None = None, offset: int | None = None,
+        keyset: Keyset | None = None, cursor: str | None = None
+    ) -> tuple[Page, int | None]:
+        """ Runs `query` for one page, returns (rows, number of pages).
+
+        If `keyset` is given, the query must be ordered by `keyset.order_by()` only. A `cursor` from the rows of a
+        neighbouring page replaces the OFFSET with a keyset seek. Large result sets are counted by estimate, the
+        number of pages is corrected once the last page is reached: a page past the end counts exactly and returns the
+        actual last page, a full last page announces one more.
+        """
+        if page is None:
+            if offset is not None:
+                query = query.offset(offset)
+            if limit is not None:
+                query = query.limit(limit)
+            return Page(query.all()), None
+
+        if not limit:
+            raise ValueError("Limit must be provided when page is provided")
+
+        n_rows, exact = self._count_for_pages(query)
+        n_pages = math.ceil(n_rows / limit)
+
+        seek = keyset.decode(cursor, page) if keyset is not None and keyset.seekable and cursor else None
+        before = False
+        rows = []
+        if seek is not None and offset is None:
+            values, before = seek
+            seek_query = keyset.seek(query, values, before)  # type: ignore[union-attr]
+            if before:
+                seek_query = seek_query.order_by(None).order_by(*keyset.order_by(reverse=True))  # type: ignore[union-attr]
+            rows = seek_query.limit(limit).all()
+            if before:
+                rows.reverse()
+
+        if not rows:
+            before = False
+            page = min(page, max(0, n_pages - 1))
+            rows = query.offset(offset if offset is not None else page * limit).limit(limit).all()
+            if not rows and page > 0 and offset is None and not exact:
+                # the estimate overshot, go to the actual last page
+                n_rows, exact = self._count_for_pages(query, exact=True)
+                n_pages = math.ceil(n_rows / limit)
+                page = min(page, max(0, n_pages - 1))
+                rows = query.offset(page * limit).limit(limit).all()
+
+        if offset is None and not before:
+            if len(rows) < limit and (rows or page == 0):
+                n_pages = page + (1 if rows else 0)
+            elif not exact and page + 1 >= n_pages:
+                # the estimate undershot, there may be more rows after this full page
+                n_pages = page + 2
+
+        if keyset is None or not rows:
+            return Page(rows), n_pages
+
+        return Page(
+            rows,
+            next_cursor=keyset.cursor(rows[-1], page + 1) if page + 1 < n_pages else None,
+            prev_cursor=keyset.cursor(rows[0], page - 1, before=True) if page > 0 else None,
+        ), n_pages
+
     @classmethod
     def transaction(cls, func: F) -> F:
         """Decorator to mark methods as transactions."""
@@ -1,11 +1,15 @@
+import time
 from datetime import datetime
-from typing import Optional, Union, TypeVar
+from contextlib import contextmanager
+from typing import Optional, Union, TypeVar, Iterator
 import threading
 import loguru
 import sqlalchemy as sa
 from sqlalchemy import orm
 from ..models.Base import Base
 from .. import models
+from .EngineRegistry import PoolConfig, PoolMetrics, engine_registry
+from .ReplicaRouter import ReadPolicy, ReplicaRouter
 
 T = TypeVar("T", bound=Base)
 
@@ -19,7 +23,8 @@ class DBHandler():
         lab_protocol_start_number: int = 1, auto_commit: bool = False
     ):
         self._logger = logger
-        self._connection: sa.engine.Connection | None = None
+        self._engine: sa.Engine = None  # type: ignore
+        self._replica_router: ReplicaRouter | None = None
         self.expire_on_commit = expire_on_commit
         self.lab_protocol_start_number = lab_protocol_start_number
         self.auto_open = auto_open
@@ -92,6 +97,9 @@ class DBHandler():
         self.pool_designs = PoolDesignBP("pool_designs", self)
         self.pd = PandasBP("pd", self)
 
+        from .BarcodeIndex import BarcodeIndex
+        self.barcode_index = BarcodeIndex(self)
+
     @property
     def _session(self) -> orm.Session | None:
         """Thread-local session storage"""
@@ -110,24 +118,48 @@ class DBHandler():
     def _needs_commit_flag(self, value: bool):
         self._local.needs_commit = value
 
+    @property
+    def last_write(self) -> float | None:
+        """ unix time of the last commit with changes in this thread's session, reads stay on the primary
+        for the replica staleness bound after it; reset when a session is opened """
+        return getattr(self._local, "last_write", None)
+
+    @last_write.setter
+    def last_write(self, value: float | None):
+        self._local.last_write = value
+
     @staticmethod
     def AdminURL(user: str, password: str, host: str, db: str, port: str | int) -> str:
         return f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}"
     
     def connect(
-        self, user: str, password: str, host: str, db: str = "opengsync_db", port: Union[str, int] = 5432
+        self, user: str, password: str, host: str, db: str = "opengsync_db", port: Union[str, int] = 5432,
+        pool_config: PoolConfig | None = None,
+        replica_url: str | None = None, read_policy: ReadPolicy | None = None,
     ) -> None:
         self._url = DBHandler.AdminURL(
             user=user, password=password, host=host, db=db, port=port
         )
         self.public_url = f"{self._url.split(':')[0]}://{host}:{port}/{db}"
-        self._engine = sa.create_engine(self._url)
+        self.pool_config = pool_config or PoolConfig()
+        self._engine = engine_registry.get(self._url, self.pool_config)
         try:
-            self._connection = self._engine.connect()
+            # checks the credentials, the connection is returned to the pool
+            with self._engine.connect():
+                pass
         except Exception as e:
             raise Exception(f"Could not connect to DB '{self.public_url}':\n{e}")
         
         self.info(f"Connected to DB '{self.public_url}'")
+
+        if replica_url is not None:
+            # an unreachable replica is not fatal, reads fall back to the primary
+            self._replica_router = ReplicaRouter(
+                primary=self._engine, replica=engine_registry.get(replica_url, self.pool_config),
+                policy=read_policy or ReadPolicy(), on_error=self.warn,
+            )
+            self.info(f"Routing read-only queries to replica '{sa.make_url(replica_url).render_as_string(hide_password=True)}'")
+
         self.session_factory = orm.sessionmaker(bind=self._engine, expire_on_commit=self.expire_on_commit)
         DBHandler.Session = orm.scoped_session(self.session_factory)
         from . import listeners
@@ -175,16 +207,40 @@ class DBHandler():
         return self._session
     
     @property
-    def connection(self) -> sa.engine.Connection:
-        if self._connection is None:
-            raise Exception("Connection is not open.")
-        return self._connection
+    def engine(self) -> sa.Engine:
+        if self._engine is None:
+            raise Exception("Not connected to DB.")
+        return self._engine
+
+    @property
+    def read_engine(self) -> sa.Engine:
+        """ engine for read-only (analytics) queries: the replica if configured, within the staleness bound,
+        and this thread has neither pending nor recently committed writes, the primary otherwise """
+        if self._replica_router is None or getattr(self._local, "force_primary", False):
+            return self.engine
+        return self._replica_router.engine(pending_writes=self.needs_commit, last_write=self.last_write)
+
+    @contextmanager
+    def use_primary(self) -> Iterator[None]:
+        """ routes all reads of this thread to the primary, e.g. to read data committed just before """
+        previous = getattr(self._local, "force_primary", False)
+        self._local.force_primary = True
+        try:
+            yield
+        finally:
+            self._local.force_primary = previous
+
+    def pool_metrics(self) -> PoolMetrics:
+        """ connection pool usage of this process """
+        return engine_registry.metrics(self.engine)
         
     def timestamp(self) -> datetime:
         return datetime.now()
     
     def commit(self) -> None:
         if self._session is not None:
+            if self.needs_commit:
+                self.last_write = time.time()
             self._session.commit()
             self._needs_commit_flag = False
         else:
@@ -196,7 +252,15 @@ class DBHandler():
             self._session.flush()
         else:
             raise Exception("Session is not open, cannot flush changes.")
-            
+
+    def execute(self, statement: sa.Executable) -> sa.Result:
+        """ executes a (bulk) statement in the current session, insert/update/delete mark the session for commit """
+        if self._session is None:
+            raise Exception("Session is not open, cannot execute statement.")
+        if isinstance(statement, (sa.Insert, sa.Update, sa.Delete)):
+            self._needs_commit_flag = True
+        return self._session.execute(statement)
+
     def refresh(self, obj: object) -> None:
         if self._session is not None:
             self._session.refresh(obj)
@@ -229,6 +293,7 @@ class DBHandler():
             return
         self._session = DBHandler.Session(autoflush=autoflush)
         self._needs_commit_flag = False  # Reset for this thread
+        self.last_write = None
 
     def close_session(self, commit: bool | None = None, rollback: bool = False) -> bool:
         """ returns True if db was modified """
@@ -244,6 +309,7 @@ class DBHandler():
             if commit and not rollback:
                 if self.needs_commit:
                     try:
+                        self.last_write = time.time()
                         self._session.commit()
                         modified = True
                     except Exception:
@@ -258,12 +324,28 @@ class DBHandler():
                 if not commit and self.needs_commit:
                     self.warn("Session was not committed, but changes were made. This may lead to data loss. Use 'db.commit()', if you want changes to be written to the database.")
         finally:
+            self._local.write_tags = self._session.info.pop("write_tags", set())
             DBHandler.Session.remove()
             self._session = None
             self._needs_commit_flag = False
             
         return modified
         
+    def pop_write_tags(self) -> set[str]:
+        """ returns the cache tags of all entities committed in the last closed session of this thread """
+        tags = getattr(self._local, "write_tags", set())
+        self._local.write_tags = set()
+        return tags
+    
+    def start_read_tracking(self) -> None:
+        """ starts collecting the cache tags of all entities/tables read in this thread """
+        from . import listeners
+        listeners.start_read_tracking()
+
+    def stop_read_tracking(self) -> set[str]:
+        from . import listeners
+        return listeners.stop_read_tracking()
+        
     def rollback(self) -> None:
         if self._session is None:
             self.error("Session is not open, cannot rollback.")
@@ -272,16 +354,14 @@ class DBHandler():
         self._session.rollback()
         
     def close_connection(self) -> None:
-        if self._connection is not None:
-            self._connection = self._connection.close()
-            self.info("Connection closed.")
+        """ closes the idle pooled connections of the engine, which is shared with other handlers of the process """
+        if self._engine is not None:
+            self._engine.dispose()
+            self.info("Connection pool disposed.")
             
     def __del__(self):
         if self._session is not None:
             self.close_session()
-        self.close_connection()
-        if hasattr(self, '_engine'):
-            self._engine.dispose()
             
     @property
     def needs_commit(self) -> bool:
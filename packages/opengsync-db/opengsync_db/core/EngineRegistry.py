@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+from dataclasses import dataclass, asdict, fields
+
+import sqlalchemy as sa
+from sqlalchemy.pool import QueuePool
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_pre_ping: bool = True
+    pool_recycle: int = 30 * 60             # seconds, -1 to disable
+    statement_timeout_ms: int | None = None # server side statement_timeout for every connection
+    prepare_threshold: int | None = 5       # psycopg3 executions before server side prepare, None disables
+
+    @staticmethod
+    def from_dict(config: dict | None) -> "PoolConfig":
+        """ builds the config from e.g. the 'db' section of opengsync.yaml, ignoring unknown keys """
+        names = {f.name for f in fields(PoolConfig)}
+        return PoolConfig(**{key: value for key, value in (config or {}).items() if key in names})
+
+    def engine_kwargs(self) -> dict:
+        connect_args: dict = {"prepare_threshold": self.prepare_threshold}
+        if self.statement_timeout_ms is not None:
+            connect_args["options"] = f"-c statement_timeout={int(self.statement_timeout_ms)}"
+        return dict(
+            poolclass=TimedQueuePool,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=self.pool_pre_ping,
+            pool_recycle=self.pool_recycle,
+            connect_args=connect_args,
+        )
+
+
+@dataclass
+class PoolMetrics:
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.checkouts if self.checkouts else 0.0
+
+    @property
+    def saturated(self) -> bool:
+        return self.checked_out >= self.pool_size + max(self.max_overflow, 0)
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {"mean_wait_seconds": self.mean_wait_seconds, "saturated": self.saturated}
+
+
+class TimedQueuePool(QueuePool):
+    """ QueuePool that records how long checkouts wait for a free connection """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa.exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+
+class EngineRegistry:
+    """ Process-wide engines, one per (url, pool config), shared by all DBHandlers of the process.
+    Pools inherited through fork (e.g. gunicorn --preload, celery prefork) are dropped in the child
+    without closing the parent's connections. """
+
+    def __init__(self):
+        self._engines: dict[tuple[str, PoolConfig], sa.Engine] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, config: PoolConfig | None = None) -> sa.Engine:
+        key = (url, config or PoolConfig())
+        if (engine := self._engines.get(key)) is not None:
+            return engine
+        with self._lock:
+            if (engine := self._engines.get(key)) is None:
+                engine = self._engines[key] = sa.create_engine(url, **key[1].engine_kwargs())
+        return engine
+
+    def engines(self) -> list[sa.Engine]:
+        with self._lock:
+            return list(self._engines.values())
+
+    def dispose_all(self, close: bool = True) -> None:
+        for engine in self.engines():
+            engine.dispose(close=close)
+
+    def _after_fork_in_child(self) -> None:
+        # the lock may have been held by another thread at fork time
+        self._lock = threading.Lock()
+        self.dispose_all(close=False)
+
+    @staticmethod
+    def metrics(engine: sa.Engine) -> PoolMetrics:
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return PoolMetrics(
+                pool_size=0, max_overflow=0, checked_out=0, checked_in=0, overflow=0,
+                checkouts=0, timeouts=0, total_wait_seconds=0.0, max_wait_seconds=0.0
+            )
+        return PoolMetrics(
+            pool_size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            checkouts=getattr(pool, "checkouts", 0),
+            timeouts=getattr(pool, "timeouts", 0),
+            total_wait_seconds=getattr(pool, "total_wait_seconds", 0.0),
+            max_wait_seconds=getattr(pool, "max_wait_seconds", 0.0),
+        )
+
+
+engine_registry = EngineRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=engine_registry._after_fork_in_child)
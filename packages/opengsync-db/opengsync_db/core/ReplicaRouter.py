@@ -0,0 +1,80 @@
+import time
+import threading
+from dataclasses import dataclass, fields
+from typing import Literal, Callable
+
+import sqlalchemy as sa
+
+_LAG_QUERY = sa.text("""
+    SELECT
+        pg_is_in_recovery() AS in_recovery,
+        CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END AS lag_seconds
+""")
+
+
+@dataclass(frozen=True)
+class ReadPolicy:
+    mode: Literal["primary", "replica"] = "replica"     # 'primary' ignores the replica
+    max_lag_seconds: float = 30.0                       # staleness bound, reads fall back to the primary above it
+    lag_check_interval_seconds: float = 5.0
+
+    @staticmethod
+    def from_dict(config: dict | None) -> "ReadPolicy":
+        names = {f.name for f in fields(ReadPolicy)}
+        return ReadPolicy(**{key: value for key, value in (config or {}).items() if key in names})
+
+
+class ReplicaRouter:
+    """ Routes read-only queries to a (streaming) replica while its replication lag is within the
+    policy's staleness bound. Reads inside a session with pending writes, and reads within the staleness bound
+    after a write (read-your-writes), stay on the primary. """
+
+    def __init__(
+        self, primary: sa.Engine, replica: sa.Engine, policy: ReadPolicy,
+        on_error: Callable[[str], None] | None = None
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.policy = policy
+        self.on_error = on_error
+        self._lag: float | None = None
+        self._checked_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _check_lag(self) -> float | None:
+        """ returns the replication lag in seconds, 0 for a standalone server, None if the replica is unavailable """
+        try:
+            with self.replica.connect() as conn:
+                row = conn.execute(_LAG_QUERY).one()
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(f"Replica unavailable, reading from primary: {e}")
+            return None
+        if not row.in_recovery:
+            return 0.0
+        # NULL replay timestamp: nothing replayed yet since startup
+        return float(row.lag_seconds) if row.lag_seconds is not None else None
+
+    @property
+    def lag(self) -> float | None:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.policy.lag_check_interval_seconds:
+            return self._lag
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.policy.lag_check_interval_seconds:
+                self._lag = self._check_lag()
+                self._checked_at = time.monotonic()
+        return self._lag
+
+    def engine(self, pending_writes: bool = False, last_write: float | None = None) -> sa.Engine:
+        """ `last_write`: unix time of the caller's last commit, the replica may not have replayed it yet """
+        if self.policy.mode == "primary" or pending_writes:
+            return self.primary
+        if last_write is not None and time.time() - last_write < self.policy.max_lag_seconds:
+            return self.primary
+        if (lag := self.lag) is None or lag > self.policy.max_lag_seconds:
+            return self.primary
+        return self.replica
@@ -1,4 +1,6 @@
 from .DBHandler import DBHandler  
 from .DBSession import DBSession
+from .EngineRegistry import PoolConfig, PoolMetrics, engine_registry
+from .ReplicaRouter import ReadPolicy
 
-__all__ = ["DBHandler", "DBSession"]
\ No newline at end of file
+__all__ = ["DBHandler", "DBSession", "PoolConfig", "PoolMetrics", "engine_registry", "ReadPolicy"]
\ No newline at end of file
@@ -1,4 +1,3 @@
-import math
 from typing import Optional
 
 import sqlalchemy as sa
@@ -68,22 +67,6 @@ class AdapterBP(DBBlueprint):
         if well is not None:
             query = query.where(models.Adapter.well == well)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        res = query.all()
+        res, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
 
         return res, n_pages
\ No newline at end of file
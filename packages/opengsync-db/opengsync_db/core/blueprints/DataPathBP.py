@@ -1,4 +1,3 @@
-import math
 from typing import Callable
 
 import sqlalchemy as sa
@@ -141,25 +140,25 @@ class DataPathBP(DBBlueprint):
                 attr = attr.desc()
             query = query.order_by(sa.nulls_last(attr))
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
+        seq_requests, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
 
-        if offset is not None:
-            query = query.offset(offset)
+        return seq_requests, n_pages
 
-        if limit is not None:
-            query = query.limit(limit)
+    @DBBlueprint.transaction
+    def find_by_paths(self, paths: list[str], options: ExecutableOption | None = None) -> dict[str, list[models.DataPath]]:
+        """ returns a path -> data paths map with an entry for every requested path, in a single query """
+        data_paths: dict[str, list[models.DataPath]] = {path: [] for path in paths}
+        if not data_paths:
+            return data_paths
 
-        seq_requests = query.all()
+        query = self.db.session.query(models.DataPath).filter(models.DataPath.path.in_(list(data_paths.keys())))
+        if options is not None:
+            query = query.options(options)
 
-        return seq_requests, n_pages
+        for data_path in query.order_by(models.DataPath.id).all():
+            data_paths[data_path.path].append(data_path)
+
+        return data_paths
 
     @DBBlueprint.transaction
     def delete(self, data_path: models.DataPath) -> None:
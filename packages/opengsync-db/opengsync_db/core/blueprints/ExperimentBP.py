@@ -1,4 +1,3 @@
-import math
 from typing import Optional, Callable, Iterator
 
 import sqlalchemy as sa
@@ -8,7 +7,7 @@ from sqlalchemy.sql.base import ExecutableOption
 from ... import models, PAGE_LIMIT
 from .. import exceptions
 from ...categories import ExperimentWorkFlow, ExperimentStatus, ExperimentWorkFlow
-from ..DBBlueprint import DBBlueprint
+from ..DBBlueprint import DBBlueprint, Keyset
 
 
 class ExperimentBP(DBBlueprint):
@@ -114,7 +113,7 @@ class ExperimentBP(DBBlueprint):
         custom_query: Callable[[Query], Query] | None = None,
         limit: int | None = PAGE_LIMIT, offset: int | None = None,
         sort_by: str | None = None, descending: bool = False,
-        page: int | None = None,
+        page: int | None = None, cursor: str | None = None,
         options: ExecutableOption | None = None,
     ) -> tuple[list[models.Experiment], int | None]:
 
@@ -130,43 +129,27 @@ class ExperimentBP(DBBlueprint):
         if options is not None:
             query = query.options(options)
 
+        keyset = None
         if sort_by is not None:
-            attr = getattr(models.Experiment, sort_by)
-            if descending:
-                attr = attr.desc()
-            query = query.order_by(attr)
+            keyset = Keyset(models.Experiment, sort_by, descending)
+            query = query.order_by(*keyset.order_by())
 
         if name is not None:
-            query = query.order_by(
-                sa.nulls_last(sa.func.similarity(models.Experiment.name, name).desc())
-            )
+            keyset = None
+            query = self.fuzzy_search(query, name, models.Experiment.name)
         elif id is not None:
             query = query.where(models.Experiment.id == id)
         elif operator is not None:
+            keyset = None
             query = query.join(
                 models.User,
                 models.Experiment.operator_id == models.User.id
-            ).order_by(
-                sa.nulls_last(sa.func.similarity(models.User.first_name + " " + models.User.last_name, operator).desc())
             )
+            query = self.fuzzy_search(query, operator, models.User.full_name())
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        experiments = query.all()
+        experiments, n_pages = self.paginate(
+            query, limit=limit, page=page, offset=offset, keyset=keyset, cursor=cursor
+        )
 
         return experiments, n_pages
 
@@ -232,9 +215,7 @@ class ExperimentBP(DBBlueprint):
         if workflow_in is not None:
             query = query.where(models.Experiment.workflow_id.in_([w.id for w in workflow_in]))
 
-        query = query.order_by(
-            sa.func.similarity(models.Experiment.name, word).desc()
-        )
+        query = self.fuzzy_search(query, word, models.Experiment.name)
 
         if limit is not None:
             query = query.limit(limit)
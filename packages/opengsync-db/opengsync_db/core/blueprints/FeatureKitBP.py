@@ -1,4 +1,3 @@
-import math
 from typing import Optional
 
 import sqlalchemy as sa
@@ -79,23 +78,7 @@ class FeatureKitBP(DBBlueprint):
         elif identifier is not None:
             query = query.order_by(sa.nulls_last(sa.func.similarity(models.FeatureKit.identifier, identifier).desc()))
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        feature_kits = query.all()
+        feature_kits, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return feature_kits, n_pages
 
     @DBBlueprint.transaction
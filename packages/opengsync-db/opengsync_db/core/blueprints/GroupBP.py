@@ -1,7 +1,5 @@
-import math
 from typing import Optional
 
-import sqlalchemy as sa
 from sqlalchemy.orm import Query
 
 from ... import models
@@ -89,28 +87,11 @@ class GroupBP(DBBlueprint):
             query = query.order_by(attr)
 
         if name is not None:
-            query = query.order_by(
-                sa.nulls_last(sa.func.similarity(models.Group.name, name).desc())
-            )
+            query = self.fuzzy_search(query, name, models.Group.name)
         elif id is not None:
             query = query.where(models.Group.id == id)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if limit is not None:
-            query = query.limit(limit)
-        if offset is not None:
-            query = query.offset(offset)
-
-        res = query.all()
+        res, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return res, n_pages
 
     @DBBlueprint.transaction
@@ -122,9 +103,7 @@ class GroupBP(DBBlueprint):
         query = self.db.session.query(models.Group)
         query = GroupBP.where(query, user_id=user_id, type=type, type_in=type_in)
 
-        query = query.order_by(
-            sa.func.similarity(models.Group.name, name).desc()
-        )
+        query = self.fuzzy_search(query, name, models.Group.name)
 
         if limit is not None:
             query = query.limit(limit)
@@ -171,27 +150,10 @@ class GroupBP(DBBlueprint):
             query = query.join(
                 models.User,
                 models.User.id == models.links.UserAffiliation.user_id
-            ).order_by(
-                sa.nulls_last(sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, user_name).desc())
             )
+            query = self.fuzzy_search(query, user_name, models.User.full_name())
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        affiliations = query.all()
+        affiliations, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return affiliations, n_pages
 
     @DBBlueprint.transaction
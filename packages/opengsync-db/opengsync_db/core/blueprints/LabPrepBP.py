@@ -1,7 +1,5 @@
-import math
 from typing import Optional
 
-import sqlalchemy as sa
 from sqlalchemy.sql.base import ExecutableOption
 
 from ... import models, PAGE_LIMIT
@@ -83,35 +81,17 @@ class LabPrepBP(DBBlueprint):
             query = query.order_by(getattr(models.LabPrep, sort_by).desc() if descending else getattr(models.LabPrep, sort_by))
 
         if name is not None:
-            query = query.order_by(
-                sa.func.similarity(models.LabPrep.name, name).desc()
-            )
+            query = self.fuzzy_search(query, name, models.LabPrep.name)
         elif creator is not None:
             query = query.join(
                 models.User,
                 models.User.id == models.LabPrep.creator_id
-            ).order_by(
-                sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, creator).desc()
             )
+            query = self.fuzzy_search(query, creator, models.User.full_name())
         elif id is not None:
             query = query.where(models.LabPrep.id == id)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if limit is not None:
-            query = query.limit(limit)
-        if offset is not None:
-            query = query.offset(offset)
-
-        lab_preps = query.all()
+        lab_preps, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return lab_preps, n_pages
 
     @DBBlueprint.transaction
@@ -158,17 +138,13 @@ class LabPrepBP(DBBlueprint):
             query = query.where(models.LabPrep.status_id.in_([s.id for s in status_in]))
 
         if name is not None:
-            query = query.order_by(
-                sa.func.similarity(models.LabPrep.name, name).desc()
-            )
+            query = self.fuzzy_search(query, name, models.LabPrep.name)
         elif creator is not None:
             query = query.join(
                 models.User,
                 models.User.id == models.LabPrep.creator_id
             )
-            query = query.order_by(
-                sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, creator).desc()
-            )
+            query = self.fuzzy_search(query, creator, models.User.full_name())
         else:
             raise ValueError("Either 'name' or 'owner' must be provided.")
         
@@ -1,6 +1,5 @@
 import math
 
-import sqlalchemy as sa
 from sqlalchemy.sql.base import ExecutableOption
 
 from ... import models, PAGE_LIMIT
@@ -73,29 +72,12 @@ class LaneBP(DBBlueprint):
 
 
         if experiment_name is not None:
-            query = query.join(models.Experiment).order_by(
-                sa.func.similarity(models.Experiment.name, experiment_name).desc()
-            )
+            query = query.join(models.Experiment)
+            query = self.fuzzy_search(query, experiment_name, models.Experiment.name)
 
         query = query.order_by(models.Lane.number)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        lanes = query.all()
+        lanes, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return lanes, n_pages
 
     @DBBlueprint.transaction
@@ -1,4 +1,3 @@
-import math
 from typing import Optional, Callable, Iterator
 
 import sqlalchemy as sa
@@ -13,7 +12,7 @@ from ...categories import (
     UserRole
 )
 from .. import exceptions
-from ..DBBlueprint import DBBlueprint
+from ..DBBlueprint import DBBlueprint, Keyset
 
 
 class LibraryBP(DBBlueprint):
@@ -195,7 +194,7 @@ class LibraryBP(DBBlueprint):
         custom_query: Callable[[Query], Query] | None = None,
         sort_by: str | None = None, descending: bool = False,
         limit: int | None = PAGE_LIMIT, offset: int | None = None,
-        page: int | None = None,
+        page: int | None = None, cursor: str | None = None,
         options: ExecutableOption | None = None,
     ) -> tuple[list[models.Library], int | None]:
 
@@ -212,43 +211,27 @@ class LibraryBP(DBBlueprint):
         if options is not None:
             query = query.options(options)
 
+        keyset = None
         if sort_by is not None:
-            attr = getattr(models.Library, sort_by)
-            if descending:
-                attr = attr.desc()
-            query = query.order_by(attr)
+            keyset = Keyset(models.Library, sort_by, descending)
+            query = query.order_by(*keyset.order_by())
 
         if id is not None:
             query = query.filter(models.Library.id == id)
         elif name is not None:
-            query = query.order_by(
-                sa.func.similarity(models.Library.name, name).desc()
-            )
+            keyset = None
+            query = self.fuzzy_search(query, name, models.Library.name)
         elif pool_name is not None:
+            keyset = None
             query = query.join(
                 models.Pool,
                 models.Pool.id == models.Library.pool_id
-            ).order_by(
-                sa.func.similarity(models.Pool.name, pool_name).desc()
             )
+            query = self.fuzzy_search(query, pool_name, models.Pool.name)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-        
-        libraries = query.all()
+        libraries, n_pages = self.paginate(
+            query, limit=limit, page=page, offset=offset, keyset=keyset, cursor=cursor
+        )
 
         return libraries, n_pages
 
@@ -323,17 +306,13 @@ class LibraryBP(DBBlueprint):
         )
 
         if name is not None:
-            query = query.order_by(
-                sa.func.similarity(models.Library.name, name).desc()
-            )
+            query = self.fuzzy_search(query, name, models.Library.name)
         elif owner is not None:
             query = query.join(
                 models.User,
                 models.User.id == models.Library.owner_id
             )
-            query = query.order_by(
-                sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, owner).desc()
-            )
+            query = self.fuzzy_search(query, owner, models.User.full_name())
         else:
             raise ValueError("At least one of 'name' or 'owner' must be provided")
 
@@ -1,9 +1,12 @@
+from typing import Iterator
+
 import pandas as pd
 
 import sqlalchemy as sa
 
 from ... import models, categories as cats
 from ..DBBlueprint import DBBlueprint
+from .. import columnar
 
 
 class PandasBP(DBBlueprint):
@@ -87,7 +90,7 @@ class PandasBP(DBBlueprint):
             )
                 
         query = query.order_by(models.Lane.number, models.Pool.id, models.Library.id)
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         df["library_type"] = cats.LibraryType.map_series(df["library_type_id"], na_action="ignore")
         df["reference"] = cats.GenomeRef.map_series(df["reference_id"], na_action="ignore")
@@ -119,8 +122,17 @@ class PandasBP(DBBlueprint):
         
         return df
 
-    @DBBlueprint.transaction
-    def get_flowcell(self, experiment_id: int | str) -> pd.DataFrame:
+    _FLOWCELL_ENUMS: columnar.EnumColumns = {
+        "library_type": ("library_type_id", cats.LibraryType),
+        "reference": ("reference_id", cats.GenomeRef),
+        "orientation": ("orientation_id", cats.BarcodeOrientation),
+    }
+    _FLOWCELL_COLUMNS = [
+        "lane", "sample_name", "library_name", "library_type", "reference", "seq_request_id", "sequence_i7", "sequence_i5",
+        "orientation", "read_structure", "protocol_name", "pool_name", "library_id"
+    ]
+
+    def _flowcell_query(self, experiment_id: int | str) -> sa.Select:
         columns = [
             models.Experiment.id.label("experiment_id"), models.Experiment.name.label("experiment_name"),
             models.Lane.number.label("lane"),
@@ -161,15 +173,19 @@ class PandasBP(DBBlueprint):
             isouter=True
         )
 
-        query = query.order_by(models.Lane.number, models.Pool.id, models.Library.id)
-        df = pd.read_sql(query, self.db._engine)
-        df["library_type"] = cats.LibraryType.map_series(df["library_type_id"], na_action="ignore")
-        df["reference"] = cats.GenomeRef.map_series(df["reference_id"], na_action="ignore")
-        df["orientation"] = cats.BarcodeOrientation.map_series(df["orientation_id"], na_action="ignore")
+        return query.order_by(models.Lane.number, models.Pool.id, models.Library.id)
 
-        df = df[["lane", "sample_name", "library_name", "library_type", "reference", "seq_request_id", "sequence_i7", "sequence_i5", "orientation", "read_structure", "protocol_name", "pool_name", "library_id"]]
+    @DBBlueprint.transaction
+    def get_flowcell(self, experiment_id: int | str, typed: bool = False) -> pd.DataFrame:
+        df = columnar.read_frame(self._flowcell_query(experiment_id), self.db.read_engine, enums=self._FLOWCELL_ENUMS, typed=typed)
+        return df[self._FLOWCELL_COLUMNS]
 
-        return df
+    def iter_flowcell(self, experiment_id: int | str, batch_size: int = columnar.BATCH_SIZE, typed: bool = False) -> Iterator[pd.DataFrame]:
+        """ get_flowcell in chunks of up to batch_size rows, streamed from the database """
+        for df in columnar.iter_frames(
+            self._flowcell_query(experiment_id), self.db.read_engine, enums=self._FLOWCELL_ENUMS, batch_size=batch_size, typed=typed
+        ):
+            yield df[self._FLOWCELL_COLUMNS]
 
     @DBBlueprint.transaction
     def get_experiment_barcodes(self, experiment_id: int) -> pd.DataFrame:
@@ -198,8 +214,9 @@ class PandasBP(DBBlueprint):
             models.LibraryIndex.library_id == models.Library.id
         )
 
-        df = pd.read_sql(query, self.db._engine)
-        df["orientation"] = cats.BarcodeOrientation.map_series(df["orientation_id"], na_action="ignore")
+        df = columnar.read_frame(query, self.db.read_engine, enums={
+            "orientation": ("orientation_id", cats.BarcodeOrientation),
+        })
 
         return df
 
@@ -213,7 +230,7 @@ class PandasBP(DBBlueprint):
             models.Pool.experiment_id == experiment_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["status"] = cats.PoolStatus.map_series(df["status_id"], na_action="ignore")
 
         return df
@@ -239,7 +256,7 @@ class PandasBP(DBBlueprint):
             isouter=True
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         return df
 
     @DBBlueprint.transaction
@@ -253,7 +270,7 @@ class PandasBP(DBBlueprint):
             models.Lane.experiment_id == experiment_id
         ).order_by(models.Lane.number)
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         return df
 
     @DBBlueprint.transaction
@@ -278,7 +295,7 @@ class PandasBP(DBBlueprint):
             isouter=True
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         return df
 
     @DBBlueprint.transaction
@@ -296,7 +313,7 @@ class PandasBP(DBBlueprint):
         )
 
         query = query.order_by(models.Library.id)
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         return df
 
     @DBBlueprint.transaction
@@ -321,7 +338,7 @@ class PandasBP(DBBlueprint):
         )
 
         query = query.order_by(models.Library.id)
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         return df
 
     @DBBlueprint.transaction
@@ -338,7 +355,7 @@ class PandasBP(DBBlueprint):
             models.SeqRequest.id == seq_request
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["role"] = cats.UserRole.map_series(df["role_id"], na_action="ignore")
         return df
 
@@ -361,7 +378,7 @@ class PandasBP(DBBlueprint):
             models.links.LibraryFeatureLink.library_id == library_id
         ).distinct()
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["feature_type"] = cats.FeatureType.map_series(df["feature_type_id"], na_action="ignore")
         return df
 
@@ -376,7 +393,7 @@ class PandasBP(DBBlueprint):
             models.links.SampleLibraryLink.library_id == library_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         if expand_attributes:
             expanded = df["attributes"].apply(pd.Series)
             for col in expanded.columns:
@@ -397,7 +414,7 @@ class PandasBP(DBBlueprint):
             models.links.SampleLibraryLink.library_id == library_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         expanded = df["mux"].apply(pd.Series)
         for col in expanded.columns:
@@ -421,7 +438,7 @@ class PandasBP(DBBlueprint):
             models.Library.type_id == cats.LibraryType.PARSE_SC_CRISPR.id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         return df
 
@@ -462,7 +479,7 @@ class PandasBP(DBBlueprint):
 
         query = query.order_by(models.Library.id)
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         if include_indices and collapse_indicies:
             df = df.groupby(df.columns.difference(["sequence_i7", "sequence_i5", "name_i7", "name_i5"]).tolist(), as_index=False).agg({"sequence_i7": list, "sequence_i5": list, "name_i7": list, "name_i5": list}).copy().rename(
@@ -508,7 +525,7 @@ class PandasBP(DBBlueprint):
 
         query = query.order_by(models.Library.id)
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         df["library_type"] = cats.LibraryType.map_series(df["library_type_id"], na_action="ignore")
         df["genome_ref"] = cats.GenomeRef.map_series(df["genome_ref_id"], na_action="ignore")
@@ -535,7 +552,7 @@ class PandasBP(DBBlueprint):
             models.Project.id == models.Sample.project_id,
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         if not df.empty:
             expanded = df["attributes"].apply(pd.Series)
@@ -559,7 +576,7 @@ class PandasBP(DBBlueprint):
             isouter=True
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         df.loc[df["library_id"].isna(), "library_name"] = "Undetermined"
         df["library_id"] = df["library_id"].astype(pd.Int64Dtype())
@@ -579,7 +596,7 @@ class PandasBP(DBBlueprint):
             models.Barcode.index_kit_id == index_kit_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["name"] = df["name"].astype(str)
         df["well"] = df["well"].astype(str)
         df["type"] = cats.BarcodeType.map_series(df["type_id"], na_action="ignore")
@@ -683,7 +700,7 @@ class PandasBP(DBBlueprint):
             models.Feature.feature_kit_id == feature_kit_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["type"] = cats.FeatureType.map_series(df["type_id"], na_action="ignore")
 
         return df
@@ -708,7 +725,7 @@ class PandasBP(DBBlueprint):
             models.Feature.id == models.links.LibraryFeatureLink.feature_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["type"] = cats.FeatureType.map_series(df["type_id"], na_action="ignore")
 
         return df
@@ -742,7 +759,7 @@ class PandasBP(DBBlueprint):
             models.FeatureKit.id == models.Feature.feature_kit_id,
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["type"] = cats.FeatureType.map_series(df["type_id"], na_action="ignore")
 
         return df
@@ -775,7 +792,7 @@ class PandasBP(DBBlueprint):
                 models.Library.id == models.links.SampleLibraryLink.library_id,
             )
         
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         if not df.empty and pivot:
             expanded = df["attributes"].apply(pd.Series)
@@ -810,7 +827,7 @@ class PandasBP(DBBlueprint):
             models.Contact.id == models.SeqRequest.contact_person_id,
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["status"] = cats.SeqRequestStatus.map_series(df["status_id"], na_action="ignore")
         return df
 
@@ -841,14 +858,14 @@ class PandasBP(DBBlueprint):
             models.Library.id == models.links.SampleLibraryLink.library_id
         )
 
-        libraries = pd.read_sql(query, self.db._engine)
-        experiment_ids = libraries["experiment_id"].unique().tolist()
+        libraries = columnar.read_frame(query, self.db.read_engine, enums={
+            "mux_type": ("mux_type_id", cats.MUXType),
+            "genome_ref": ("genome_ref_id", cats.GenomeRef),
+            "library_type": ("library_type_id", cats.LibraryType),
+        })
+        experiment_ids = libraries["experiment_id"].dropna().unique().tolist()
         libraries_ids = libraries["library_id"].unique().tolist()
 
-        libraries["mux_type"] = cats.MUXType.map_series(libraries["mux_type_id"], na_action="ignore")
-        libraries["genome_ref"] = cats.GenomeRef.map_series(libraries["genome_ref_id"], na_action="ignore")
-        libraries["library_type"] = cats.LibraryType.map_series(libraries["library_type_id"], na_action="ignore")
-
         query = sa.select(
             models.Experiment.id.label("experiment_id"), models.Experiment.name.label("experiment_name"),
             models.Lane.number.label("lane"), models.Pool.id.label("pool_id"), models.Pool.name.label("pool_name"),
@@ -869,7 +886,7 @@ class PandasBP(DBBlueprint):
             models.Library.pool_id == models.Pool.id
         )
         
-        lanes = pd.read_sql(query, self.db._engine)
+        lanes = columnar.read_frame(query, self.db.read_engine)
         if collapse_lanes:
             order = [
                 "sample_name", "library_name", "sample_pool",
@@ -906,7 +923,7 @@ class PandasBP(DBBlueprint):
             models.Pool.id == models.Library.pool_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["status"] = cats.LibraryStatus.map_series(df["status_id"], na_action="ignore")
         df["library_type"] = cats.LibraryType.map_series(df["library_type_id"], na_action="ignore")
         df["genome_ref"] = cats.GenomeRef.map_series(df["genome_ref_id"], na_action="ignore")
@@ -938,7 +955,7 @@ class PandasBP(DBBlueprint):
             isouter=True
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["index_type"] = cats.IndexType.map_series(df["index_type_id"], na_action="ignore")
 
         return df
@@ -961,7 +978,7 @@ class PandasBP(DBBlueprint):
             models.Sample.id == models.links.SampleLibraryLink.sample_id,
         )
 
-        df = pd.read_sql(query, self.db._engine).sort_values(["library_id", "sample_id"])
+        df = pd.read_sql(query, self.db.read_engine).sort_values(["library_id", "sample_id"])
         df["library_type"] = cats.LibraryType.map_series(df["library_type_id"], na_action="ignore")
         df["mux_type"] = cats.MUXType.map_series(df["mux_type_id"], na_action="ignore")
 
@@ -974,34 +991,10 @@ class PandasBP(DBBlueprint):
             
         return df
 
-    @DBBlueprint.transaction
-    def query_barcode_sequences(self, sequence: str, limit: int = 10) -> pd.DataFrame:
-        query = sa.select(
-            models.Barcode.id.label("id"), models.Barcode.sequence.label("sequence"),
-            models.Barcode.well.label("well"), models.Barcode.name.label("name"),
-            models.Barcode.type_id.label("type_id"),
-            models.IndexKit.id.label("kit_id"), models.IndexKit.name.label("kit_name"),
-            models.IndexKit.identifier.label("kit_identifier"),
-        ).join(
-            models.IndexKit,
-            models.IndexKit.id == models.Barcode.index_kit_id
-        )
-
-        query = query.order_by(
-            sa.func.similarity(models.Barcode.sequence, sequence).desc()
-        ).limit(limit)
-
-        df = pd.read_sql(query, self.db._engine)
-        
-        def hamming_distance(str1: str, str2: str) -> int:
-            min_length = min(len(str1), len(str2))
-            distance = sum(c1 != c2 for c1, c2 in zip(str1[:min_length], str2[:min_length]))
-            distance += abs(len(str1) - len(str2))
-            return distance
-
-        df["hamming"] = df["sequence"].apply(lambda x: hamming_distance(x, sequence))
+    def query_barcode_sequences(self, sequence: str, limit: int = 10, max_distance: int | None = None) -> pd.DataFrame:
+        """ returns the `limit` barcodes with the smallest hamming distance to sequence """
+        df = self.db.barcode_index.query(sequence, limit=limit, max_distance=max_distance)
         df["type"] = cats.BarcodeType.map_series(df["type_id"], na_action="ignore")
-
         return df
     
     @DBBlueprint.transaction
@@ -1029,7 +1022,7 @@ class PandasBP(DBBlueprint):
             )
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["library_type"] = cats.LibraryType.map_series(df["library_type_id"], na_action="ignore")
         df["mux_type"] = cats.MUXType.map_series(df["mux_type_id"], na_action="ignore")
 
@@ -1062,7 +1055,7 @@ class PandasBP(DBBlueprint):
             models.Kit.id == models.links.ProtocolKitLink.kit_id
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         return df
     
     @DBBlueprint.transaction
@@ -1076,7 +1069,7 @@ class PandasBP(DBBlueprint):
         ).order_by(
             models.SeqQuality.lane
         )
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
 
         if expand_qc and not df.empty:
             expanded = df["qc"].apply(pd.Series)
@@ -1124,7 +1117,7 @@ class PandasBP(DBBlueprint):
         ).order_by(
             models.SeqQuality.lane
         )
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["library_id"] = df["library_id"].astype(pd.Int64Dtype())
 
         if expand_qc and not df.empty:
@@ -1158,7 +1151,7 @@ class PandasBP(DBBlueprint):
             models.links.SeqRequestDeliveryEmailLink.seq_request_id == seq_request
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["status"] = cats.DeliveryStatus.map_series(df["status_id"], na_action="ignore")
 
         return df
@@ -1181,7 +1174,7 @@ class PandasBP(DBBlueprint):
                 )
             ).scalar_subquery()
         )
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["status"] = cats.DeliveryStatus.map_series(df["status_id"], na_action="ignore")
         return df
     
@@ -1204,7 +1197,7 @@ class PandasBP(DBBlueprint):
             isouter=True
         )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["pool_id"] = df["pool_id"].astype(pd.Int64Dtype())
 
         stats = df.groupby(
@@ -1221,7 +1214,7 @@ class PandasBP(DBBlueprint):
             models.links.LanePoolLink.experiment_id == experiment_id
         )
 
-        planned_reads_df = pd.read_sql(query, self.db._engine)
+        planned_reads_df = pd.read_sql(query, self.db.read_engine)
         planned_reads_df["pool_id"] = planned_reads_df["pool_id"].astype(pd.Int64Dtype())
         planned_reads = planned_reads_df.groupby(
             ["pool_id"], dropna=False
@@ -1247,40 +1240,13 @@ class PandasBP(DBBlueprint):
         
         return stats
     
-    @DBBlueprint.transaction
     def match_barcodes_to_kit(self, sequences: list[str], barcode_type: cats.BarcodeType, index_type: cats.IndexType | None = None) -> pd.DataFrame:
-        unique_sequences = list(set(sequences))
-        num_sequences = len(unique_sequences)
-        
-        if num_sequences == 0:
+        if len(sequences) == 0:
             return pd.DataFrame()
 
-        # Subquery to find IDs of kits that contain all requested sequences
-        matched_kits_query = (
-            sa.select(models.Barcode.index_kit_id)
-            .where(
-                models.Barcode.type_id == barcode_type.id,
-                models.Barcode.sequence.in_(unique_sequences)
-            )
-            .group_by(models.Barcode.index_kit_id)
-            .having(sa.func.count(sa.distinct(models.Barcode.sequence)) == num_sequences)
-        ).scalar_subquery()
-
-        # Final query to fetch kit metadata for those IDs
-        query = sa.select(
-            models.IndexKit.id.label("kit_id"),
-            models.IndexKit.name.label("kit_name"),
-            models.IndexKit.identifier.label("kit_identifier"),
-        ).where(
-            models.IndexKit.id.in_(matched_kits_query),
+        return self.db.barcode_index.match_kits(
+            sequences, barcode_type.id, index_type_id=index_type.id if index_type is not None else None
         )
-        if index_type is not None:
-            query = query.where(
-                models.IndexKit.type_id == index_type.id
-            )
-
-        df = pd.read_sql(query, self.db._engine)
-        return df
     
     @DBBlueprint.transaction
     def get_library_properties(self, project_id: int | None = None, seq_request_id: int | None = None, expand_properties: bool = True) -> pd.DataFrame:
@@ -1308,7 +1274,7 @@ class PandasBP(DBBlueprint):
                 models.Sample.project_id == project_id
             )
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         if expand_properties and not df.empty:
             expanded = df["properties"].apply(pd.Series)
             for col in expanded.columns:
@@ -1336,7 +1302,7 @@ class PandasBP(DBBlueprint):
         if library_id is not None:
             query = query.where(models.Library.id == library_id)
 
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         df["library_type"] = cats.LibraryType.map_series(df["library_type_id"])
         df["pool_type"] = cats.PoolType.map_series(df["pool_type_id"])
         if expand and not df.empty:
@@ -1350,7 +1316,7 @@ class PandasBP(DBBlueprint):
 
     @DBBlueprint.transaction
     def query(self, query: sa.Select | str) -> pd.DataFrame:
-        df = pd.read_sql(query, self.db._engine)
+        df = pd.read_sql(query, self.db.read_engine)
         return df
     
         
\ No newline at end of file
@@ -1,4 +1,3 @@
-import math
 import string
 from typing import Optional, Sequence, Callable
 
@@ -9,7 +8,7 @@ from sqlalchemy.orm import Query
 from ...categories import PoolStatus, PoolType, AccessType, UserRole, LibraryType
 from ... import PAGE_LIMIT, models
 from .. import exceptions
-from ..DBBlueprint import DBBlueprint
+from ..DBBlueprint import DBBlueprint, Keyset
 
 
 class PoolBP(DBBlueprint):
@@ -168,7 +167,7 @@ class PoolBP(DBBlueprint):
         custom_query: Callable[[Query], Query] | None = None,
         sort_by: str | None = None, descending: bool = False,
         limit: int | None = PAGE_LIMIT, offset: int | None = None,
-        page: int | None = None,
+        page: int | None = None, cursor: str | None = None,
         options: ExecutableOption | None = None,
     ) -> tuple[list[models.Pool], int | None]:
 
@@ -191,41 +190,27 @@ class PoolBP(DBBlueprint):
         if options is not None:
             query = query.options(options)
 
+        keyset = None
         if sort_by is not None:
-            attr = getattr(models.Pool, sort_by)
-            if descending:
-                attr = attr.desc()
-            query = query.order_by(attr)
+            keyset = Keyset(models.Pool, sort_by, descending)
+            query = query.order_by(*keyset.order_by())
 
         if name is not None:
-            query = query.order_by(sa.nulls_last(sa.func.similarity(models.Pool.name, name).desc()))
+            keyset = None
+            query = self.fuzzy_search(query, name, models.Pool.name)
         elif owner is not None:
+            keyset = None
             query = query.join(
                 models.User,
                 models.User.id == models.Pool.owner_id
-            ).order_by(
-                sa.nulls_last(sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, owner).desc())
             )
+            query = self.fuzzy_search(query, owner, models.User.full_name())
         elif id is not None:
             query = query.where(models.Pool.id == id)
-        
-        if offset is not None:
-            query = query.offset(offset)
-
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if limit is not None:
-            query = query.limit(limit)
 
-        pools = query.all()
+        pools, n_pages = self.paginate(
+            query, limit=limit, page=page, offset=offset, keyset=keyset, cursor=cursor
+        )
         return pools, n_pages
 
     @DBBlueprint.transaction
@@ -309,9 +294,7 @@ class PoolBP(DBBlueprint):
                 models.Pool.status_id.in_([s.id for s in status_in])
             )
 
-        query = query.order_by(
-            sa.func.similarity(models.Pool.name, name).desc()
-        )
+        query = self.fuzzy_search(query, name, models.Pool.name)
 
         if limit is not None:
             query = query.limit(limit)
@@ -362,23 +345,7 @@ class PoolBP(DBBlueprint):
                 attr = attr.desc()
             query = query.order_by(attr)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        dilutions = query.all()
+        dilutions, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return dilutions, n_pages
 
     @DBBlueprint.transaction
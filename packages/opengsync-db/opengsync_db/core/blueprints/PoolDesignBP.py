@@ -1,4 +1,3 @@
-import math
 from typing import Callable
 
 import sqlalchemy as sa
@@ -116,23 +115,7 @@ class PoolDesignBP(DBBlueprint):
                 attr = attr.desc()
             query = query.order_by(sa.nulls_last(attr))
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        pool_designs = query.all()
+        pool_designs, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
 
         return pool_designs, n_pages
 
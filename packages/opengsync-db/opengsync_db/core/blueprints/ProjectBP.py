@@ -1,4 +1,3 @@
-import math
 from typing import Optional, Callable, Iterator
 
 import sqlalchemy as sa
@@ -167,40 +166,18 @@ class ProjectBP(DBBlueprint):
             query = query.order_by(sa.nulls_last(attr))
 
         if identifier is not None:
-            query = query.order_by(sa.nulls_last(sa.func.similarity(models.Project.identifier, identifier).desc()))
+            query = self.fuzzy_search(query, identifier, models.Project.identifier)
         elif title is not None:
-            query = query.order_by(sa.func.similarity(models.Project.title, title).desc())
+            query = self.fuzzy_search(query, title, models.Project.title)
         elif id is not None:
             query = query.where(models.Project.id == id)
         elif identifier_title is not None:
-            query = query.order_by(
-                sa.nulls_last(sa.func.greatest(
-                    sa.func.similarity(models.Project.title, identifier_title),
-                    sa.func.similarity(models.Project.identifier, identifier_title)
-                ).desc())
-            )
+            query = self.fuzzy_search(query, identifier_title, models.Project.title, models.Project.identifier)
         elif owner_name is not None:
-            query = query.join(models.User, models.Project.owner_id == models.User.id).order_by(
-                sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, owner_name).desc()
-            )
-
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
+            query = query.join(models.User, models.Project.owner_id == models.User.id)
+            query = self.fuzzy_search(query, owner_name, models.User.full_name())
 
-        projects = query.all()
+        projects, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
 
         return projects, n_pages
     
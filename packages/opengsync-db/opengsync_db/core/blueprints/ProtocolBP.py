@@ -1,4 +1,3 @@
-import math
 from typing import Optional
 
 import sqlalchemy as sa
@@ -69,25 +68,9 @@ class ProtocolBP(DBBlueprint):
         if name is not None:
             query = query.order_by(sa.nulls_last(sa.func.similarity(models.Protocol.name, name).desc()))
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
         self.db.debug(page)
 
-        if limit is not None:
-            query = query.limit(limit)
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        res = query.all()
+        res, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
 
         return res, n_pages
 
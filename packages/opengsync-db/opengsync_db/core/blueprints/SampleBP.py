@@ -1,4 +1,3 @@
-import math
 from typing import Optional, Callable
 
 import sqlalchemy as sa
@@ -8,7 +7,7 @@ from sqlalchemy.sql.base import ExecutableOption
 from ... import models, PAGE_LIMIT
 from ...categories import SampleStatus, AttributeType, AttributeType, AccessType, AccessType, UserRole
 from .. import exceptions
-from ..DBBlueprint import DBBlueprint
+from ..DBBlueprint import DBBlueprint, Keyset
 
 
 class SampleBP(DBBlueprint):
@@ -120,7 +119,7 @@ class SampleBP(DBBlueprint):
         name: str | None = None,
         id: int | None = None,
         limit: int | None = PAGE_LIMIT, offset: int | None = None,
-        page: int | None = None,
+        page: int | None = None, cursor: str | None = None,
         sort_by: str | None = None, descending: bool = False,
         options: ExecutableOption | None = None
     ) -> tuple[list[models.Sample], int | None]:
@@ -134,34 +133,20 @@ class SampleBP(DBBlueprint):
         if options is not None:
             query = query.options(options)
 
+        keyset = None
         if sort_by is not None:
-            attr = getattr(models.Sample, sort_by)
-            if descending:
-                attr = attr.desc()
-            query = query.order_by(attr)
+            keyset = Keyset(models.Sample, sort_by, descending)
+            query = query.order_by(*keyset.order_by())
         
         if name is not None:
-            query = query.order_by(sa.nulls_last(sa.func.similarity(models.Sample.name, name).desc()))
+            keyset = None
+            query = self.fuzzy_search(query, name, models.Sample.name)
         elif id is not None:
             query = query.where(models.Sample.id == id)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        samples = query.all()
+        samples, n_pages = self.paginate(
+            query, limit=limit, page=page, offset=offset, keyset=keyset, cursor=cursor
+        )
         return samples, n_pages
 
     @DBBlueprint.transaction
@@ -211,9 +196,7 @@ class SampleBP(DBBlueprint):
             pool_id=pool_id, seq_request_id=seq_request_id, status=status, status_in=status_in
         )
 
-        query = query.order_by(
-            sa.func.similarity(models.Sample.name, word).desc()
-        )
+        query = self.fuzzy_search(query, word, models.Sample.name)
 
         if limit is not None:
             query = query.limit(limit)
@@ -1,4 +1,3 @@
-import math
 from datetime import datetime
 from typing import Optional, Literal, Callable, Iterator
 
@@ -15,7 +14,7 @@ from ...categories import (
     ProjectStatus, UserRole, LibraryType
 )
 from .. import exceptions
-from ..DBBlueprint import DBBlueprint
+from ..DBBlueprint import DBBlueprint, Keyset
 
 
 class SeqRequestBP(DBBlueprint):
@@ -179,7 +178,7 @@ class SeqRequestBP(DBBlueprint):
         custom_query: Callable[[Query], Query] | None = None,
         limit: int | None = PAGE_LIMIT, offset: int | None = None,
         sort_by: str | None = None, descending: bool = False,
-        page: int | None = None,
+        page: int | None = None, cursor: str | None = None,
         options: ExecutableOption | None = None,
     ) -> tuple[list[models.SeqRequest], int | None]:
         query = self.db.session.query(models.SeqRequest)
@@ -191,49 +190,34 @@ class SeqRequestBP(DBBlueprint):
         if options is not None:
             query = query.options(options)
 
+        keyset = None
         if sort_by is not None:
-            attr = getattr(models.SeqRequest, sort_by)
-            if descending:
-                attr = attr.desc()
-
-            query = query.order_by(sa.nulls_last(attr))
+            keyset = Keyset(models.SeqRequest, sort_by, descending, nulls_last=True)
+            query = query.order_by(*keyset.order_by())
 
         if name is not None:
-            query = query.order_by(sa.nulls_last(sa.func.similarity(models.SeqRequest.name, name).desc()))
+            keyset = None
+            query = self.fuzzy_search(query, name, models.SeqRequest.name)
         elif requestor_name is not None:
+            keyset = None
             query = query.join(
                 models.User,
                 models.User.id == models.SeqRequest.requestor_id
-            ).order_by(
-                sa.nulls_last(sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, requestor_name).desc())
             )
+            query = self.fuzzy_search(query, requestor_name, models.User.full_name())
         elif group is not None:
+            keyset = None
             query = query.join(
                 models.Group,
                 models.Group.id == models.SeqRequest.group_id
-            ).order_by(
-                sa.nulls_last(sa.func.similarity(models.Group.name, group).desc())
             )
+            query = self.fuzzy_search(query, group, models.Group.name)
         elif id is not None:
             query = query.where(models.SeqRequest.id == id)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        seq_requests = query.all()
+        seq_requests, n_pages = self.paginate(
+            query, limit=limit, page=page, offset=offset, keyset=keyset, cursor=cursor
+        )
 
         return seq_requests, n_pages
 
@@ -299,25 +283,19 @@ class SeqRequestBP(DBBlueprint):
         query = SeqRequestBP.where(query, status_in=status_in, show_drafts=show_drafts, user_id=user_id, group_id=group_id, status=status)
 
         if name is not None:
-            query = query.order_by(
-                sa.func.similarity(models.SeqRequest.name, name).desc()
-            )
+            query = self.fuzzy_search(query, name, models.SeqRequest.name)
         elif requestor is not None:
             query = query.join(
                 models.User,
                 models.User.id == models.SeqRequest.requestor_id
             )
-            query = query.order_by(
-                sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, requestor).desc()
-            )
+            query = self.fuzzy_search(query, requestor, models.User.full_name())
         elif group is not None:
             query = query.join(
                 models.Group,
                 models.Group.id == models.SeqRequest.group_id
             )
-            query = query.order_by(
-                sa.func.similarity(models.Group.name, group).desc()
-            )
+            query = self.fuzzy_search(query, group, models.Group.name)
         else:
             raise ValueError("Either 'name', 'requestor', or 'group' must be provided.")
 
@@ -327,6 +305,37 @@ class SeqRequestBP(DBBlueprint):
         seq_requests = query.all()
         return seq_requests
 
+    @DBBlueprint.transaction
+    def get_overview_graph(self, seq_request_id: int) -> list[sa.Row]:
+        """ project -> sample -> library -> pool edges of the request's libraries, one row per sample-library link,
+        ordered by sample and library id, with the total number of samples linked to each library """
+        query = sa.select(
+            models.Sample.project_id.label("project_id"), models.Project.title.label("project_title"),
+            models.Sample.id.label("sample_id"), models.Sample.name.label("sample_name"),
+            models.Library.id.label("library_id"), models.Library.type_id.label("library_type_id"),
+            models.Library.pool_id.label("pool_id"), models.Pool.name.label("pool_name"),
+            sa.func.count().over(partition_by=models.Library.id).label("library_num_samples"),
+        ).select_from(
+            models.links.SampleLibraryLink
+        ).join(
+            models.Library,
+            models.Library.id == models.links.SampleLibraryLink.library_id
+        ).join(
+            models.Sample,
+            models.Sample.id == models.links.SampleLibraryLink.sample_id
+        ).join(
+            models.Project,
+            models.Project.id == models.Sample.project_id
+        ).join(
+            models.Pool,
+            models.Pool.id == models.Library.pool_id,
+            isouter=True
+        ).where(
+            models.Library.seq_request_id == seq_request_id
+        ).order_by(models.Sample.id, models.Library.id)
+
+        return list(self.db.session.execute(query).all())
+
     @DBBlueprint.transaction
     def add_share_email(self, seq_request_id: int, email: str) -> models.SeqRequest:
         if (seq_request := self.db.session.get(models.SeqRequest, seq_request_id)) is None:
@@ -1,4 +1,3 @@
-import math
 from typing import Optional, TYPE_CHECKING, Callable
 
 import sqlalchemy as sa
@@ -141,29 +140,13 @@ class SeqRunBP(DBBlueprint):
         if id is not None:
             query = query.where(models.SeqRun.id == id)
         if experiment is not None:
-            query = query.order_by(sa.nulls_last(sa.func.similarity(models.SeqRun.experiment_name, experiment).desc()))
+            query = self.fuzzy_search(query, experiment, models.SeqRun.experiment_name)
         elif run_folder is not None:
             query = query.order_by(sa.nulls_last(sa.func.similarity(models.SeqRun.run_folder, run_folder).desc()))
         elif flow_cell_id is not None:
             query = query.where(models.SeqRun.flowcell_id == flow_cell_id)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        seq_runs = query.all()
+        seq_runs, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return seq_runs, n_pages
 
     @DBBlueprint.transaction
@@ -173,9 +156,7 @@ class SeqRunBP(DBBlueprint):
     @DBBlueprint.transaction
     def query(self, word: str, limit: int | None = PAGE_LIMIT) -> list[models.SeqRun]:
         query = self.db.session.query(models.SeqRun)
-        query = query.order_by(
-            sa.func.similarity(models.SeqRun.experiment_name, word).desc()
-        )
+        query = self.fuzzy_search(query, word, models.SeqRun.experiment_name)
 
         if limit is not None:
             query = query.limit(limit)
@@ -1,4 +1,3 @@
-import math
 from typing import Optional
 
 import sqlalchemy as sa
@@ -65,23 +64,7 @@ class SequencerBP(DBBlueprint):
         if id is not None:
             query = query.where(models.Sequencer.id == id)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        sequencers = query.all()
+        sequencers, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return sequencers, n_pages
 
     @DBBlueprint.transaction
@@ -1,4 +1,3 @@
-import math
 from typing import Callable
 
 import sqlalchemy as sa
@@ -183,27 +182,11 @@ class UserBP(DBBlueprint):
             query = query.order_by(attr)
         
         if name is not None:
-            query = query.order_by(sa.nulls_last(sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, name).desc()))
+            query = self.fuzzy_search(query, name, models.User.full_name())
         elif id is not None:
             query = query.where(models.User.id == id)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if offset is not None:
-            query = query.offset(offset)
-
-        if limit is not None:
-            query = query.limit(limit)
-
-        users = query.all()
+        users, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
 
         return users, n_pages
 
@@ -262,9 +245,7 @@ class UserBP(DBBlueprint):
                 models.User.role_id.in_([role.id for role in role_in])
             )
 
-        query = query.order_by(
-            sa.func.similarity(models.User.first_name + ' ' + models.User.last_name, word).desc()
-        )
+        query = self.fuzzy_search(query, word, models.User.full_name())
 
         if limit is not None:
             query = query.limit(limit)
@@ -319,26 +300,10 @@ class UserBP(DBBlueprint):
             query = query.join(
                 models.Group,
                 models.Group.id == models.links.UserAffiliation.group_id
-            ).order_by(
-                sa.nulls_last(sa.func.similarity(models.Group.name, group_name).desc())
             )
+            query = self.fuzzy_search(query, group_name, models.Group.name)
 
-        if page is not None:
-            if not limit:
-                raise ValueError("Limit must be provided when page is provided")
-            
-            count = query.count()
-            n_pages = math.ceil(count / limit)
-            query = query.offset(min(page, max(0, n_pages - 1)) * limit)
-        else:
-            n_pages = None
-
-        if limit is not None:
-            query = query.limit(limit)
-        if offset is not None:
-            query = query.offset(offset)
-
-        res = query.all()
+        res, n_pages = self.paginate(query, limit=limit, page=page, offset=offset)
         return res, n_pages
 
     @DBBlueprint.transaction
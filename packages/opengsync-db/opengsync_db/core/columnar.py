@@ -0,0 +1,102 @@
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import sqlalchemy as sa
+
+from ..categories.ExtendedEnum import ExtendedEnum
+
+BATCH_SIZE = 10_000
+
+# enum column name -> (id column, enum)
+EnumColumns = dict[str, tuple[str, type[ExtendedEnum]]]
+
+# the dtypes pd.read_sql infers: int64 (float64 with NaN if nullable), bool (object with None if nullable), str
+_PANDAS_TYPES = {
+    pa.string(): pd.StringDtype(na_value=np.nan),
+}
+
+# typed=True: nullable extension dtypes with NA instead of float/object columns, arrow backed strings
+_TYPED_PANDAS_TYPES = {
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.string(): pd.StringDtype("pyarrow", na_value=np.nan),
+}
+
+
+def arrow_type(type_: sa.types.TypeEngine) -> pa.DataType | None:
+    """ arrow type of a column, None for columns kept as python objects (json, dates, decimals, enums, ...) """
+    if isinstance(type_, sa.Boolean):
+        return pa.bool_()
+    if isinstance(type_, sa.Integer):
+        return pa.int64()
+    if isinstance(type_, sa.Float):
+        return pa.float64()
+    if isinstance(type_, sa.String) and not isinstance(type_, sa.Enum):
+        return pa.string()
+    return None
+
+
+def _record_batch(names: list[str], types: list[pa.DataType | None], rows: list, typed: bool = False) -> pd.DataFrame:
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    arrays, arrow_names, objects = [], [], {}
+    for name, type_, values in zip(names, types, columns):
+        # like pd.read_sql, a column without any value stays object (typed columns keep their dtype)
+        if type_ is not None and (typed or any(value is not None for value in values)):
+            try:
+                arrays.append(pa.array(values, type=type_))
+                arrow_names.append(name)
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+                pass
+        objects[name] = pd.Series(list(values), dtype=object if not values else None)
+
+    types_mapper = (_TYPED_PANDAS_TYPES if typed else _PANDAS_TYPES).get
+    df = pa.RecordBatch.from_arrays(arrays, names=arrow_names).to_pandas(types_mapper=types_mapper) if arrays else pd.DataFrame(index=pd.RangeIndex(len(rows)))
+    for name, series in objects.items():
+        df[name] = series
+    return df[names]
+
+
+def _add_enums(df: pd.DataFrame, enums: EnumColumns | None, typed: bool = False) -> pd.DataFrame:
+    for name, (id_column, enum) in (enums or {}).items():
+        if not typed:
+            df[name] = enum.map_series(df[id_column], na_action="ignore")
+            continue
+        categorical = enum.to_categorical(df[id_column])
+        if (invalid := (categorical.codes == -1) & df[id_column].notna().to_numpy()).any():
+            raise ValueError(f"{df[id_column][invalid].iloc[0]} is not a valid {enum.__name__}")
+        df[name] = pd.Series(categorical, index=df.index)
+    return df
+
+
+def iter_frames(
+    query: sa.Select, engine: sa.Engine, enums: EnumColumns | None = None, batch_size: int = BATCH_SIZE,
+    typed: bool = False
+) -> Iterator[pd.DataFrame]:
+    """ streams the query result through a server side cursor and yields DataFrames of up to `batch_size` rows,
+    see `read_frame` for the dtypes """
+    names = [column.name for column in query.selected_columns]
+    types = [arrow_type(column.type) for column in query.selected_columns]
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        empty = True
+        for rows in result.partitions():
+            empty = False
+            yield _add_enums(_record_batch(names, types, rows, typed=typed), enums, typed=typed)
+        if empty:
+            yield _add_enums(_record_batch(names, types, [], typed=typed), enums, typed=typed)
+
+
+def read_frame(
+    query: sa.Select, engine: sa.Engine, enums: EnumColumns | None = None, batch_size: int = BATCH_SIZE,
+    typed: bool = False
+) -> pd.DataFrame:
+    """ streamed alternative to pd.read_sql with the same dtypes, enum columns mapped with `map_series`.
+    `typed=True` returns nullable Int64/boolean and arrow string columns and categorical enum columns instead,
+    which use a fraction of the memory of float/object columns """
+    frames = list(iter_frames(query, engine, enums=enums, batch_size=batch_size, typed=typed))
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
@@ -1,8 +1,126 @@
+import threading
+import weakref
+from typing import Callable, Iterable
+
 import sqlalchemy as sa
 from sqlalchemy import event
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
 
 from .. import models
+from ..models.Base import Base
+
+# Cache tags are '<table>' for the entity type and '<table>:<pk>' for a single row.
+# Reads that cannot be attributed to tables (raw SQL) are tagged with UNTRACKED_TAG.
+UNTRACKED_TAG = "*"
+
+_local = threading.local()
+_commit_hooks: list[weakref.WeakMethod] = []
+
+
+def table_tag(obj: Base) -> str:
+    return obj.__tablename__  # type: ignore[attr-defined]
+
+
+def entity_tag(obj: Base) -> str | None:
+    pk = sa.inspect(obj).mapper.primary_key_from_instance(obj)
+    if any(value is None for value in pk):
+        return None
+    return f"{table_tag(obj)}:{'-'.join(str(value) for value in pk)}"
+
+
+def start_read_tracking() -> None:
+    _local.read_tags = set()
+
+
+def stop_read_tracking() -> set[str]:
+    tags = getattr(_local, "read_tags", None)
+    _local.read_tags = None
+    return tags or set()
+
+
+def register_commit_hook(hook: Callable[[set[str]], None]) -> None:
+    """ bound method hook is called with the write tags of every commit that modified the db """
+    _commit_hooks.append(weakref.WeakMethod(hook))  # type: ignore[arg-type]
+
+
+def _track_read(tags: Iterable[str | None]) -> None:
+    if (read_tags := getattr(_local, "read_tags", None)) is None:
+        return
+    read_tags.update(tag for tag in tags if tag is not None)
+
+
+@event.listens_for(sa.engine.Engine, "before_cursor_execute")
+def track_selected_tables(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, "read_tags", None) is None:
+        return
+    if context.isinsert or context.isupdate or context.isdelete or context.isddl:
+        return
+    
+    if context.compiled is None or not isinstance(context.compiled.statement, sa.sql.Selectable):
+        _track_read([UNTRACKED_TAG])
+        return
+    
+    _track_read(
+        table.name for table in find_tables(context.compiled.statement, include_joins=True, include_aliases=True)
+        if isinstance(table, sa.Table)
+    )
+
+
+@event.listens_for(Base, "load", propagate=True)
+def track_loaded_instance(target, context):
+    _track_read([table_tag(target), entity_tag(target)])
+
+
+@event.listens_for(Base, "refresh", propagate=True)
+def track_refreshed_instance(target, context, attrs):
+    _track_read([table_tag(target), entity_tag(target)])
+
+
+@event.listens_for(Session, "after_flush")
+def collect_write_tags(session: Session, flush_context):
+    tags: set[str] = session.info.setdefault("pending_write_tags", set())
+    # inserts and deletes change collections -> invalidate everything that read the table
+    for obj in list(session.new) + list(session.deleted):
+        tags.add(table_tag(obj))
+        if (tag := entity_tag(obj)) is not None:
+            tags.add(tag)
+
+    # updates can move rows between filters and change counts/aggregates over the table
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        tags.add(table_tag(obj))
+        if (tag := entity_tag(obj)) is not None:
+            tags.add(tag)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_bulk_write_tags(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if isinstance(table, sa.Table):
+        orm_execute_state.session.info.setdefault("pending_write_tags", set()).add(table.name)
+    else:
+        orm_execute_state.session.info.setdefault("pending_write_tags", set()).add(UNTRACKED_TAG)
+
+
+@event.listens_for(Session, "after_commit")
+def commit_write_tags(session: Session):
+    if (pending := session.info.pop("pending_write_tags", None)):
+        session.info.setdefault("write_tags", set()).update(pending)
+        for ref in list(_commit_hooks):
+            if (hook := ref()) is None:
+                _commit_hooks.remove(ref)
+            else:
+                hook(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_write_tags(session: Session):
+    session.info.pop("pending_write_tags", None)
+
 
 
 # @event.listens_for(Session, "before_flush")
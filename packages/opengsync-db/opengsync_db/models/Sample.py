@@ -173,4 +173,12 @@ class Sample(Base):
     def delete_sample_attribute(self, key: str):
         if self._attributes is None or key not in self._attributes:
             raise KeyError(f"Attribute '{key}' does not exist.")
-        del self._attributes[key]
\ No newline at end of file
+        del self._attributes[key]
+
+    __table_args__ = (
+        sa.Index(
+            "trgm_sample_name_idx",
+            sa.text("lower(name) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+    )
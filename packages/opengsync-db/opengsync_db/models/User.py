@@ -220,6 +220,11 @@ class User(Base, UserMixin):
             (cls.first_name + " " + cls.last_name)  # type: ignore[arg-type]
         ).correlate(cls).scalar_subquery()
 
+    @classmethod
+    def full_name(cls) -> sa.ColumnElement[str]:
+        """ `first_name || ' ' || last_name`, the expression of `trgm_lims_user_full_name_idx` """
+        return cls.first_name.op("||")(sa.literal_column("' '")).op("||")(cls.last_name)
+
     def search_value(self) -> int:
         return self.id
     
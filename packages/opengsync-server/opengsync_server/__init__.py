@@ -26,6 +26,9 @@ from opengsync_db import DBHandler
 from .core.LogBuffer import log_buffer
 from .tools import RedisMSFFileCache
 from .core.FlashCache import FlashCache
+from .core.TaskMetrics import TaskMetrics
+from .core.RouteCacheTags import RouteCacheTags
+from .core.ShareTreeCache import ShareTreeCache
 from .core.FileHandler import FileHandler
 from .tools import MailHandler
 
@@ -54,9 +57,12 @@ mail_handler = MailHandler()
 
 db = DBHandler(logger=logger, expire_on_commit=True, auto_open=False)
 route_cache = Cache()
+route_cache_tags = RouteCacheTags()
+share_tree_cache = ShareTreeCache()
 msf_cache = RedisMSFFileCache()
 session_cache = redis.Redis(host="redis-cache", port=int(os.environ["REDIS_PORT"]), db=3)
 flash_cache = FlashCache()
+task_metrics = TaskMetrics()
 file_handler = FileHandler()
 
 limiter = Limiter(
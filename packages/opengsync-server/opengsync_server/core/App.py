@@ -4,6 +4,7 @@ from uuid import uuid4
 from pathlib import Path
 import time
 
+import redis
 import pandas as pd
 
 from flask import (
@@ -17,7 +18,7 @@ from jinja2 import StrictUndefined
 from flask_session import Session
 from flask_session.base import ServerSideSession
 
-from opengsync_db import categories, models, TIMEZONE, __version__ as db_version
+from opengsync_db import categories, models, DBHandler, PoolConfig, ReadPolicy, TIMEZONE, __version__ as db_version
 from opengsync_db.core import units
 from opengsync_api import __version__ as api_version
 
@@ -26,8 +27,11 @@ from .. import (
     logger,
     log_buffer,
     route_cache,
+    route_cache_tags,
+    share_tree_cache,
     msf_cache,
     flash_cache,
+    task_metrics,
     session_cache,
     DEBUG,
     SECRET_KEY,
@@ -45,6 +49,7 @@ from ..tools.utils import WeekTimeWindow
 from .. import routes
 from .. import tools
 from ..core import runtime
+from .SessionInterface import UserIndexedRedisSessionInterface
 
 
 class App(Flask):
@@ -121,8 +126,11 @@ class App(Flask):
                 "CACHE_REDIS_URL": f"redis://redis-cache:{REDIS_PORT}/0",
             },
         )
+        route_cache_tags.connect("redis-cache", REDIS_PORT, 0)
+        share_tree_cache.connect("redis-cache", REDIS_PORT, 0)
         msf_cache.connect("redis-cache", REDIS_PORT, 1)
         flash_cache.connect("redis-cache", REDIS_PORT, 2)
+        task_metrics.connect("redis-cache", REDIS_PORT, 5)
 
         for file_type in categories.MediaFileType.as_list():
             if file_type.dir is None:
@@ -145,6 +153,10 @@ class App(Flask):
         self.config["SESSION_COOKIE_SAMESITE"] = "Lax"  # CSRF protection
 
         Session(self)
+        self.session_interface = UserIndexedRedisSessionInterface(
+            app=self, client=session_cache, use_signer=True, permanent=True,
+        )
+        self.session_interface.start_index_migration()
 
         htmx.init_app(self)
         bcrypt.init_app(self)
@@ -156,14 +168,30 @@ class App(Flask):
             smtp_user=os.environ["MAIL_USER"],
             sender_address=os.environ["MAIL_SENDER"],
             smtp_password=os.environ["MAIL_PASSWORD"],
+            outbox=redis.Redis(host="redis-cache", port=REDIS_PORT, db=5),
+            db=db,
         )
 
+        if (replica_host := os.environ.get("POSTGRES_REPLICA_HOST")):
+            replica_url = DBHandler.AdminURL(
+                user=os.environ["POSTGRES_USER"],
+                password=os.environ["POSTGRES_PASSWORD"],
+                host=replica_host,
+                port=os.environ.get("POSTGRES_REPLICA_PORT") or os.environ["POSTGRES_PORT"],
+                db=os.environ["POSTGRES_DB"],
+            )
+        else:
+            replica_url = None
+
         db.connect(
             user=os.environ["POSTGRES_USER"],
             password=os.environ["POSTGRES_PASSWORD"],
             host=os.environ["POSTGRES_HOST"],
             port=os.environ["POSTGRES_PORT"],
             db=os.environ["POSTGRES_DB"],
+            pool_config=PoolConfig.from_dict(opengsync_config.get("db")),
+            replica_url=replica_url,
+            read_policy=ReadPolicy.from_dict(opengsync_config.get("db", {}).get("replica")),
         )
 
         if windows := opengsync_config.get("sample_submission_windows"):
@@ -189,12 +217,15 @@ class App(Flask):
             g.start_time = time.time()
             log_buffer.start(f"{request.method} -> {request.path}")
             db.open_session()
+            db.last_write = runtime.session.get("db_last_write")
 
         @self.teardown_request
         def teardown_request(exception):
             if db._session is not None:
-                if db.close_session(commit=True, rollback=runtime.session.pop("rollback", False)):
-                    route_cache.clear()
+                db.close_session(commit=True, rollback=runtime.session.pop("rollback", False))
+                if (cache_keys := route_cache_tags.invalidate(db.pop_write_tags())):
+                    route_cache.delete_many(*cache_keys)
+            msf_cache.flush_sessions()
             log_buffer.flush()
 
         @self.after_request
@@ -394,25 +425,5 @@ class App(Flask):
             "html": html,
         }
 
-    def delete_user_sessions(self, user_id: int) -> str:
-        lua_script = """
-        local keys_to_delete = {}
-        local session_keys = redis.call('KEYS', 'session:*')
-
-        for i, key in ipairs(session_keys) do
-            local session_data = redis.call('GET', key)
-            if session_data then
-                if string.find(session_data, '_user_id') and string.find(session_data, tostring(ARGV[1])) then
-                    table.insert(keys_to_delete, key)
-                end
-            end
-        end
-
-        if #keys_to_delete > 0 then
-            redis.call('DEL', unpack(keys_to_delete))
-        end
-
-        return #keys_to_delete
-        """
-        deleted_count = session_cache.eval(lua_script, 0, str(user_id))
-        return deleted_count  # type: ignore
+    def delete_user_sessions(self, user_id: int) -> int:
+        return self.session_interface.revoke_user_sessions(user_id)  # type: ignore
@@ -1,6 +1,13 @@
 import os
+import sys
+import atexit
+import queue
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Callable
 import json
 
 DEFAULT_FMT = """{time}:
@@ -10,15 +17,39 @@ DEFAULT_FMT = """{time}:
 """
 
 
+@dataclass
+class LogBufferMetrics:
+    queue_depth: int
+    dropped_records: int
+
+
+@dataclass
+class _Session:
+    name: str | None
+    records: list[str]
+    time: datetime
+
+
 class LogBuffer:
+    """ Buffers log records per request (context-local) and writes them to the daily log files from a background thread. """
     log_dir: Path | None
 
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, max_queue_size: int = 10_000, batch_size: int = 256):
         self.log_dir = None
-        self.buffer: list[str] | None = None
-        self.session_name: str | None = None
         self.src_prefix = os.path.dirname(os.path.abspath(__file__)).removesuffix("/opengsync_server/core")
         self.debug = debug
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.metrics_hook: Callable[[LogBufferMetrics], None] | None = None
+        self.dropped_records = 0
+
+        self._buffer: ContextVar[list[str] | None] = ContextVar("log_buffer", default=None)
+        self._session_name: ContextVar[str | None] = ContextVar("log_session_name", default=None)
+        self._queue: queue.Queue[_Session | None] = queue.Queue(maxsize=self.max_queue_size)
+        self._writer: threading.Thread | None = None
+        self._writer_pid: int | None = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
 
     def set_log_dir(self, log_dir: Path, debug: bool = False):
         self.log_dir = log_dir
@@ -27,18 +58,98 @@ class LogBuffer:
         if not self.log_dir.exists():
             os.makedirs(self.log_dir)
 
+    @property
+    def buffer(self) -> list[str] | None:
+        return self._buffer.get()
+
+    @property
+    def session_name(self) -> str | None:
+        return self._session_name.get()
+
     def write(self, message: str):
         """Handle both serialized and non-serialized messages"""
-        if self.buffer is not None:
-            self.buffer.append(message)
+        if (buffer := self._buffer.get()) is not None:
+            buffer.append(message)
         else:
-            self.buffer = [message]
-            self.flush()
+            self._enqueue(_Session(name=self._session_name.get(), records=[message], time=datetime.now()))
 
     def start(self, name: str | None = None):
         """Enable buffering."""
-        self.buffer = []
-        self.session_name = name
+        self._buffer.set([])
+        self._session_name.set(name)
+
+    def flush(self):
+        """Hand the buffered records of the current context over to the writer thread."""
+        buffer = self._buffer.get()
+        self._buffer.set(None)
+        if buffer:
+            self._enqueue(_Session(name=self._session_name.get(), records=buffer, time=datetime.now()))
+
+    def metrics(self) -> LogBufferMetrics:
+        return LogBufferMetrics(queue_depth=self._queue.qsize(), dropped_records=self.dropped_records)
+
+    def close(self, timeout: float = 5.0):
+        """Write out everything that is queued and stop the writer thread."""
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive() or self._writer_pid != os.getpid():
+                return
+            writer = self._writer
+            self._writer = None
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        writer.join(timeout=timeout)
+
+    def _ensure_writer(self):
+        # a writer started before a fork does not exist in the child process
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer_pid == os.getpid():
+                return
+            if self._writer_pid is not None and self._writer_pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._writer_pid = os.getpid()
+            self._writer = threading.Thread(target=self._run, name="LogBufferWriter", daemon=True)
+            self._writer.start()
+
+    def _enqueue(self, session: _Session):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(session)
+        except queue.Full:
+            self.dropped_records += len(session.records)
+
+    def _run(self):
+        while True:
+            if (session := self._queue.get()) is None:
+                return
+
+            batch = [session]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    if (session := self._queue.get_nowait()) is None:
+                        stop = True
+                        break
+                    batch.append(session)
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"LogBuffer failed to write logs: {e}", file=sys.stderr, flush=True)
+
+            if self.metrics_hook is not None:
+                try:
+                    self.metrics_hook(self.metrics())
+                except Exception as e:
+                    print(f"LogBuffer metrics hook failed: {e}", file=sys.stderr, flush=True)
+
+            if stop:
+                return
 
     def parse_record(self, record: dict) -> tuple[str, str]:
         text = record.get("text", "")
@@ -51,19 +162,16 @@ class LogBuffer:
                 loc = f"{rel_file}:{line}"
             else:
                 loc = f"{rel_file}"
-            
+
         msg = f"[{level_name} {loc}] >\n{text}\n"
         return msg, level_name
-        
-    def flush(self):
-        """Flush buffered logs with per-message origins and level support."""
-        if not self.buffer:
-            return
-        
+
+    def _format(self, session: _Session) -> tuple[str, str, str]:
+        """Returns the (full, info, error) logs of a session with per-message origins and level support."""
         formatted_messages = []
         info_buffer = []
         error_buffer = []
-        for record_str in self.buffer:
+        for record_str in session.records:
             try:
                 record = json.loads(record_str)
                 parsed_msg, level_name = self.parse_record(record)
@@ -83,54 +191,38 @@ class LogBuffer:
                 unknown_msg = f"[<unknown origin>]:\n{record_str}\n"
                 formatted_messages.append(unknown_msg)
                 info_buffer.append(unknown_msg)
-        
-        all_logs = "".join(formatted_messages)
-
-        log = DEFAULT_FMT.format(
-            time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            message=all_logs,
-            session_name=self.session_name or "request"
-        )
-        
-        if self.debug:
-            print(log, flush=True)
-        else:
-            if (error_message := "".join(error_buffer)).strip():
-                error_log = DEFAULT_FMT.format(
-                    time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    message=error_message,
-                    session_name=self.session_name or "request"
-                )
+
+        def fmt(messages: list[str]) -> str:
+            if not messages:
+                return ""
+            return DEFAULT_FMT.format(
+                time=session.time.strftime("%Y-%m-%d %H:%M:%S"),
+                message="".join(messages),
+                session_name=session.name or "request"
+            )
+
+        return fmt(formatted_messages), fmt(info_buffer), fmt(error_buffer)
+
+    def _write_batch(self, batch: list[_Session]):
+        files: dict[Path, list[str]] = {}
+        for session in batch:
+            log, info_log, error_log = self._format(session)
+
+            if self.debug:
+                print(log, flush=True)
+            elif error_log.strip():
                 print(error_log, flush=True)
-        
-        if self.log_dir:
-            date_str = datetime.now().strftime("%Y-%m-%d")
-            log_path = self.log_dir / f"{date_str}.log"
-            err_path = self.log_dir / f"{date_str}.err"
-            
-            if info_buffer:
-                info_log = DEFAULT_FMT.format(
-                    time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    message="".join(info_buffer),
-                    session_name=self.session_name or "request"
-                )
-                with open(log_path, "a") as f:
-                    f.write(info_log)
-            
-            if error_buffer:
-                err_log = DEFAULT_FMT.format(
-                    time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    message="".join(error_buffer),
-                    session_name=self.session_name or "request"
-                )
-                with open(err_path, "a") as f:
-                    f.write(err_log)
-        
-        self.buffer = None
-
-    def __del__(self):
-        if self.buffer is not None:
-            self.flush()
-
-
-log_buffer = LogBuffer()
\ No newline at end of file
+
+            if self.log_dir:
+                date_str = session.time.strftime("%Y-%m-%d")
+                if info_log:
+                    files.setdefault(self.log_dir / f"{date_str}.log", []).append(info_log)
+                if error_log:
+                    files.setdefault(self.log_dir / f"{date_str}.err", []).append(error_log)
+
+        for path, logs in files.items():
+            with open(path, "a") as f:
+                f.write("".join(logs))
+
+
+log_buffer = LogBuffer()
@@ -0,0 +1,45 @@
+import redis
+
+from opengsync_db.core.listeners import UNTRACKED_TAG
+
+
+class RouteCacheTags:
+    """ Index of route cache keys by the db entities (tags) the cached view has read. """
+    PREFIX = "route_tag:"
+
+    def __init__(self, time_to_live_seconds: int = 60 * 60):
+        self.r: redis.StrictRedis = None  # type: ignore
+        self.time_to_live_seconds = time_to_live_seconds
+
+    def connect(self, host: str, port: int, db: int):
+        self.r = redis.StrictRedis(host=host, port=port, db=db, decode_responses=True)
+
+    def _redis_key(self, tag: str) -> str:
+        return f"{self.PREFIX}{tag}"
+
+    def register(self, cache_key: str, tags: set[str], timeout: int) -> None:
+        if not tags:
+            return
+        ttl = max(timeout, self.time_to_live_seconds)
+        pipe = self.r.pipeline(transaction=False)
+        for tag in tags:
+            pipe.sadd(self._redis_key(tag), cache_key)
+            pipe.expire(self._redis_key(tag), ttl)
+        pipe.execute()
+
+    def invalidate(self, tags: set[str]) -> set[str]:
+        """ removes the given tags from the index and returns the cache keys that must be evicted """
+        if not tags:
+            return set()
+
+        redis_keys = [self._redis_key(tag) for tag in tags | {UNTRACKED_TAG}]
+        pipe = self.r.pipeline(transaction=True)
+        for key in redis_keys:
+            pipe.smembers(key)
+        pipe.delete(*redis_keys)
+        *members, _ = pipe.execute()
+
+        cache_keys: set[str] = set()
+        for m in members:
+            cache_keys.update(m)
+        return cache_keys
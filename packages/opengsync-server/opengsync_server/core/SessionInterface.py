@@ -0,0 +1,110 @@
+import threading
+from datetime import timedelta
+
+import redis
+from flask_session.redis import RedisSessionInterface
+
+from .. import logger
+
+
+class UserIndexedRedisSessionInterface(RedisSessionInterface):
+    """ Redis sessions with a per-user index: every session write also adds the session key to the set
+    `user_sessions:{user_id}` (same pipeline, expires with the session TTL), so revoking all sessions
+    of a user does not need to scan the whole keyspace. """
+    INDEX_PREFIX = "user_sessions:"
+    MIGRATED_KEY = "user_sessions:migrated"
+
+    def user_sessions_key(self, user_id: int | str) -> str:
+        return f"{self.INDEX_PREFIX}{user_id}"
+
+    def _upsert_session(self, session_lifetime: timedelta, session, store_id: str) -> None:
+        ttl = int(session_lifetime.total_seconds())
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(name=store_id, value=self.serializer.encode(session), ex=ttl)
+        if (user_id := session.get("_user_id")) is not None:
+            # the most recently written session lives longest, so the index outlives all of them
+            pipe.sadd(self.user_sessions_key(user_id), store_id)
+            pipe.expire(self.user_sessions_key(user_id), ttl)
+        pipe.execute()
+
+    def _decode(self, data: bytes | None) -> dict | None:
+        if data is None:
+            return None
+        try:
+            return self.serializer.decode(data)
+        except Exception:
+            return None
+
+    def revoke_user_sessions(self, user_id: int) -> int:
+        """ deletes all sessions of the user, returns the number of deleted sessions """
+        key = self.user_sessions_key(user_id)
+        if not (store_ids := list(self.client.smembers(key))):  # type: ignore
+            return 0
+
+        # a session id is reused after logout/login as another user, only delete sessions still owned by the user
+        owned = [
+            store_id for store_id, data in zip(store_ids, self.client.mget(store_ids))  # type: ignore
+            if (session := self._decode(data)) is not None and str(session.get("_user_id")) == str(user_id)
+        ]
+        pipe = self.client.pipeline(transaction=False)
+        if owned:
+            pipe.unlink(*owned)
+        pipe.unlink(key)
+        pipe.execute()
+        return len(owned)
+
+    def index_existing_sessions(self, batch_size: int = 500) -> int:
+        """ one-time migration for sessions written before the index existed, incremental SCAN in batches """
+        ttls: dict[str, int] = {}
+        batch: list[bytes] = []
+
+        def index_batch():
+            pipe = self.client.pipeline(transaction=False)
+            for key in batch:
+                pipe.get(key)
+                pipe.ttl(key)
+            results = pipe.execute()
+
+            pipe = self.client.pipeline(transaction=False)
+            for store_id, data, ttl in zip(batch, results[::2], results[1::2]):
+                if (session := self._decode(data)) is None or (user_id := session.get("_user_id")) is None:
+                    continue
+                pipe.sadd(self.user_sessions_key(user_id), store_id)
+                ttls[str(user_id)] = max(ttls.get(str(user_id), 0), ttl)
+            pipe.execute()
+            batch.clear()
+
+        for store_id in self.client.scan_iter(match=f"{self.key_prefix}*", count=batch_size):
+            batch.append(store_id)
+            if len(batch) >= batch_size:
+                index_batch()
+        if batch:
+            index_batch()
+
+        pipe = self.client.pipeline(transaction=False)
+        for user_id, ttl in ttls.items():
+            if ttl > 0:
+                # never shorten the TTL set by a concurrent session write
+                pipe.expire(self.user_sessions_key(user_id), ttl, nx=True)
+                pipe.expire(self.user_sessions_key(user_id), ttl, gt=True)
+        pipe.execute()
+        return len(ttls)
+
+    def start_index_migration(self) -> None:
+        """ runs `index_existing_sessions()` once per redis instance in a background thread """
+        try:
+            if not self.client.set(self.MIGRATED_KEY, 1, nx=True):
+                return
+        except redis.RedisError as e:
+            logger.warning(f"Could not start session index migration: {e}")
+            return
+
+        def run():
+            try:
+                n_indexed = self.index_existing_sessions()
+                logger.info(f"Indexed existing sessions of {n_indexed} users.")
+            except redis.RedisError as e:
+                logger.error(f"Session index migration failed: {e}")
+                self.client.delete(self.MIGRATED_KEY)
+
+        threading.Thread(target=run, name="session-index-migration", daemon=True).start()
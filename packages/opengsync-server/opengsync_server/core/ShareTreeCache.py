@@ -0,0 +1,210 @@
+import os
+import json
+import urllib.parse
+from pathlib import Path, PurePosixPath
+from dataclasses import dataclass
+
+import redis
+
+from opengsync_db import DBHandler
+
+from ..tools.SharedFileBrowser import SharedFileBrowser
+
+
+@dataclass(frozen=True)
+class ShareTreeEntry:
+    rel_path: str       # posix path relative to the share root
+    dir: bool
+    st_size: int
+    st_mtime: float
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.rel_path).name
+
+    @property
+    def parent(self) -> str:
+        parent = PurePosixPath(self.rel_path).parent.as_posix()
+        return "" if parent == "." else parent
+
+    @property
+    def href(self) -> str:
+        """ rel_path quoted like werkzeug's path converter """
+        return urllib.parse.quote(self.rel_path, safe="!$&'()*+,/:;=@")
+
+    # Path-like interface for templates
+    def is_dir(self) -> bool:
+        return self.dir
+
+    def is_file(self) -> bool:
+        return not self.dir
+
+    def stat(self) -> "ShareTreeEntry":
+        return self
+
+    def is_relative_to(self, subpath: Path) -> bool:
+        return subpath == Path() or PurePosixPath(self.rel_path).is_relative_to(subpath.as_posix())
+
+
+class ShareTreeCache:
+    """ Snapshots of the file trees below shared paths for whole-tree operations (archives, sync scripts). A
+    token's tree is the union of the snapshots of its shared paths and their parent directories. Snapshots are
+    updated incrementally when a data path inside a snapshot is (re-)added. Files added, removed or renamed
+    outside of the app change the mtime of their directory, a snapshot is rebuilt when the mtime of one of its
+    directories differs from the recorded one. In-place modifications of files don't, they are picked up when
+    the snapshot expires after an hour.
+
+    Directory listings (`children`) don't load the tree, they read only the listing of the directory itself from
+    the directory cache, which rescans it when its mtime changes. """
+    PREFIX = "share_tree:"
+    ROOTS_KEY = "share_tree_roots"
+
+    def __init__(self, time_to_live_seconds: int = 3600):
+        self.r: redis.StrictRedis = None  # type: ignore
+        self.time_to_live_seconds = time_to_live_seconds
+
+    def connect(self, host: str, port: int, db: int):
+        self.r = redis.StrictRedis(host=host, port=port, db=db, decode_responses=True)
+
+    def _redis_key(self, root: str) -> str:
+        return f"{self.PREFIX}{root}"
+
+    @staticmethod
+    def _is_under(path: PurePosixPath, root: str) -> bool:
+        return root == "." or path.is_relative_to(root)
+
+    @staticmethod
+    def _stat_entry(browser: SharedFileBrowser, rel_path: Path, is_dir: bool) -> ShareTreeEntry | None:
+        try:
+            stat = (browser.root_dir / rel_path).stat()
+        except OSError:
+            return None
+        return ShareTreeEntry(rel_path=rel_path.as_posix(), dir=is_dir, st_size=stat.st_size, st_mtime=stat.st_mtime)
+
+    @staticmethod
+    def _field(entry: ShareTreeEntry) -> str:
+        return json.dumps([entry.dir, entry.st_size, entry.st_mtime])
+
+    @staticmethod
+    def _is_current(root_dir: Path, entries: dict[str, ShareTreeEntry]) -> bool:
+        """ False if a directory of the snapshot was modified (entries added/removed/renamed) or removed """
+        for entry in entries.values():
+            if not entry.dir:
+                continue
+            try:
+                if os.stat(root_dir / entry.rel_path).st_mtime != entry.st_mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _walk(self, browser: SharedFileBrowser, subpath: Path) -> dict[str, ShareTreeEntry]:
+        """ walks subpath (included) and returns all entries by rel_path """
+        entries: dict[str, ShareTreeEntry] = {}
+        if not browser.is_safe(subpath):
+            return entries
+
+        if (full_path := browser.root_dir / subpath).is_dir():
+            items = [(subpath, True)] + list(browser.walk_contents(subpath))
+        elif full_path.is_file():
+            items = [(subpath, False)]
+        else:
+            items = []
+
+        for rel_path, is_dir in items:
+            if (entry := self._stat_entry(browser, rel_path, is_dir)) is not None:
+                entries[entry.rel_path] = entry
+        return entries
+
+    def _load_roots(self, browser: SharedFileBrowser, roots: list[str]) -> dict[str, dict[str, ShareTreeEntry]]:
+        pipe = self.r.pipeline(transaction=False)
+        for root in roots:
+            pipe.hgetall(self._redis_key(root))
+
+        snapshots: dict[str, dict[str, ShareTreeEntry]] = {}
+        for root, fields in zip(roots, pipe.execute()):
+            snapshots[root] = {}
+            for rel_path, value in fields.items():
+                is_dir, size, mtime = json.loads(value)
+                snapshots[root][rel_path] = ShareTreeEntry(rel_path=rel_path, dir=is_dir, st_size=size, st_mtime=mtime)
+
+        pipe = self.r.pipeline(transaction=False)
+        for root, entries in snapshots.items():
+            if entries and self._is_current(browser.root_dir, entries):
+                continue
+            root_browser = SharedFileBrowser(browser.root_dir, db=browser.db, share_token=None, shared_paths=[root])
+            snapshots[root] = entries = self._walk(root_browser, Path(root))
+            pipe.delete(self._redis_key(root))
+            # empty hashes can't be stored, a missing root is re-walked on the next request
+            if entries:
+                pipe.hset(self._redis_key(root), mapping={rel_path: self._field(entry) for rel_path, entry in entries.items()})
+                pipe.expire(self._redis_key(root), self.time_to_live_seconds)
+                pipe.sadd(self.ROOTS_KEY, root)
+        pipe.execute()
+        return snapshots
+
+    def get_tree(self, browser: SharedFileBrowser) -> list[ShareTreeEntry]:
+        """ all entries accessible with the browser's share token, sorted by path """
+        roots = sorted({
+            shared_path.relative_to(browser.root_dir).as_posix()
+            for shared_path in browser.shared_paths
+            if shared_path.is_relative_to(browser.root_dir)
+        })
+
+        entries: dict[str, ShareTreeEntry] = {}
+        for root, snapshot in self._load_roots(browser, roots).items():
+            if not snapshot:
+                continue
+            entries.update(snapshot)
+
+            for parent in Path(root).parents:
+                if parent == Path() or parent.as_posix() in entries:
+                    continue
+                if (entry := self._stat_entry(browser, parent, True)) is not None:
+                    entries[entry.rel_path] = entry
+
+        entries.pop(".", None)
+        return [entries[rel_path] for rel_path in sorted(entries.keys())]
+
+    @staticmethod
+    def children(browser: SharedFileBrowser, subpath: Path) -> list[ShareTreeEntry]:
+        """ entries of the directory accessible with the browser's share token """
+        return [
+            ShareTreeEntry(
+                rel_path=info.path.relative_to(browser.root_dir).as_posix(), dir=info.is_dir,
+                st_size=info.size, st_mtime=info.mtime  # type: ignore[arg-type]
+            )
+            for info in browser.list_entries(subpath)
+            if info.size is not None
+        ]
+
+    def add_path(self, root_dir: Path, db: DBHandler, share_path: str) -> None:
+        """ updates the snapshots affected by a new/modified path (relative to the share root) """
+        path = PurePosixPath(share_path)
+        for root in self.r.smembers(self.ROOTS_KEY):  # type: ignore
+            key = self._redis_key(root)
+            if self._is_under(path, root):
+                if not self.r.exists(key):
+                    self.r.srem(self.ROOTS_KEY, root)
+                    continue
+                prefix = f"{path.as_posix()}/"
+                stale = [field for field in self.r.hkeys(key) if field == path.as_posix() or field.startswith(prefix)]  # type: ignore
+                browser = SharedFileBrowser(root_dir, db=db, share_token=None, shared_paths=[root])
+                fields = {rel_path: self._field(entry) for rel_path, entry in self._walk(browser, Path(share_path)).items()}
+                # parent directories up to the root, their mtimes changed with the new path
+                for parent in PurePosixPath(share_path).parents:
+                    if not self._is_under(parent, root):
+                        break
+                    if (entry := self._stat_entry(browser, Path(parent), True)) is not None:
+                        fields[entry.rel_path] = self._field(entry)
+
+                pipe = self.r.pipeline(transaction=True)
+                if stale:
+                    pipe.hdel(key, *stale)
+                if fields:
+                    pipe.hset(key, mapping=fields)
+                pipe.execute()
+            elif PurePosixPath(root).is_relative_to(path):
+                # the snapshot is inside the new path, rebuilt lazily on the next request
+                self.r.delete(key)
+                self.r.srem(self.ROOTS_KEY, root)
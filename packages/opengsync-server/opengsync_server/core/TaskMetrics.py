@@ -0,0 +1,39 @@
+import json
+
+import redis
+
+
+class TaskMetrics:
+    """ Read side of the metrics the celery worker records per task run (see opengsync_worker.tasks.worker_context). """
+    PREFIX = "task_metrics:"
+
+    def __init__(self):
+        self.r: redis.StrictRedis = None  # type: ignore
+
+    def connect(self, host: str, port: int, db: int):
+        self.r = redis.StrictRedis(host=host, port=port, db=db, decode_responses=True)
+
+    def tasks(self) -> list[str]:
+        return sorted(key.removeprefix(self.PREFIX) for key in self.r.scan_iter(match=f"{self.PREFIX}*"))
+
+    def get(self, task: str, limit: int = 50) -> list[dict]:
+        """ most recent runs first """
+        return [json.loads(run) for run in self.r.lrange(f"{self.PREFIX}{task}", 0, limit - 1)]  # type: ignore
+
+    def summary(self, limit: int = 100) -> list[dict]:
+        res = []
+        for task in self.tasks():
+            if not (runs := self.get(task, limit=limit)):
+                continue
+            durations = [run["duration_seconds"] for run in runs if run["status"] != "skipped"]
+            res.append({
+                "task": task,
+                "last_run": runs[0],
+                "runs": len(runs),
+                "errors": sum(run["status"] == "error" for run in runs),
+                "skipped": sum(run["status"] == "skipped" for run in runs),
+                "mean_duration_seconds": sum(durations) / len(durations) if durations else None,
+                "max_duration_seconds": max(durations) if durations else None,
+                "last_error": next((run for run in runs if run["status"] == "error"), None),
+            })
+        return res
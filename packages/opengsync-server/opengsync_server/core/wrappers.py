@@ -1,4 +1,5 @@
 import os
+import time
 from typing import Callable, Literal, Any, Sequence
 from functools import wraps
 import traceback
@@ -82,11 +83,11 @@ def _route_decorator(
     limit_override: bool = False,
 ) -> Callable[[Callable[..., Any]], Response]:
     """Base decorator for all route types."""
-    from .. import route_cache, flash_cache, limiter
+    from .. import route_cache, route_cache_tags, flash_cache, limiter, db as _db
 
     def decorator(fnc: Callable[..., Any]) -> Response:
         routes, current_user_required, params = rt.infer_route(fnc, base=route, arg_params=arg_params or [], form_params=form_params or [], json_params=json_params or [])
-        original_fnc = fnc
+        parameters = rt.compile_parameters(fnc)
         match current_user_required:
             case "required":
                 if not login_required and not api_token_required:
@@ -141,12 +142,25 @@ def _route_decorator(
             def default_cache_key() -> str:
                 return f"{request.method}-{request.headers.get('X-Forwarded-Prefix', '/')}view/%s"
 
-            fnc = route_cache.cached(
+            uncached_fnc = fnc
+
+            # records the db entities read while rendering so that writes evict only the matching cache entries
+            def tagged_fnc(*args, **kwargs):
+                _db.start_read_tracking()
+                try:
+                    rv = uncached_fnc(*args, **kwargs)
+                finally:
+                    tags = _db.stop_read_tracking()
+                route_cache_tags.register(cached_fnc.make_cache_key(*args, use_request=True, **kwargs), tags, cache_timeout_seconds)
+                return rv
+
+            cached_fnc = route_cache.cached(
                 timeout=cache_timeout_seconds,
                 query_string=cache_query_string if cache_type == "global" else False,
                 key_prefix=user_cache_key if cache_type == "user" else insider_cache_key if cache_type == "insider" else default_cache_key,  # type: ignore
                 **(cache_kwargs or {})
-            )(fnc)
+            )(wraps(fnc)(tagged_fnc))
+            fnc = cached_fnc
 
         if login_required:
             fnc = login_required_f(fnc)
@@ -163,7 +177,7 @@ def _route_decorator(
             rollback = False
             try:
                 try:
-                    kwargs, additional_kwargs = rt.validate_parameters(original_fnc, request, kwargs)
+                    kwargs, additional_kwargs = rt.validate_parameters(parameters, request, kwargs)
                 except ValueError as e:
                     logger.error(f"Parameter validation error: {e}")
                     raise serv_exceptions.BadRequestException(str(e)) from e
@@ -207,6 +221,11 @@ def _route_decorator(
             finally:    
                 runtime.session["needs_commit"] =  db.needs_commit if db is not None else False
                 runtime.session["rollback"] = rollback
+                if db is not None and not rollback and db.needs_commit:
+                    # committed in teardown, keeps the user's next requests reading from the primary
+                    runtime.session["db_last_write"] = time.time()
+                elif db is not None and db.last_write is not None and runtime.session.get("db_last_write") != db.last_write:
+                    runtime.session["db_last_write"] = db.last_write
                 if (msgs := runtime.app.consume_flashes(runtime.session)):
                     if runtime.session.sid:
                         flash_cache.add(runtime.session.sid, msgs)
@@ -1,4 +1,3 @@
-import smtplib
 import os
 
 from flask import Response, flash, render_template, request
@@ -8,7 +7,7 @@ from wtforms.validators import DataRequired
 
 from opengsync_db import models
 
-from .. import db, logger, mail_handler
+from .. import db, mail_handler
 from ..tools import utils
 from ..core import runtime
 from .HTMXFlaskForm import HTMXFlaskForm
@@ -104,16 +103,12 @@ class DirectoryShareForm(HTMXFlaskForm):
             wget_command=wget_command,
             outdir=outdir
         )
-        try:
-            mail_handler.send_email(
-                recipients=self._recipients,
-                subject=f"{runtime.app.personalization['organization']} Shared a Directory",
-                body=content, mime_type="html",
-            )
-        except smtplib.SMTPException as e:
-            logger.error(f"Failed to send email to {self._recipients}: {e}")
-            raise e
+        mail_handler.enqueue_email(
+            recipients=self._recipients,
+            subject=f"{runtime.app.personalization['organization']} Shared a Directory",
+            body=content, mime_type="html",
+        )
         
-        flash("Email Sent!", "success")
+        flash("Email Queued!", "success")
         return make_response(redirect=request.referrer)
 
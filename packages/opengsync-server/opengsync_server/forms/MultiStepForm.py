@@ -2,37 +2,27 @@ from uuid6 import uuid7
 
 from .. import msf_cache, logger
 from .HTMXFlaskForm import HTMXFlaskForm
-from ..tools import MSFTableHandler, CachedDictionary
+from ..tools import MSFTableHandler, CachedDictionary, MSFSession
 
 
 class StepTracker:
-    def __init__(self, key: str):
-        self.__steps: list[str] | None = None
-        self.key = key
+    def __init__(self, session: MSFSession):
+        self.session = session
 
     @property
     def steps(self) -> list[str]:
-        if self.__steps is None:
-            self.__steps = msf_cache.get_steps(self.key)
-        return self.__steps
+        return self.session.steps
 
     def add(self, step_name: str) -> None:
-        if self.__steps is None:
-            self.__steps = msf_cache.get_steps(self.key)
-        
-        if step_name in self.__steps:
+        if step_name in self.steps:
             return
-        
-        self.__steps.append(step_name)
-        msf_cache.set_steps(self.key, self.__steps)
+        self.session.set_steps(self.steps + [step_name])
 
     def pop_last(self) -> str | None:
         if not (steps := self.steps):
             return None
-        last = steps.pop()
-        msf_cache.set_steps(self.key, steps)
-        self.__steps = steps
-        return last
+        self.session.set_steps(steps[:-1])
+        return steps[-1]
     
     def get_last(self) -> str | None:
         if not (steps := self.steps):
@@ -53,24 +43,25 @@ class MultiStepForm(HTMXFlaskForm):
         self.uuid = uuid
         self.workflow = workflow
 
-        self.steps = StepTracker(key=f"{self.workflow}:{self.uuid}:steps")
+        self.msf_session = msf_cache.session(self.workflow, self.uuid)
+        self.steps = StepTracker(self.msf_session)
         self.step()
-        steps = self.steps.steps
             
-        self.header = CachedDictionary(template=f"{self.workflow}:{self.uuid}:{{step}}:header", msf_cache=msf_cache, steps=steps)
+        self.header = CachedDictionary(template=f"{self.workflow}:{self.uuid}:{{step}}:header", session=self.msf_session)
 
         self.tables = MSFTableHandler(
-            template=f"{self.workflow}:{self.uuid}:{{step}}:tables:{{table}}", msf_cache=msf_cache, steps=steps
+            template=f"{self.workflow}:{self.uuid}:{{step}}:tables:{{table}}", session=self.msf_session
         )
         self.metadata = CachedDictionary(
-            template=f"{self.workflow}:{self.uuid}:{{step}}:metadata", msf_cache=msf_cache, steps=steps
+            template=f"{self.workflow}:{self.uuid}:{{step}}:metadata", session=self.msf_session
         )
 
     @staticmethod
     def PopLastStep(workflow: str, uuid: str) -> str | None:
-        steps = StepTracker(key=f"{workflow}:{uuid}:steps")
+        session = msf_cache.session(workflow, uuid)
+        steps = StepTracker(session)
         if (current_step := steps.pop_last()) is not None:
-            msf_cache.delete_pattern(f"{workflow}:{uuid}:{current_step}:*")
+            session.delete_step(current_step)
         return steps.get_last()
     
     def get_previous_step(self) -> str | None:
@@ -83,7 +74,7 @@ class MultiStepForm(HTMXFlaskForm):
         logger.warning(f"Workflow '{self.workflow}', step '{self.step_name}', fill_previous_form() not implemented in subclass...")
 
     def complete(self):
-        msf_cache.delete_pattern(f"{self.workflow}:{self.uuid}:*")
+        self.msf_session.delete_all()
     
     def add_comment(self, context: str, text: str):
         self.metadata["comment"] = self.metadata.get("comment", {}) | {context: text}
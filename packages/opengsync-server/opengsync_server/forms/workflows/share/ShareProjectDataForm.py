@@ -1,5 +1,4 @@
 import json
-import smtplib
 
 from flask import Response, flash, url_for
 from flask_htmx import make_response
@@ -101,26 +100,28 @@ class ShareProjectDataForm(HTMXFlaskForm):
             share_token=share_token, current_user=current_user, project=self.project, internal_share=self.internal_share.data,
             anonymous=self.anonymous_send.data, outdir="BSF_DATA",
         )
+        # the worker sets the links to DISPATCHED (or FAILED) per recipient once the email is sent
+        delivery_links = [
+            (seq_request.id, link.email)
+            for seq_request in self.project.seq_requests
+            for link in seq_request.delivery_email_links
+            if link.email in self.recipient_emails
+        ]
         if not runtime.app.debug:
-            try:
-                mail_handler.send_email(
-                    recipients=self.recipient_emails,
-                    subject=f"[{self.project.identifier or f'P{self.project.id}'}]: {runtime.app.personalization['organization']} Shared Project Data",
-                    body=content, mime_type="html",
-                )
-            except smtplib.SMTPException as e:
-                logger.error(f"Failed to send email to {self.recipient_emails}: {e}")
-                raise e
+            mail_handler.enqueue_email(
+                recipients=self.recipient_emails,
+                subject=f"[{self.project.identifier or f'P{self.project.id}'}]: {runtime.app.personalization['organization']} Shared Project Data",
+                body=content, mime_type="html", delivery_links=delivery_links,
+            )
         else:
             logger.info(f"Email would be sent to: {self.recipient_emails}")
+            for seq_request in self.project.seq_requests:
+                for link in seq_request.delivery_email_links:
+                    if link.email in self.recipient_emails:
+                        link.status = DeliveryStatus.DISPATCHED
+                        db.seq_requests.update(seq_request)
 
-        for seq_request in self.project.seq_requests:
-            for link in seq_request.delivery_email_links:
-                if link.email in self.recipient_emails:
-                    link.status = DeliveryStatus.DISPATCHED
-                    db.seq_requests.update(seq_request)
-
-        flash("Data Share Email Sent!", "success")
+        flash("Data Share Email Queued!", "success")
         return make_response(redirect=url_for("projects_page.project", project_id=self.project.id, tab="project-data_paths-tab"))
 
 
@@ -5,7 +5,7 @@ from .TableCol import TableCol
 
 class HTMXTable:
     columns: list[TableCol] = []
-    def __init__(self, route: str, page: int | None = 0):
+    def __init__(self, route: str, page: int | None = 0, cursor: str | None = None):
         self.active_search_var: str | None = None
         self.active_sort_var: str | None = None
         self.active_sort_descending: bool = False
@@ -14,6 +14,8 @@ class HTMXTable:
         self.route = route
         self.num_pages: int | None = None
         self.active_page: int | None = page
+        self.active_cursor: str | None = cursor
+        self.page_cursors: dict[int, str] = {}
         self.url_params: dict = {}
 
     def __getitem__(self, item: str) -> TableCol:
@@ -41,5 +43,16 @@ class HTMXTable:
                 state[key + "_in"] = json.dumps([v.id for v in values])
         return state
     
+    def set_page_cursors(self, rows: list) -> None:
+        """ keyset cursors of the neighbouring pages, if the blueprint returned a `Page` """
+        if self.active_page is None:
+            return
+        if (next_cursor := getattr(rows, "next_cursor", None)) is not None:
+            self.page_cursors[self.active_page + 1] = next_cursor
+        if (prev_cursor := getattr(rows, "prev_cursor", None)) is not None:
+            self.page_cursors[self.active_page - 1] = prev_cursor
+    
     def page_url(self, page: int) -> str:
+        if (cursor := self.page_cursors.get(page)) is not None:
+            return url_for(self.route, page=page, cursor=cursor, **self.url_params)
         return url_for(self.route, page=page, **self.url_params)
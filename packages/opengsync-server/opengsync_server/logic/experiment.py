@@ -27,7 +27,7 @@ class ExperimentTable(HTMXTable):
 
 def get_table_context(current_user: models.User, request: Request, **kwargs) -> dict:    
     fnc_context = {}
-    table = ExperimentTable(route="experiments_htmx.get", page=request.args.get("page", 0, type=int))
+    table = ExperimentTable(route="experiments_htmx.get", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     context = parse_context(current_user, request) | kwargs
 
     if (status_in := request.args.get("status_in")):
@@ -93,7 +93,8 @@ def get_table_context(current_user: models.User, request: Request, **kwargs) ->
         if not current_user.is_insider():
             fnc_context["user_id"] = current_user.id   
 
-    experiments, table.num_pages = db.experiments.find(page=table.active_page, **fnc_context)
+    experiments, table.num_pages = db.experiments.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(experiments)
     context.update({
         "experiments": experiments,
         "template_name_or_list": template,
@@ -135,7 +136,7 @@ def get_browse_context(current_user: models.User, request: Request, **kwargs) ->
         raise exceptions.NoPermissionsException()
     
     fnc_context = {}
-    table = ExperimentTable(route="experiments_htmx.browse", page=request.args.get("page", 0, type=int))
+    table = ExperimentTable(route="experiments_htmx.browse", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     table.url_params["workflow"] = kwargs["workflow"]
     
     sort_by = request.args.get("sort_by", "id")
@@ -191,7 +192,8 @@ def get_browse_context(current_user: models.User, request: Request, **kwargs) ->
         table.active_sort_var = sort_by
         table.active_sort_descending = descending
 
-    experiments, table.num_pages = db.experiments.find(page=table.active_page, **fnc_context)
+    experiments, table.num_pages = db.experiments.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(experiments)
 
     context.update({
         "experiments": experiments,
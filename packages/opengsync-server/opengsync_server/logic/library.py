@@ -25,7 +25,7 @@ class LibraryTable(HTMXTable):
 
 def get_table_context(current_user: models.User, request: Request, **kwargs) -> dict:
     fnc_context = {}
-    table = LibraryTable(route="libraries_htmx.get", page=request.args.get("page", 0, type=int))
+    table = LibraryTable(route="libraries_htmx.get", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
 
     if (status_in := request.args.get("status_in")):
         status_in = json.loads(status_in)
@@ -102,7 +102,8 @@ def get_table_context(current_user: models.User, request: Request, **kwargs) ->
         if not current_user.is_insider():
             fnc_context["user_id"] = current_user.id
 
-    libraries, table.num_pages = db.libraries.find(page=table.active_page, **fnc_context)
+    libraries, table.num_pages = db.libraries.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(libraries)
         
     context.update({
         "libraries": libraries,
@@ -166,7 +167,7 @@ def get_browse_context(current_user: models.User, request: Request, **kwargs) ->
         raise exceptions.NoPermissionsException()
     
     fnc_context = {}
-    table = LibraryTable(route="libraries_htmx.browse", page=request.args.get("page", 0, type=int))
+    table = LibraryTable(route="libraries_htmx.browse", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     table.url_params["workflow"] = kwargs["workflow"]
     
     sort_by = request.args.get("sort_by", "id")
@@ -236,7 +237,8 @@ def get_browse_context(current_user: models.User, request: Request, **kwargs) ->
     if not current_user.is_insider():
         fnc_context["user_id"] = current_user.id
 
-    libraries, table.num_pages = db.libraries.find(page=table.active_page, **fnc_context)
+    libraries, table.num_pages = db.libraries.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(libraries)
     context.update({
         "libraries": libraries,
         "template_name_or_list": "components/tables/select-libraries.html",
@@ -25,7 +25,7 @@ class PoolTable(HTMXTable):
 
 def get_table_context(current_user: models.User, request: Request, **kwargs) -> dict:
     fnc_context = {}
-    table = PoolTable(route="pools_htmx.get", page=request.args.get("page", 0, type=int))
+    table = PoolTable(route="pools_htmx.get", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     context = parse_context(current_user, request) | kwargs
     
     if (status_in := request.args.get("status_in")):
@@ -117,7 +117,8 @@ def get_table_context(current_user: models.User, request: Request, **kwargs) ->
         if not current_user.is_insider():
             fnc_context["user_id"] = current_user.id
 
-    pools, table.num_pages = db.pools.find(page=table.active_page, **fnc_context)
+    pools, table.num_pages = db.pools.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(pools)
         
     context.update({
         "pools": pools,
@@ -159,7 +160,7 @@ def get_search_context(current_user: models.User, request: Request, **kwargs) ->
 
 def get_browse_context(current_user: models.User, request: Request, **kwargs) -> dict:    
     fnc_context = {}
-    table = PoolTable(route="pools_htmx.browse", page=request.args.get("page", 0, type=int))
+    table = PoolTable(route="pools_htmx.browse", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     table.url_params["workflow"] = kwargs["workflow"]
     
     sort_by = request.args.get("sort_by", "id")
@@ -253,7 +254,8 @@ def get_browse_context(current_user: models.User, request: Request, **kwargs) ->
         fnc_context["associated_to_experiment"] = False
         fnc_context["experiment_id"] = None
 
-    pools, table.num_pages = db.pools.find(page=table.active_page, **fnc_context)
+    pools, table.num_pages = db.pools.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(pools)
     context.update({
         "pools": pools,
         "template_name_or_list": "components/tables/select-pools.html",
@@ -25,7 +25,7 @@ class SampleTable(HTMXTable):
 
 def get_table_context(current_user: models.User, request: Request, **kwargs) -> dict:
     fnc_context = {}
-    table = SampleTable(route="samples_htmx.get", page=request.args.get("page", 0, type=int))
+    table = SampleTable(route="samples_htmx.get", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     context = parse_context(current_user, request) | kwargs
     
     if (status_in := request.args.get("status_in")):
@@ -83,7 +83,8 @@ def get_table_context(current_user: models.User, request: Request, **kwargs) ->
         if not current_user.is_insider():
             fnc_context["user_id"] = current_user.id
 
-    samples, table.num_pages = db.samples.find(page=table.active_page, **fnc_context)
+    samples, table.num_pages = db.samples.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(samples)
     
     context.update({
         "samples": samples,
@@ -98,7 +99,7 @@ def get_browse_context(current_user: models.User, request: Request, **kwargs) ->
         raise exceptions.NoPermissionsException()
     
     fnc_context = {}
-    table = SampleTable(route="samples_htmx.browse", page=request.args.get("page", 0, type=int))
+    table = SampleTable(route="samples_htmx.browse", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     table.url_params["workflow"] = kwargs["workflow"]
     
     sort_by = request.args.get("sort_by", "id")
@@ -146,7 +147,8 @@ def get_browse_context(current_user: models.User, request: Request, **kwargs) ->
     if (pool := context.get("pool")) is not None:
         fnc_context["pool_id"] = pool.id
 
-    samples, table.num_pages = db.samples.find(page=table.active_page, **fnc_context)
+    samples, table.num_pages = db.samples.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(samples)
 
     context.update({
         "samples": samples,
@@ -29,7 +29,7 @@ class SeqRequestTable(HTMXTable):
 def get_table_context(current_user: models.User, request: Request, **kwargs) -> dict:
     fnc_context = {}
 
-    table = SeqRequestTable(route="seq_requests_htmx.get", page=request.args.get("page", 0, type=int))
+    table = SeqRequestTable(route="seq_requests_htmx.get", page=request.args.get("page", 0, type=int), cursor=request.args.get("cursor"))
     
     context = parse_context(current_user, request) | kwargs
     
@@ -112,7 +112,8 @@ def get_table_context(current_user: models.User, request: Request, **kwargs) ->
         table.active_sort_var = sort_by
         table.active_sort_descending = descending
 
-    seq_requests, table.num_pages = db.seq_requests.find(page=table.active_page, **fnc_context)
+    seq_requests, table.num_pages = db.seq_requests.find(page=table.active_page, cursor=table.active_cursor, **fnc_context)
+    table.set_page_cursors(seq_requests)
 
     context.update({
         "seq_requests": seq_requests,
@@ -153,4 +154,54 @@ def get_search_context(current_user: models.User, request: Request, **kwargs) ->
         "template_name_or_list": "components/search/seq_request.html",
         "num_pages": num_pages,
     })
-    return context
\ No newline at end of file
+    return context
+
+def get_overview_context(seq_request: models.SeqRequest, link_width_unit: int = 1) -> dict:
+    """ sankey nodes/links project -> sample -> library (-> pool) from a single graph query """
+    contains_pooled = seq_request.submission_type == cats.SubmissionType.POOLED_LIBRARIES
+
+    nodes: list[dict] = []
+    links: list[dict] = []
+    project_nodes: dict[int, int] = {}
+    library_nodes: dict[int, int] = {}
+    pool_nodes: dict[int, int] = {}
+
+    def add_node(name: str, id: str) -> int:
+        nodes.append({"node": len(nodes), "name": name, "id": id})
+        return len(nodes) - 1
+
+    sample_id = None
+    sample_idx = project_idx = n_sample_links = 0
+
+    def add_sample_link():
+        links.append({"source": project_idx, "target": sample_idx, "value": link_width_unit * n_sample_links})
+
+    for edge in db.seq_requests.get_overview_graph(seq_request.id):
+        if edge.sample_id != sample_id:
+            if sample_id is not None:
+                add_sample_link()
+            if (project_idx := project_nodes.get(edge.project_id, -1)) == -1:
+                project_idx = project_nodes[edge.project_id] = add_node(edge.project_title, f"project-{edge.project_id}")
+            sample_id = edge.sample_id
+            sample_idx = add_node(edge.sample_name, f"sample-{edge.sample_id}")
+            n_sample_links = 0
+
+        n_sample_links += 1
+        if (library_idx := library_nodes.get(edge.library_id, -1)) == -1:
+            library_type = cats.LibraryType.get(edge.library_type_id)
+            library_idx = library_nodes[edge.library_id] = add_node(library_type.identifier, f"library-{edge.library_id}")
+
+            if contains_pooled and edge.pool_id is not None:
+                if (pool_idx := pool_nodes.get(edge.pool_id, -1)) == -1:
+                    pool_idx = pool_nodes[edge.pool_id] = add_node(edge.pool_name, f"pool-{edge.pool_id}")
+                links.append({"source": library_idx, "target": pool_idx, "value": link_width_unit * edge.library_num_samples})
+
+        links.append({"source": sample_idx, "target": library_idx, "value": link_width_unit})
+
+    if sample_id is not None:
+        add_sample_link()
+
+    return {
+        "template_name_or_list": "components/plots/request_overview.html",
+        "nodes": nodes, "links": links, "contains_pooled": contains_pooled,
+    }
@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-import smtplib
 
 from flask import Blueprint, jsonify, render_template
 
@@ -9,7 +8,7 @@ from opengsync_db import models
 
 from ...tools import utils
 from ...core import wrappers, exceptions, runtime
-from ... import db, logger, mail_handler
+from ... import db, mail_handler, share_tree_cache
 
 
 shares_api_bp = Blueprint("shares_api", __name__, url_prefix="/api/shares/")
@@ -161,6 +160,8 @@ def add_data_path(
                 library=library,
             )
 
+    share_tree_cache.add_path(runtime.app.share_root, db, share_path)
+
     return jsonify({"result": "success", "share_path": share_path, "path": path, "type": path_type.name}), 200
 
 @wrappers.api_route(shares_api_bp, db=db, methods=["DELETE"], json_params=["project_id"])
@@ -258,15 +259,17 @@ def release_project_data(
         share_token=share_token, current_user=current_user, project=project, internal_share=internal_access,
         anonymous=anonymous_send, outdir="BSF_DATA", comment=comment
     )
-    try:
-        mail_handler.send_email(
-            recipients=recipients,
-            subject=f"[{project.identifier or f'P{project.id}'}]: {runtime.app.personalization['organization']} Shared Project Data",
-            body=content, mime_type="html",
-        )
-    except smtplib.SMTPException as e:
-        logger.error(f"Failed to send email to {recipients}: {e}")
-        raise e
+    mail_handler.enqueue_email(
+        recipients=recipients,
+        subject=f"[{project.identifier or f'P{project.id}'}]: {runtime.app.personalization['organization']} Shared Project Data",
+        body=content, mime_type="html",
+        delivery_links=[
+            (seq_request.id, link.email)
+            for seq_request in project.seq_requests
+            for link in seq_request.delivery_email_links
+            if link.email in recipients
+        ],
+    )
     
     if mark_project_delivered is None:
         all_libraries_delivered = True
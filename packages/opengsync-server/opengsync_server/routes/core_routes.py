@@ -17,7 +17,7 @@ from opengsync_db.categories import LibraryType, AccessType
 from ..core import exceptions, wrappers
 from ..tools import utils, univer
 from ..core.RunTime import runtime
-from .. import db, logger, flash_cache
+from .. import db, logger, flash_cache, task_metrics
 
 
 if runtime.app.debug:
@@ -146,8 +146,7 @@ def download_file(file_id: int, current_user: models.User):
     response.headers["Content-Disposition"] = f"attachment; filename={file.name}{file.extension}"
     return response
 
-@wrappers.resource_route(runtime.app, db=db)
-def xlsx_data(current_user: models.User, file_id: int):
+def _xlsx_filepath(current_user: models.User, file_id: int) -> str:
     if (file := db.media_files.get(file_id)) is None:
         raise exceptions.NotFoundException()
     
@@ -162,9 +161,34 @@ def xlsx_data(current_user: models.User, file_id: int):
     
     if not filepath.lower().endswith((".xlsx", ".xls")):
         raise exceptions.BadRequestException("File is not an Excel file")
-    
-    data, style = univer.xlsx_to_univer_snapshot(filepath)
-    return jsonify({"data": data, "style": style}), 200
+    return filepath
+
+
+@wrappers.resource_route(runtime.app, db=db)
+def xlsx_data(current_user: models.User, file_id: int):
+    filepath = _xlsx_filepath(current_user, file_id)
+    return jsonify(univer.xlsx_to_univer_snapshot(filepath)), 200
+
+
+@wrappers.resource_route(runtime.app, db=db, arg_params=["key", "sheet", "start", "stop"])
+def xlsx_rows(current_user: models.User, file_id: int, key: str, sheet: int, start: int, stop: int):
+    if sheet < 0:
+        raise exceptions.BadRequestException("Invalid sheet index")
+    if not 0 <= start <= stop:
+        raise exceptions.BadRequestException("Invalid row window, expected 0 <= start <= stop")
+
+    filepath = _xlsx_filepath(current_user, file_id)
+    try:
+        rows = univer.read_rows(filepath, key, sheet, start, stop)
+    except ValueError:
+        raise exceptions.BadRequestException("Invalid snapshot key")
+    except FileNotFoundError:
+        # the file changed since the snapshot was loaded
+        raise exceptions.NotFoundException("Snapshot not found")
+
+    response = make_response(rows)
+    response.headers["Content-Type"] = "application/json"
+    return response
 
 
 @wrappers.api_route(runtime.app, login_required=False, api_token_required=False, limit="5/second", limit_override=True, track_usage=False)
@@ -172,6 +196,28 @@ def status():
     return make_response("OK", 200)
 
 
+@wrappers.resource_route(runtime.app, db=db, track_usage=False)
+def db_pool_status(current_user: models.User):
+    if not current_user.is_admin():
+        raise exceptions.NoPermissionsException()
+    # metrics of the gunicorn worker process that handles the request
+    return jsonify({"pid": os.getpid(), **db.pool_metrics().to_dict()}), 200
+
+
+@wrappers.htmx_route(runtime.app, db=db, track_usage=False)
+def render_worker_tasks(current_user: models.User):
+    if not current_user.is_admin():
+        raise exceptions.NoPermissionsException()
+    return make_response(render_template("components/worker-tasks.html", tasks=task_metrics.summary()))
+
+
+@wrappers.resource_route(runtime.app, db=db, track_usage=False)
+def worker_task_runs(current_user: models.User, task: str, limit: int = 50):
+    if not current_user.is_admin():
+        raise exceptions.NoPermissionsException()
+    return jsonify(task_metrics.get(task, limit=limit)), 200
+
+
 @wrappers.api_route(runtime.app, login_required=False, api_token_required=False, limit="5/second", track_usage=False, cache_type="global", cache_timeout_seconds=120)
 def share_status_check():
     if not runtime.app.canary_files:
@@ -2,17 +2,16 @@ from pathlib import Path
 import urllib.parse
 import mimetypes
 from typing import Literal
-import zipstream.ng as zipstream
 
 from sqlalchemy import orm
 
-from flask import Blueprint, render_template, Response, send_from_directory, stream_with_context
+from flask import Blueprint, render_template, Response, send_from_directory, stream_with_context, request
 
 from opengsync_db import models
 
-from ... import db, DEBUG, limiter, logger
+from ... import db, DEBUG, limiter, logger, route_cache, share_tree_cache
 from ...core import wrappers, exceptions
-from ...tools import utils, SharedFileBrowser
+from ...tools import utils, SharedFileBrowser, ZipArchive
 from ...core.RunTime import runtime
 
 file_share_bp = Blueprint("file_share", __name__, url_prefix="/files/share/")
@@ -46,7 +45,8 @@ def rclone(token: str, subpath: Path = Path()):
 
     browser = SharedFileBrowser(root_dir=SHARE_ROOT, db=db, share_token=share_token)
 
-    if len(paths := browser.list_contents(subpath)) == 0:
+    paths = share_tree_cache.children(browser, subpath)
+    if len(paths) == 0:
         if (file := browser.get_file(subpath)) is not None:
             mimetype = mimetypes.guess_type(file)[0] or "application/octet-stream"
 
@@ -82,7 +82,8 @@ def browse(token: str, subpath: Path = Path()):
 
     browser = SharedFileBrowser(root_dir=SHARE_ROOT, db=db, share_token=share_token)
 
-    if len(paths := browser.list_contents(subpath)) == 0:
+    paths = share_tree_cache.children(browser, subpath)
+    if len(paths) == 0:
         if (file := browser.get_file(subpath)) is not None:
             mimetype = mimetypes.guess_type(file)[0] or "application/octet-stream"
             if DEBUG:
@@ -120,30 +121,48 @@ def download_archive(token: str, subpath: Path = Path()):
     if not browser.is_safe(subpath):
         raise exceptions.NoPermissionsException("Invalid path")
 
-    def generate_zip():
-        zs = zipstream.ZipStream(compress_type=zipstream.ZIP_STORED)
+    files: list[tuple[Path, str]] = []
+    for entry in share_tree_cache.get_tree(browser):
+        if entry.dir or not entry.is_relative_to(subpath):
+            continue
 
-        for rel_path, is_dir in browser.walk_contents(subpath):
-            if is_dir:
-                continue
-            
-            abs_path = SHARE_ROOT / rel_path
-            
-            try:
-                arcname = rel_path.relative_to(subpath.parent)
-            except ValueError:
-                arcname = rel_path
-
-            zs.add_path(str(abs_path), arcname.as_posix())
+        rel_path = Path(entry.rel_path)
+        try:
+            arcname = rel_path.relative_to(subpath.parent)
+        except ValueError:
+            arcname = rel_path
 
-        yield from zs
+        files.append((SHARE_ROOT / rel_path, arcname.as_posix()))
 
+    archive = ZipArchive(files, crc_cache=route_cache)
     filename = f"{subpath.name or 'archive'}.zip"
-    
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{archive.etag}"',
+    }
+
+    # resume: serve the requested byte range unless the archive has changed since (If-Range)
+    byte_range = None
+    if request.range is not None and request.if_range.date is None and request.if_range.etag in (None, archive.etag):
+        byte_range = request.range.range_for_length(archive.size)
+        # multiple ranges are answered with the whole archive, a single one outside of it is unsatisfiable
+        if byte_range is None and request.range.units == "bytes" and len(request.range.ranges) == 1:
+            return Response(status=416, headers={"Content-Range": f"bytes */{archive.size}", "ETag": headers["ETag"]})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(archive.size)
+        return Response(
+            stream_with_context(archive.iter_bytes()),
+            mimetype="application/zip", headers=headers
+        )
+
+    start, stop = byte_range
+    headers["Content-Length"] = str(stop - start)
+    headers["Content-Range"] = f"bytes {start}-{stop - 1}/{archive.size}"
     return Response(
-        stream_with_context(generate_zip()),
-        mimetype="application/zip",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        stream_with_context(archive.iter_bytes(start, stop)),
+        status=206, mimetype="application/zip", headers=headers
     )
 
 
@@ -178,20 +197,16 @@ def curl_script(token: str, platform: Literal["windows", "unix"]):
     SHARE_ROOT = runtime.app.share_root
     browser = SharedFileBrowser(root_dir=SHARE_ROOT, db=db, share_token=share_token)
     subpath = Path()
-    items = []
-    for rel_path, is_dir in browser.walk_contents(subpath):
-        try:
-            display_path = rel_path.relative_to(subpath) if subpath != Path() else rel_path
-        except ValueError:
-            display_path = rel_path
-            
-        url = runtime.url_for('file_share.rclone', token=token, subpath=rel_path.as_posix(), _external=True)
-        
-        items.append({
-            'rel_path': display_path.as_posix(),
-            'is_dir': is_dir,
-            'url': url
-        })
+    # resolve the url once, entries only substitute their (quoted) path
+    url_template = runtime.url_for('file_share.rclone', token=token, subpath="__SUBPATH__", _external=True)
+    items = [
+        {
+            'rel_path': entry.rel_path,
+            'is_dir': entry.dir,
+            'url': url_template.replace("__SUBPATH__", entry.href, 1)
+        }
+        for entry in share_tree_cache.get_tree(browser)
+    ]
 
     rendered_script = render_template(
         template, base_folder=subpath.name if subpath.name else "download", items=items
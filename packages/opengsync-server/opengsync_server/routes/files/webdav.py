@@ -1,6 +1,7 @@
 from pathlib import Path
 import urllib.parse
 import mimetypes
+from stat import S_ISDIR
 
 from sqlalchemy import orm
 from flask import Blueprint, render_template, Response, send_from_directory, request
@@ -42,12 +43,13 @@ def share(token: str, subpath: Path = Path()):
         response.headers["MS-Author-Via"] = "DAV"
         return response
     elif request.method == "HEAD":
-        if (path := browser.get_file(subpath)) is None:
+        if (file_info := browser.get_file_info(subpath)) is None:
             raise exceptions.NotFoundException(f"File not found: {subpath}")
-        if not path.is_file():
+
+        path, stat = file_info
+        if S_ISDIR(stat.st_mode):
             raise exceptions.MethodNotAllowedException("Cannot HEAD a collection")
 
-        stat = path.stat()
         response = Response()
         mimetype, _ = mimetypes.guess_type(path.name)
         response.headers["Content-Type"] = mimetype or "application/octet-stream"
@@ -74,10 +76,11 @@ def share(token: str, subpath: Path = Path()):
         response.headers["Content-Type"] = "application/xml; charset=utf-8"
         return response
     elif request.method == "GET":
-        if (path := browser.get_file(subpath)) is None:
+        if (file_info := browser.get_file_info(subpath)) is None:
             raise exceptions.NotFoundException(f"File not found: {subpath}")
 
-        if not path.is_file():
+        path, stat = file_info
+        if S_ISDIR(stat.st_mode):
             raise exceptions.BadRequestException("Subpath must be a file")
 
         mimetype, _ = mimetypes.guess_type(path.name)
@@ -87,7 +90,6 @@ def share(token: str, subpath: Path = Path()):
         if DEBUG:
             return send_from_directory(path.parent, path.name, as_attachment=True, mimetype=mimetype)
 
-        stat = path.stat()
         response = Response()
         response.headers["Content-Type"] = mimetype
         response.headers["X-Accel-Redirect"] = urllib.parse.quote(path.as_posix().replace(SHARE_ROOT.as_posix(), "/nginx-share/"), safe="/")
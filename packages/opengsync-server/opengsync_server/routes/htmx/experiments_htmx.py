@@ -10,7 +10,7 @@ from opengsync_db.categories import ExperimentStatus
 
 from ... import db, forms, logger, logic
 from ...core.RunTime import runtime
-from ...tools import StaticSpreadSheet
+from ...tools import StaticSpreadSheet, univer
 from ...tools.spread_sheet_components import TextColumn
 from ...core import wrappers, exceptions
 
@@ -235,6 +235,7 @@ def delete_file(current_user: models.User, experiment_id: int, file_id: int):
     file_path = os.path.join(runtime.app.media_folder, file.path)
     if os.path.exists(file_path):
         os.remove(file_path)
+    univer.remove_snapshots(file_path)
     db.media_files.delete(file_id=file.id)
 
     logger.info(f"Deleted file '{file.name}' from experiment (id='{experiment_id}')")
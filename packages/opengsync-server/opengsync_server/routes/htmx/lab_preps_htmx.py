@@ -18,7 +18,7 @@ from ... import db, forms, logger, logic
 from ...core import wrappers, exceptions
 from ...core.RunTime import runtime
 from ...tools.spread_sheet_components import TextColumn
-from ...tools import StaticSpreadSheet
+from ...tools import StaticSpreadSheet, univer
 
 
 lab_preps_htmx = Blueprint("lab_preps_htmx", __name__, url_prefix="/htmx/lab_preps/")
@@ -340,6 +340,7 @@ def delete_file(current_user: models.User, lab_prep_id: int, file_id: int):
     file_path = os.path.join(runtime.app.media_folder, file.path)
     if os.path.exists(file_path):
         os.remove(file_path)
+    univer.remove_snapshots(file_path)
     db.media_files.delete(file_id=file.id)
 
     logger.info(f"Deleted file '{file.name}' from prep (id='{lab_prep_id}')")
@@ -1,5 +1,3 @@
-from io import BytesIO
-
 import pandas as pd
 
 from flask import Blueprint, url_for, render_template, flash, request, Response
@@ -11,7 +9,7 @@ from opengsync_db.categories import ProjectStatus, LibraryStatus, AccessType
 from ... import db, forms, logger, logic
 from ...core import wrappers, exceptions
 from ...tools.spread_sheet_components import TextColumn
-from ...tools import StaticSpreadSheet
+from ...tools import StaticSpreadSheet, StreamingExcelWriter
 
 projects_htmx = Blueprint("projects_htmx", __name__, url_prefix="/htmx/projects/")
 
@@ -477,21 +475,21 @@ def export(current_user: models.User, project_id: int):
 
     library_properties_df = db.pd.get_library_properties(project_id=project.id)
 
-    bytes_io = BytesIO()
-
-    with pd.ExcelWriter(bytes_io, engine="openpyxl") as writer:
-        metadata.to_excel(writer, sheet_name="Metadata")
-        samples_df.to_excel(writer, sheet_name="Samples", index=False)
-        libraries_df.to_excel(writer, sheet_name="Libraries", index=False)
-        seq_requests_df.to_excel(writer, sheet_name="Seq Requests", index=False)
-        software.to_excel(writer, sheet_name="Software")
-        library_properties_df.to_excel(writer, sheet_name="Library Properties", index=False)
-
-    bytes_io.seek(0)
+    ew = StreamingExcelWriter({
+        "Metadata": metadata.reset_index(names=[""]),
+        "Samples": samples_df,
+        "Libraries": libraries_df,
+        "Seq Requests": seq_requests_df,
+        "Software": software.reset_index(names=[""]),
+        "Library Properties": library_properties_df,
+    }, index=False)
+    ew.apply_header_style(sheet_name=None)
+    ew.apply_column_width(sheet_name=None)
 
     return Response(
-        bytes_io, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        ew.iter_bytes(), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={
-            "Content-Disposition": f"attachment; filename=project_{project.identifier or f'P_{project.id}'}.xlsx"
+            "Content-Disposition": f"attachment; filename=project_{project.identifier or f'P_{project.id}'}.xlsx",
+            "Content-Length": str(ew.size),
         }
     )
\ No newline at end of file
@@ -1,5 +1,4 @@
 import os
-from io import BytesIO
 from typing import Literal
 
 from flask import Blueprint, url_for, render_template, flash, request, Response
@@ -17,7 +16,7 @@ from opengsync_db.categories import (
 from ... import db, forms, logger, logic
 from ...core import wrappers, exceptions
 from ...core.RunTime import runtime
-from ...tools import StaticSpreadSheet
+from ...tools import StaticSpreadSheet, StreamingExcelWriter, univer
 from ...tools.spread_sheet_components import TextColumn
 
 
@@ -70,18 +69,18 @@ def export(current_user: models.User, seq_request_id: int):
     libraries_df = db.pd.get_seq_request_libraries(seq_request_id, include_indices=True)
     features_df = db.pd.get_seq_request_features(seq_request_id)
 
-    bytes_io = BytesIO()
     # TODO: export features, CMOs, VISIUM metadata, etc...
-    with pd.ExcelWriter(bytes_io, engine="openpyxl") as writer:  # type: ignore
-        metadata_df.to_excel(writer, sheet_name="metadata", index=True)
-        libraries_df.to_excel(writer, sheet_name="libraries", index=False)
-        features_df.to_excel(writer, sheet_name="features", index=False)
+    ew = StreamingExcelWriter({
+        "metadata": metadata_df.reset_index(names=[""]),
+        "libraries": libraries_df,
+        "features": features_df,
+    }, index=False)
+    ew.apply_header_style(sheet_name=None)
+    ew.apply_column_width(sheet_name=None)
 
-    bytes_io.seek(0)
-        
     return Response(
-        bytes_io, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-disposition": f"attachment; filename={file_name}"}
+        ew.iter_bytes(), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-disposition": f"attachment; filename={file_name}", "Content-Length": str(ew.size)}
     )
 
 
@@ -296,6 +295,7 @@ def delete_file(current_user: models.User, seq_request_id: int, file_id: int):
     file_path = os.path.join(runtime.app.media_folder, file.path)
     if os.path.exists(file_path):
         os.remove(file_path)
+    univer.remove_snapshots(file_path)
     db.media_files.delete(file_id=file.id)
 
     logger.info(f"Deleted file '{file.name}' from request (id='{seq_request_id}')")
@@ -513,102 +513,7 @@ def overview(current_user: models.User, seq_request_id: int):
     if access_type < AccessType.VIEW:
         raise exceptions.NoPermissionsException()
 
-    LINK_WIDTH_UNIT = 1
-
-    samples, _ = db.samples.find(seq_request_id=seq_request_id, limit=None)
-    
-    nodes = []
-    links = []
-    contains_pooled = seq_request.submission_type == SubmissionType.POOLED_LIBRARIES
-
-    idx = 0
-
-    project_nodes: dict[int, int] = {}
-    sample_nodes: dict[int, int] = {}
-    library_nodes: dict[int, int] = {}
-    pool_nodes: dict[int, int] = {}
-    pool_link_widths: dict[int, int] = {}
-
-    for sample in samples:
-        if sample.project_id not in project_nodes.keys():
-            project_node = {
-                "node": idx,
-                "name": sample.project.title,
-                "id": f"project-{sample.project_id}"
-            }
-            nodes.append(project_node)
-            project_nodes[sample.project.id] = idx
-            project_idx = idx
-            idx += 1
-        else:
-            project_idx = project_nodes[sample.project.id]
-
-        sample_node = {
-            "node": idx,
-            "name": sample.name,
-            "id": f"sample-{sample.id}"
-        }
-        nodes.append(sample_node)
-        sample_nodes[sample.id] = idx
-        idx += 1
-        n_sample_links = 0
-        for link in sample.library_links:
-            if link.library.seq_request_id == seq_request_id:
-                n_sample_links += 1
-                if link.library.id not in library_nodes.keys():
-                    library_node = {
-                        "node": idx,
-                        "name": link.library.type.identifier,
-                        "id": f"library-{link.library.id}"
-                    }
-                    nodes.append(library_node)
-                    library_nodes[link.library.id] = idx
-                    library_idx = idx
-                    idx += 1
-
-                    if contains_pooled:
-                        if link.library.pool_id not in pool_nodes.keys():
-                            pool_node = {
-                                "node": idx,
-                                "name": link.library.pool.name,         # type: ignore
-                                "id": f"pool-{link.library.pool.id}"    # type: ignore
-                            }
-                            nodes.append(pool_node)
-                            pool_nodes[link.library.pool.id] = idx      # type: ignore
-                            pool_link_widths[link.library.pool.id] = 0  # type: ignore
-                            pool_idx = idx
-
-                            idx += 1
-                        else:
-                            pool_idx = pool_nodes[link.library.pool.id]     # type: ignore
-
-                        pool_link_widths[link.library.pool.id] += LINK_WIDTH_UNIT * link.library.num_samples    # type: ignore
-                        
-                        links.append({
-                            "source": library_nodes[link.library_id],
-                            "target": pool_idx,
-                            "value": LINK_WIDTH_UNIT * link.library.num_samples
-                        })
-                else:
-                    library_idx = library_nodes[link.library.id]
-                links.append({
-                    "source": sample_node["node"],
-                    "target": library_idx,
-                    "value": LINK_WIDTH_UNIT
-                })
-
-        links.append({
-            "source": project_idx,
-            "target": sample_nodes[sample.id],
-            "value": LINK_WIDTH_UNIT * n_sample_links
-        })
-
-    return make_response(
-        render_template(
-            "components/plots/request_overview.html",
-            nodes=nodes, links=links, contains_pooled=contains_pooled
-        )
-    )
+    return make_response(render_template(**logic.seq_request.get_overview_context(seq_request)))
 
 @wrappers.htmx_route(seq_requests_htmx, db=db)
 def get_comments(current_user: models.User, seq_request_id: int):
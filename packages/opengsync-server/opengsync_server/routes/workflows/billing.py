@@ -10,7 +10,7 @@ from opengsync_db import models
 
 from ... import db
 from ...core import wrappers, exceptions
-from ...tools import ExcelWriter
+from ...tools import StreamingExcelWriter
 from ...forms.workflows import billing as wff
 
 
@@ -223,7 +223,7 @@ def download(current_user: models.User) -> Response:
     pools_df["info"] = pools_df["info"].str.strip()
     file_name = f"billing_{datetime.now().strftime('%Y%m%d')}.xlsx"
 
-    ew = ExcelWriter({
+    ew = StreamingExcelWriter({
         "pools": pools_df,
         "experiments": experiments_df,
         "lanes": lanes_df
@@ -234,6 +234,6 @@ def download(current_user: models.User) -> Response:
     ew.apply_alternating_colors(sheet_name=None, column="experiment_name", primary_color="a4cbfa")
         
     return Response(
-        ew.get_bytes(), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-disposition": f"attachment; filename={file_name}"}
+        ew.iter_bytes(), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-disposition": f"attachment; filename={file_name}", "Content-Length": str(ew.size)}
     )
@@ -1,15 +1,15 @@
+import copy
 from typing import Any, Hashable
 
-from .RedisMSFFileCache import RedisMSFFileCache
+from .MSFSession import MSFSession
 
 class CachedDictionary:
-    def __init__(self, template: str, msf_cache: RedisMSFFileCache, steps: list[str]):
+    """ dict of the current step, initialized from the latest step that has one. Writes are buffered in the session. """
+    def __init__(self, template: str, session: MSFSession):
         self.__data: dict | None = None
         self.template = template
-        self.r = msf_cache
-        self.steps = steps
-        self.steps.reverse()
-        self.current_step = steps[0]
+        self.session = session
+        self.current_step = session.steps[-1]
 
     def key(self, step_name: str) -> str:
         return self.template.format(step=step_name)
@@ -17,9 +17,10 @@ class CachedDictionary:
     @property
     def data(self) -> dict:
         if self.__data is None:
-            for step in self.steps:
-                if (data := self.r.get_dict(self.key(step))) is not None:
-                    self.__data = data
+            for step in reversed(self.session.steps):
+                if (data := self.session.get_dict(self.key(step))) is not None:
+                    # the session keeps the loaded dict of each step, do not modify it in place
+                    self.__data = copy.deepcopy(data)
                     break
             else:
                 self.__data = {}
@@ -29,26 +30,29 @@ class CachedDictionary:
     @data.setter
     def data(self, value: dict) -> None:
         self.__data = value
-        self.r.set_dict(self.key(self.current_step), self.__data)
+        self._write()
+
+    def _write(self) -> None:
+        self.session.set_dict(self.key(self.current_step), self.data)
 
     def __getitem__(self, key: str) -> Any:
         return self.data[key]
     
     def __setitem__(self, key: Hashable, value: Any) -> None:        
         self.data[key] = value
-        self.r.set_dict(self.key(self.current_step), self.data)
+        self._write()
 
     def get(self, key: str, default: Any = None) -> Any:
         return self.data.get(key, default)
     
     def pop(self, key: str, default: Any = None) -> Any:
         value = self.data.pop(key, default)
-        self.r.set_dict(self.key(self.current_step), self.data)
+        self._write()
         return value
     
     def clear(self) -> None:
         self.__data = {}
-        self.r.set_dict(self.key(self.current_step), self.__data)
+        self._write()
 
     def items(self):
         return self.data.items()
@@ -70,4 +74,4 @@ class CachedDictionary:
 
     def update(self, other: dict) -> None:
         self.data.update(other)
-        self.r.set_dict(self.key(self.current_step), self.data)
\ No newline at end of file
+        self._write()
\ No newline at end of file
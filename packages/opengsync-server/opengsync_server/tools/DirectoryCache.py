@@ -0,0 +1,112 @@
+import os
+import stat
+import time
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from collections import OrderedDict
+
+
+@dataclass(frozen=True)
+class PathInfo:
+    path: Path
+    is_dir: bool
+    is_file: bool
+    is_symlink: bool
+    size: int | None            # None if the path (or symlink target) cannot be stat'ed
+    mtime: float | None
+    resolved: Path | None       # symlink target, None for regular entries
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @staticmethod
+    def from_path(path: Path) -> "PathInfo":
+        is_symlink = path.is_symlink()
+        try:
+            st = path.stat()
+        except OSError:
+            st = None
+        return PathInfo._from_stat(path, st, is_symlink)
+
+    @staticmethod
+    def from_entry(entry: os.DirEntry) -> "PathInfo":
+        path = Path(entry.path)
+        is_symlink = entry.is_symlink()
+        try:
+            st = entry.stat()
+        except OSError:
+            st = None
+        return PathInfo._from_stat(path, st, is_symlink)
+
+    @staticmethod
+    def _from_stat(path: Path, st: os.stat_result | None, is_symlink: bool) -> "PathInfo":
+        resolved = None
+        if is_symlink:
+            try:
+                resolved = path.resolve()
+            except (OSError, RuntimeError):
+                pass
+
+        if st is None:
+            return PathInfo(path=path, is_dir=False, is_file=False, is_symlink=is_symlink, size=None, mtime=None, resolved=resolved)
+
+        return PathInfo(
+            path=path, is_dir=stat.S_ISDIR(st.st_mode), is_file=stat.S_ISREG(st.st_mode),
+            is_symlink=is_symlink, size=st.st_size, mtime=st.st_mtime, resolved=resolved
+        )
+
+
+class DirectoryCache:
+    """ Process wide, size-bounded LRU cache of directory listings with the metadata of every entry.
+    A listing is rescanned when the directory mtime changes (entries added/removed/renamed) or after
+    `max_age_seconds`, because in-place file modifications do not change the directory mtime. """
+
+    def __init__(self, max_entries: int = 2048, max_age_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._entries: OrderedDict[str, tuple[int, float, list[PathInfo]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def list_dir(self, path: Path) -> list[PathInfo] | None:
+        """ returns the entries of the directory or None if it is not a readable directory """
+        key = path.as_posix()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self.invalidate(path)
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            if (cached := self._entries.get(key)) is not None:
+                cached_mtime_ns, loaded_at, entries = cached
+                if cached_mtime_ns == mtime_ns and now - loaded_at < self.max_age_seconds:
+                    self._entries.move_to_end(key)
+                    return entries
+
+        try:
+            with os.scandir(path) as it:
+                entries = [PathInfo.from_entry(entry) for entry in it]
+        except (NotADirectoryError, FileNotFoundError, PermissionError):
+            self.invalidate(path)
+            return None
+
+        with self._lock:
+            self._entries[key] = (mtime_ns, now, entries)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entries
+
+    def invalidate(self, path: Path | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path.as_posix(), None)
+
+
+directory_cache = DirectoryCache()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Literal
@@ -11,6 +12,8 @@ class BrowserPath:
     path: Path
     rel_path: Path
     data_paths: list[models.DataPath]
+    stat: os.stat_result | None = None
+    is_dir: bool = False
 
 
 class FileBrowser:
@@ -28,63 +31,62 @@ class FileBrowser:
             return []
         
         full_path = self.root_dir / subpath
+        if not full_path.is_dir():
+            return []
 
-        def sort_by_name(p: Path):
-            return p.name.lower()
-        
-        def sort_by_size(p: Path):
-            try:
-                return p.stat().st_size
-            except (FileNotFoundError, PermissionError):
-                return -1
-        
-        def sort_by_mtime(p: Path):
+        # single directory pass; stat() of a DirEntry is cached so each entry is stat'ed at most once
+        try:
+            with os.scandir(full_path) as it:
+                entries = list(it)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return []
+
+        def stat(entry: os.DirEntry) -> os.stat_result | None:
             try:
-                return p.stat().st_mtime
-            except (FileNotFoundError, PermissionError):
-                return -1
+                return entry.stat()
+            except OSError:
+                return None
 
         match sort_by:
-            case "name":
-                key_func = sort_by_name
             case "size":
-                key_func = sort_by_size
+                stats = {entry.name: stat(entry) for entry in entries}
+                entries.sort(key=lambda e: s.st_size if (s := stats[e.name]) is not None else -1, reverse=(sort_order == "desc"))
             case "mtime":
-                key_func = sort_by_mtime
+                stats = {entry.name: stat(entry) for entry in entries}
+                entries.sort(key=lambda e: s.st_mtime if (s := stats[e.name]) is not None else -1, reverse=(sort_order == "desc"))
             case _:
-                key_func = sort_by_name
-        
-        if full_path.exists() and full_path.is_dir():
-            counter = 0
-            paths: list[BrowserPath] = []
-            dir_paths = sorted(list(full_path.iterdir()), key=key_func, reverse=(sort_order == "desc"))
-            for path in dir_paths:
-                if offset:
-                    offset -= 1
-                    continue
-                
-                if not self._is_safe(path.relative_to(self.root_dir)):
-                    continue
-                
-                paths.append(BrowserPath(
-                    path=path,
-                    rel_path=path.relative_to(self.root_dir),
-                    data_paths=self.db.data_paths.find(
-                        path=path.relative_to(self.root_dir).as_posix(), limit=None,
-                        options=[
-                            orm.joinedload(models.DataPath.project),
-                            orm.joinedload(models.DataPath.seq_request),
-                            orm.joinedload(models.DataPath.library),
-                            orm.joinedload(models.DataPath.experiment),
-                        ]  # type: ignore
-                    )[0]
-                ))
+                entries.sort(key=lambda e: e.name.lower(), reverse=(sort_order == "desc"))
+
+        # paginate before any per-entry work
+        page: list[os.DirEntry] = []
+        for entry in entries[offset or 0:]:
+            if entry.is_symlink() and not self._is_safe(Path(entry.path).relative_to(self.root_dir)):
+                continue
+            page.append(entry)
+            if limit is not None and len(page) >= limit:
+                break
+
+        rel_paths = [Path(entry.path).relative_to(self.root_dir) for entry in page]
+        data_paths = self.db.data_paths.find_by_paths(
+            [rel_path.as_posix() for rel_path in rel_paths],
+            options=[
+                orm.joinedload(models.DataPath.project),
+                orm.joinedload(models.DataPath.seq_request),
+                orm.joinedload(models.DataPath.library),
+                orm.joinedload(models.DataPath.experiment),
+            ]  # type: ignore
+        )
 
-                counter += 1
-                if limit is not None and counter >= limit:
-                    break
-            return paths
-        return []
+        return [
+            BrowserPath(
+                path=Path(entry.path),
+                rel_path=rel_path,
+                data_paths=data_paths[rel_path.as_posix()],
+                stat=stat(entry),
+                is_dir=entry.is_dir(),
+            )
+            for entry, rel_path in zip(page, rel_paths)
+        ]
     
     def _is_safe(self, subpath: Path) -> bool:
         """Check if the subpath is safe and doesn't escape root_dir"""
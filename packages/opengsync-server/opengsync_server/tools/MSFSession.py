@@ -0,0 +1,254 @@
+import json
+import hashlib
+from typing import TYPE_CHECKING
+
+import pandas as pd
+import pyarrow as pa
+
+if TYPE_CHECKING:
+    from .RedisMSFFileCache import RedisMSFFileCache
+
+
+class MSFSession:
+    """ Request-scoped view of one multi-step-form workflow instance in the msf cache.
+
+    Loads the step list, the workflow's key index and table map in one pipeline and all
+    header/metadata dicts of all steps in one MGET. Tables are fetched on first access (only from
+    steps that have them). Writes are buffered and sent in one pipeline by `flush()`, which the app
+    calls at request teardown. The index set `{workflow}:{uuid}:keys` replaces SCAN/delete_pattern
+    for listing and deleting the workflow's keys.
+
+    Tables are stored once per content hash (`{workflow}:{uuid}:blobs:{hash}`), the hash
+    `{workflow}:{uuid}:tables` maps each step's table key to its blob, so a table carried forward
+    unchanged to a later step is not written again. Decoded blobs are memoized for the request.
+
+    The steps key is kept as a member of the index so that the index exists for workflows that only
+    write tables. Workflows started before the index (or the table map) existed are migrated on first
+    load: their keys are found with one SCAN and persisted to the index, tables stored directly under
+    their table key are mapped to themselves as blobs.
+    """
+    DICT_NAMES = ("header", "metadata")
+
+    def __init__(self, cache: "RedisMSFFileCache", workflow: str, uuid: str, write_through: bool = False):
+        self.cache = cache
+        self.prefix = f"{workflow}:{uuid}"
+        self.write_through = write_through
+        self._steps: list[str] | None = None
+        self._index: set[str] = set()
+        self._tables: dict[str, str] = {}                   # table key -> blob key
+        self._arrow: dict[str, pa.Table] = {}               # blob key -> decoded table
+        self._values: dict[str, dict | pd.DataFrame | None] = {}
+        self._dirty: set[str] = set()
+        self._deleted: set[str] = set()
+        self._steps_dirty = False
+        self._dicts_loaded = False
+
+    @property
+    def steps_key(self) -> str:
+        return f"{self.prefix}:steps"
+
+    @property
+    def index_key(self) -> str:
+        return f"{self.prefix}:keys"
+
+    @property
+    def tables_key(self) -> str:
+        return f"{self.prefix}:tables"
+
+    def blob_key(self, data: bytes) -> str:
+        return f"{self.prefix}:blobs:{hashlib.blake2b(data, digest_size=16).hexdigest()}"
+
+    def dict_key(self, step: str, name: str) -> str:
+        return f"{self.prefix}:{step}:{name}"
+
+    def table_key(self, step: str, name: str) -> str:
+        return f"{self.prefix}:{step}:tables:{name}"
+
+    def is_table_key(self, key: str) -> bool:
+        return key.startswith(f"{self.prefix}:") and ":tables:" in key[len(self.prefix) + 1:]
+
+    def _load(self) -> None:
+        if self._steps is not None:
+            return
+        pipe = self.cache.redis.pipeline()
+        pipe.get(self.steps_key)
+        pipe.smembers(self.index_key)
+        pipe.hgetall(self.tables_key)
+        steps, index, tables = pipe.execute()
+        self._steps = json.loads(steps.decode("utf-8")) if steps is not None else []
+        self._index = {key.decode("utf-8") for key in index} - {self.steps_key}
+        self._tables = {key.decode("utf-8"): blob.decode("utf-8") for key, blob in tables.items()}
+        if not index and self._steps:
+            # workflows started before the index existed
+            blobs_prefix = f"{self.prefix}:blobs:"
+            self._index = {
+                key for raw in self.cache.redis.scan_iter(match=f"{self.prefix}:*")
+                if not (key := raw.decode("utf-8")).startswith(blobs_prefix)
+            } - {self.steps_key, self.tables_key, self.index_key}
+            self._migrate()
+        elif any(self.is_table_key(key) for key in self._index):
+            # workflows started before the table map existed
+            self._migrate()
+
+    def _migrate(self) -> None:
+        """ persists the index and moves tables stored under their own key from the index to the table map """
+        legacy_tables = {key for key in self._index if self.is_table_key(key)}
+        self._index -= legacy_tables
+        self._tables = {key: key for key in legacy_tables} | self._tables
+
+        ex = self.cache.time_to_live_hours * 3600
+        pipe = self.cache.redis.pipeline(transaction=False)
+        if legacy_tables:
+            pipe.srem(self.index_key, *legacy_tables)
+            pipe.hset(self.tables_key, mapping={key: key for key in legacy_tables})  # type: ignore
+            pipe.expire(self.tables_key, ex)
+        pipe.sadd(self.index_key, self.steps_key, *self._index)
+        pipe.expire(self.index_key, ex)
+        pipe.execute()
+
+    @property
+    def steps(self) -> list[str]:
+        self._load()
+        return self._steps  # type: ignore
+
+    def set_steps(self, steps: list[str]) -> None:
+        self._load()
+        self._steps = steps
+        self._steps_dirty = True
+        self._write()
+
+    def _load_dicts(self) -> None:
+        if self._dicts_loaded:
+            return
+        self._dicts_loaded = True
+        keys = [
+            key for step in self.steps for name in self.DICT_NAMES
+            if (key := self.dict_key(step, name)) in self._index and key not in self._values
+        ]
+        if not keys:
+            return
+        for key, data in zip(keys, self.cache.redis.mget(keys)):  # type: ignore
+            self._values[key] = json.loads(data.decode("utf-8")) if data is not None else None
+
+    def get_dict(self, key: str) -> dict | None:
+        if key in self._deleted:
+            return None
+        if key not in self._values:
+            self._load_dicts()
+        return self._values.get(key)  # type: ignore
+
+    def set_dict(self, key: str, data: dict) -> None:
+        self._set(key, data)
+
+    def has(self, key: str) -> bool:
+        self._load()
+        return key not in self._deleted and (key in self._tables or key in self._index or key in self._dirty)
+
+    def get_table(self, key: str) -> pd.DataFrame | None:
+        if key not in self._values:
+            if not self.has(key) or (blob_key := self._tables.get(key)) is None:
+                return None
+            if (table := self._arrow.get(blob_key)) is None:
+                if (data := self.cache.redis.get(blob_key)) is None:
+                    return None
+                table = self._arrow[blob_key] = self.cache.loads_arrow(data)  # type: ignore
+            self._values[key] = table.to_pandas()
+        return self._values[key]  # type: ignore
+
+    def set_table(self, key: str, table: pd.DataFrame) -> None:
+        self._set(key, table)
+
+    def table_names(self, step: str) -> list[str]:
+        self._load()
+        prefix = self.table_key(step, "")
+        return sorted(
+            key[len(prefix):] for key in (self._index | self._tables.keys() | self._dirty) - self._deleted
+            if key.startswith(prefix)
+        )
+
+    def _set(self, key: str, value: dict | pd.DataFrame) -> None:
+        self._load()
+        self._values[key] = value
+        self._dirty.add(key)
+        self._deleted.discard(key)
+        self._write()
+
+    def delete_step(self, step: str) -> None:
+        """ removes all dicts and tables written in `step` """
+        self._load()
+        prefix = f"{self.prefix}:{step}:"
+        for key in (self._index | self._tables.keys() | self._dirty):
+            if key.startswith(prefix):
+                self._deleted.add(key)
+                self._dirty.discard(key)
+                self._values.pop(key, None)
+        self._write()
+
+    def delete_all(self) -> None:
+        self._load()
+        self._deleted |= self._index | self._tables.keys() | self._dirty | set(self._tables.values())
+        self._deleted |= {self.steps_key, self.index_key, self.tables_key}
+        self._dirty.clear()
+        self._values.clear()
+        self._steps = []
+        self._steps_dirty = False
+        self._write()
+
+    def _write(self) -> None:
+        if self.write_through:
+            self.flush()
+
+    def flush(self) -> None:
+        """ sends all buffered writes and deletes in one pipeline """
+        if not (self._dirty or self._deleted or self._steps_dirty):
+            return
+
+        ex = self.cache.time_to_live_hours * 3600
+        tables = dict(self._tables)
+        blobs: dict[str, bytes] = {}
+        dicts: dict[str, bytes] = {}
+        for key in self._dirty:
+            value = self._values[key]
+            if isinstance(value, pd.DataFrame):
+                data = self.cache.dumps_table(value)
+                tables[key] = self.blob_key(data)
+                blobs[tables[key]] = data
+            else:
+                dicts[key] = json.dumps(value).encode("utf-8")
+
+        deleted_tables = {key for key in self._deleted if key in tables}
+        for key in deleted_tables:
+            tables.pop(key)
+        referenced = set(tables.values())
+        orphaned = set(self._tables.values()) - referenced
+
+        pipe = self.cache.redis.pipeline(transaction=False)
+        # legacy tables are their own blob, deleting or overwriting them orphans their key
+        if (deleted := self._deleted | orphaned):
+            pipe.delete(*deleted)
+            if (index_keys := self._deleted & self._index) and self.index_key not in self._deleted:
+                pipe.srem(self.index_key, *index_keys)
+        if deleted_tables and self.tables_key not in self._deleted:
+            pipe.hdel(self.tables_key, *deleted_tables)
+        for key, data in dicts.items():
+            pipe.set(key, data, ex=ex)
+        for blob_key, data in blobs.items():
+            if blob_key in self._tables.values():
+                pipe.expire(blob_key, ex)   # unchanged content, e.g. a table carried forward to the next step
+            else:
+                pipe.set(blob_key, data, ex=ex)
+        if (table_writes := {key: tables[key] for key in self._dirty if key in tables}):
+            pipe.hset(self.tables_key, mapping=table_writes)  # type: ignore
+            pipe.expire(self.tables_key, ex)
+        if self._steps_dirty:
+            pipe.set(self.steps_key, json.dumps(self._steps).encode("utf-8"), ex=ex)
+        if dicts or table_writes or self._steps_dirty:
+            pipe.sadd(self.index_key, self.steps_key, *dicts.keys())
+            pipe.expire(self.index_key, ex)
+        pipe.execute()
+
+        self._index = (self._index | dicts.keys()) - self._deleted
+        self._tables = tables
+        self._dirty.clear()
+        self._deleted.clear()
+        self._steps_dirty = False
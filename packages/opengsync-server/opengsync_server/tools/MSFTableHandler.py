@@ -1,15 +1,14 @@
 import pandas as pd
 
-from .RedisMSFFileCache import RedisMSFFileCache
+from .MSFSession import MSFSession
 
 class MSFTableHandler:
-    def __init__(self, template: str, msf_cache: RedisMSFFileCache, steps: list[str]):
+    """ tables of the workflow, a table is read from the latest step that has it and written to the current step """
+    def __init__(self, template: str, session: MSFSession):
         self.__tables: dict[str, pd.DataFrame] = {}
         self.template = template
-        self.r = msf_cache
-        self.steps = steps
-        self.steps.reverse()
-        self.current_step = steps[-1]
+        self.session = session
+        self.current_step = session.steps[-1]
 
     def key(self, step_name: str, table_name: str) -> str:
         return self.template.format(step=step_name, table=table_name)
@@ -18,8 +17,8 @@ class MSFTableHandler:
         if key in self.__tables:
             return self.__tables[key]
         
-        for step in self.steps:
-            if (table := self.r.get_table(self.key(step, key))) is not None:
+        for step in reversed(self.session.steps):
+            if (table := self.session.get_table(self.key(step, key))) is not None:
                 self.__tables[key] = table
                 return table
 
@@ -27,14 +26,11 @@ class MSFTableHandler:
     
     def __setitem__(self, key: str, table: pd.DataFrame) -> None:
         self.__tables[key] = table
-        self.r.set_table(self.key(self.current_step, key), table)
+        self.session.set_table(self.key(self.current_step, key), table)
 
     def get(self, key: str, step: str | None = None) -> pd.DataFrame | None:
         if step is not None:
-            try:
-                return self.r.get_table(self.key(step, key))
-            except KeyError:
-                return None
+            return self.session.get_table(self.key(step, key))
         try:
             return self[key]
         except KeyError:
@@ -42,12 +38,8 @@ class MSFTableHandler:
         
     def keys(self) -> list[str]:
         tables = list(self.__tables.keys())
-        if self.r is None:
-            raise RuntimeError("You need to call connect() before using the cache.")
-        
-        for step in self.steps:
-            for key in self.r.r.scan_iter(match=self.key(step, "*")):  # type: ignore
-                table_name = key.decode('utf-8').split(":")[-1]
+        for step in reversed(self.session.steps):
+            for table_name in self.session.table_names(step):
                 if table_name not in tables:
                     tables.append(table_name)
-        return tables
\ No newline at end of file
+        return tables
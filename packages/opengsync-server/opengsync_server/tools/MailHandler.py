@@ -1,33 +1,51 @@
+import json
+import time
 from typing import Sequence, Literal
 
+from uuid6 import uuid7
+import redis
 import premailer
 import smtplib
+import sqlalchemy as sa
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from opengsync_db import DBHandler, models
+from opengsync_db.categories import DeliveryStatus
+
 
 from .. import logger
 
 
 class MailHandler:
+    """ Sends emails directly (`send_email`) or through the outbox (`enqueue_email`), which the celery
+    worker sends in batches over one SMTP connection (see opengsync_worker.tasks.mail_outbox). """
+    OUTBOX_MESSAGES_KEY = "mail_outbox:messages"    # hash: message id -> message json
+    OUTBOX_QUEUE_KEY = "mail_outbox:queue"          # sorted set: message id -> unix time of next attempt
+
     sender_address: str
     smtp_server: str
     smtp_user: str
     smtp_password: str
     smtp_port: int
     use_tls: bool
+    outbox: redis.Redis | None = None
+    db: DBHandler | None = None
     __initialized = False
 
-    def init_app(self, sender_address: str, smtp_server: str, smtp_user: str, smtp_password: str, smtp_port: int = 587, use_tls: bool = True):
+    def init_app(self, sender_address: str, smtp_server: str, smtp_user: str, smtp_password: str, smtp_port: int = 587, use_tls: bool = True, outbox: redis.Redis | None = None, db: DBHandler | None = None):
         self.sender_address = sender_address
         self.smtp_server = smtp_server
         self.smtp_user = smtp_user
         self.smtp_password = smtp_password
         self.smtp_port = smtp_port
         self.use_tls = use_tls
+        self.outbox = outbox
+        self.db = db
         self.__initialized = True
 
-    def send_email(self, recipients: str | Sequence[str], subject: str, body: str, mime_type: Literal["plain", "html"] = "plain"):
+    def send_email(self, recipients: str | Sequence[str], subject: str, body: str, mime_type: Literal["plain", "html"] = "plain") -> dict:
+        """ returns the refused recipients, {email: (code, response)} """
         if not self.__initialized:
             raise RuntimeError("MailHandler not initialized. Call init_app() before using this method.")
         
@@ -50,8 +68,65 @@ class MailHandler:
             message["Subject"] = subject
             
             message.attach(MIMEText(body, mime_type))
-            server.send_message(message, from_addr=self.sender_address, to_addrs=recipients)
+            return server.send_message(message, from_addr=self.sender_address, to_addrs=recipients)
 
+    def _set_delivery_status(self, links: Sequence[tuple[int, str]], status: DeliveryStatus) -> None:
+        if not links or self.db is None:
+            return
+        link = models.links.SeqRequestDeliveryEmailLink
+        self.db.execute(
+            sa.update(link)
+            .where(sa.tuple_(link.seq_request_id, link.email).in_(links))
+            .values(status_id=status.id)
+        )
 
-        
-        
+    def enqueue_email(
+        self, recipients: str | Sequence[str], subject: str, body: str, mime_type: Literal["plain", "html"] = "plain",
+        delivery_links: Sequence[tuple[int, str]] | None = None,
+    ) -> str:
+        """ Persists the message in the outbox and returns its id, the worker sends it. `delivery_links` are
+        (seq_request_id, email) of the share-email links whose status the worker updates per recipient. """
+        if not self.__initialized:
+            raise RuntimeError("MailHandler not initialized. Call init_app() before using this method.")
+
+        if self.outbox is None:
+            logger.warning("Mail outbox not configured, sending email directly.")
+            links = list(delivery_links or [])
+            try:
+                refused = self.send_email(recipients=recipients, subject=subject, body=body, mime_type=mime_type)
+            except smtplib.SMTPRecipientsRefused as e:
+                refused = e.recipients
+            except (smtplib.SMTPException, OSError) as e:
+                # like the worker, a failed email is recorded on the links instead of failing the request
+                logger.error(f"Failed to send email '{subject}' to {recipients}: {e}")
+                self._set_delivery_status(links, DeliveryStatus.FAILED)
+                return ""
+            if refused:
+                logger.error(f"Email '{subject}' refused for {refused}")
+            self._set_delivery_status([link for link in links if link[1] in refused], DeliveryStatus.FAILED)
+            self._set_delivery_status([link for link in links if link[1] not in refused], DeliveryStatus.DISPATCHED)
+            return ""
+
+        if isinstance(recipients, str):
+            recipients = [recipients]
+
+        if mime_type == "html":
+            body = premailer.transform(body)
+
+        message_id = str(uuid7())
+        message = {
+            "id": message_id,
+            "sender": self.sender_address,
+            "recipients": list(recipients),
+            "subject": subject,
+            "body": body,
+            "mime_type": mime_type,
+            "delivery_links": [list(link) for link in delivery_links or []],
+            "attempts": 0,
+            "created": time.time(),
+        }
+        pipe = self.outbox.pipeline()
+        pipe.hset(self.OUTBOX_MESSAGES_KEY, message_id, json.dumps(message))
+        pipe.zadd(self.OUTBOX_QUEUE_KEY, {message_id: time.time()})
+        pipe.execute()
+        return message_id
@@ -1,21 +1,72 @@
-import io
 import json
 import pyarrow as pa
 from pyarrow import parquet as pq
 import pandas as pd
 import redis
+from flask import g, has_request_context
 
 from .. import logger
+from .MSFSession import MSFSession
 
 
 class RedisMSFFileCache():
-    def __init__(self, time_to_live_hours: int = 24 * 7):
+    PARQUET_MAGIC = b"PAR1"
+
+    def __init__(self, time_to_live_hours: int = 24 * 7, compression: str | None = "lz4"):
         self.r: redis.StrictRedis | None = None
         self.time_to_live_hours = time_to_live_hours
+        if compression is not None and not pa.Codec.is_available(compression):
+            logger.warning(f"Arrow codec '{compression}' not available, storing uncompressed tables.")
+            compression = None
+        self.write_options = pa.ipc.IpcWriteOptions(compression=compression)
 
     def connect(self, host: str, port: int, db: int):
         self.r = redis.StrictRedis(host=host, port=port, db=db, decode_responses=False)
 
+    @property
+    def redis(self) -> redis.StrictRedis:
+        if self.r is None:
+            raise RuntimeError("You need to call connect() before using the cache.")
+        return self.r
+
+    def dumps_table(self, table: pd.DataFrame) -> bytes:
+        """ Arrow IPC stream (optionally compressed), intermediates are read back often and never archived """
+        arrow_table = pa.Table.from_pandas(table)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, arrow_table.schema, options=self.write_options) as writer:
+            writer.write_table(arrow_table)
+        return sink.getvalue().to_pybytes()
+
+    @classmethod
+    def loads_arrow(cls, data: bytes) -> pa.Table:
+        buffer = pa.py_buffer(data)
+        # tables written before the switch to Arrow IPC
+        if data[:4] == cls.PARQUET_MAGIC:
+            return pq.read_table(pa.BufferReader(buffer))
+        return pa.ipc.open_stream(buffer).read_all()
+
+    @classmethod
+    def loads_table(cls, data: bytes) -> pd.DataFrame:
+        return cls.loads_arrow(data).to_pandas()
+
+    def session(self, workflow: str, uuid: str) -> MSFSession:
+        """ one session per workflow instance and request, flushed by `flush_sessions()` at request teardown.
+        Outside of a request every write is sent immediately. """
+        if not has_request_context():
+            return MSFSession(self, workflow, uuid, write_through=True)
+        if (sessions := g.get("msf_sessions")) is None:
+            sessions = g.msf_sessions = {}
+        if (session := sessions.get((workflow, uuid))) is None:
+            session = sessions[(workflow, uuid)] = MSFSession(self, workflow, uuid)
+        return session
+
+    def flush_sessions(self) -> None:
+        for session in (g.pop("msf_sessions", None) or {}).values():
+            try:
+                session.flush()
+            except redis.RedisError as e:
+                logger.error(f"Failed to flush multi-step form session '{session.prefix}': {e}")
+
     def get_table(self, key: str) -> pd.DataFrame | None:
         if self.r is None:
             raise RuntimeError("You need to call connect() before using the cache.")
@@ -23,7 +74,7 @@ class RedisMSFFileCache():
         if (data := self.r.get(key)) is None:
             return None
         
-        return pd.read_parquet(io.BytesIO(data))  # type: ignore
+        return self.loads_table(data)  # type: ignore
     
     def get_tables(self, pattern: str) -> dict[str, pd.DataFrame]:
         if self.r is None:
@@ -32,7 +83,7 @@ class RedisMSFFileCache():
         tables = {}
         for key in self.r.scan_iter(match=pattern):
             if (data := self.r.get(key)) is not None:
-                tables[key.decode('utf-8')] = pd.read_parquet(io.BytesIO(data))  # type: ignore
+                tables[key.decode('utf-8')] = self.loads_table(data)  # type: ignore
         
         return tables
 
@@ -60,9 +111,7 @@ class RedisMSFFileCache():
         if self.r is None:
             raise RuntimeError("You need to call connect() before using the cache.")
         
-        buffer = io.BytesIO()
-        pq.write_table(pa.Table.from_pandas(table), buffer)
-        self.r.set(key, buffer.getvalue(), ex=self.time_to_live_hours * 3600)
+        self.r.set(key, self.dumps_table(table), ex=self.time_to_live_hours * 3600)
 
     def set_dict(self, key: str, data: dict) -> None:
         if self.r is None:
@@ -3,6 +3,7 @@ import re
 import html
 from pathlib import Path
 import urllib.parse
+from stat import S_ISDIR, S_ISREG
 from dataclasses import dataclass
 from datetime import datetime
 
@@ -10,6 +11,7 @@ from opengsync_db import models, DBHandler
 
 from .. import logger
 from ..core import exceptions
+from .DirectoryCache import PathInfo, directory_cache
 
 @dataclass
 class DAVProp:
@@ -27,6 +29,38 @@ class DAVResponse:
     href: str
     propstats: list[DAVPropStat]
 
+class SharePathTrie:
+    """ Prefix trie of the shared paths (relative to root_dir), a path is allowed if it is
+    inside a shared path or one of its parent directories. """
+
+    def __init__(self, root_dir: Path, shared_paths: list[Path]):
+        self.root_dir = root_dir
+        self.root: dict[str, dict] = {}
+        self.root_shared = False
+        for shared_path in shared_paths:
+            if not shared_path.is_relative_to(root_dir):
+                # a shared path above root_dir shares everything below root_dir
+                self.root_shared |= root_dir.is_relative_to(shared_path)
+                continue
+            node = self.root
+            for part in shared_path.relative_to(root_dir).parts:
+                node = node.setdefault(part, {})
+            node[""] = {}  # terminal marker, path parts are never empty
+
+        self.root_shared |= "" in self.root
+
+    def allows(self, full_path: Path) -> bool:
+        if self.root_shared:
+            return True
+        node = self.root
+        for part in full_path.relative_to(self.root_dir).parts:
+            if "" in node:
+                return True
+            if (node := node.get(part)) is None:  # type: ignore[assignment]
+                return False
+        return bool(node)
+
+
 class SharedFileBrowser:
     OS_JUNK_REGEX = re.compile(
         r'(^|/)'
@@ -43,29 +77,37 @@ class SharedFileBrowser:
         re.IGNORECASE
     )
 
-    def __init__(self, root_dir: Path, db: DBHandler, share_token: models.ShareToken, allow_symlink_traversal: bool = True):
+    def __init__(
+        self, root_dir: Path, db: DBHandler, share_token: models.ShareToken | None,
+        allow_symlink_traversal: bool = True, shared_paths: list[str] | None = None
+    ):
+        """ shared_paths overrides the paths of share_token """
         self.root_dir = root_dir.resolve()
         self.db = db
         self.share_token = share_token
-        self.shared_paths = [(self.root_dir / share_path.path).resolve() for share_path in share_token.paths]
+        if shared_paths is None:
+            if share_token is None:
+                raise ValueError("Either share_token or shared_paths must be provided.")
+            shared_paths = [share_path.path for share_path in share_token.paths]
+        self.shared_paths = [(self.root_dir / path).resolve() for path in shared_paths]
+        self.shared_path_trie = SharePathTrie(self.root_dir, self.shared_paths)
         # allows relative symlink traversal upstream of shared paths, but not outside of root_dir
         self.allow_symlink_traversal = allow_symlink_traversal
 
-    def list_contents(self, subpath: Path = Path()) -> list[Path]:
+    def list_entries(self, subpath: Path = Path()) -> list[PathInfo]:
+        """ safe entries of one directory with their metadata, from the directory cache """
         if not self.is_safe(subpath):
             return []
         
         full_path = self.root_dir / subpath
         
-        if full_path.exists() and full_path.is_dir():
-            paths: list[Path] = []
-            for path in full_path.iterdir():
-                if not self._is_safe(path):
-                    continue
-                paths.append(path)
-            return paths
+        if (entries := directory_cache.list_dir(full_path)) is None:
+            return []
+        
+        return [entry for entry in entries if self._is_safe_entry(entry)]
 
-        return []
+    def list_contents(self, subpath: Path = Path()) -> list[Path]:
+        return [entry.path for entry in self.list_entries(subpath)]
     
     def get_file(self, subpath: Path = Path()) -> Path | None:
         if not self.is_safe(subpath):
@@ -84,12 +126,21 @@ class SharedFileBrowser:
                 abs_path = full_path.resolve()
                 if not abs_path.is_relative_to(self.root_dir):
                     return False
-            for shared_path in self.shared_paths:
-                if full_path.is_relative_to(shared_path) or shared_path.is_relative_to(full_path):
-                    return True
-            return False
+            return self.shared_path_trie.allows(full_path)
         except (ValueError, RuntimeError):
             return False
+    
+    def _is_safe_entry(self, entry: PathInfo) -> bool:
+        """Same as _is_safe for a cached directory entry, without touching the filesystem"""
+        try:
+            if not entry.path.is_relative_to(self.root_dir):
+                return False
+            if self.allow_symlink_traversal and entry.is_symlink:
+                if entry.resolved is None or not entry.resolved.is_relative_to(self.root_dir):
+                    return False
+            return self.shared_path_trie.allows(entry.path)
+        except ValueError:
+            return False
         
     def is_safe(self, subpath: Path) -> bool:
         """Public method to check if a subpath is safe"""
@@ -110,31 +161,34 @@ class SharedFileBrowser:
             raise exceptions.NoPermissionsException()
 
         full_path = self.root_dir / subpath
+        target = PathInfo.from_path(full_path)
 
-        if not full_path.exists():
+        if target.mtime is None:
             raise exceptions.NotFoundException(f"File or directory not found: {subpath}")
 
         resources: list[DAVResponse] = []
 
-        target_resource = self._build_resource_props(full_path, subpath)
+        target_resource = self._build_resource_props(target, subpath)
         if target_resource:
             resources.append(target_resource)
 
-        if depth == 1 and full_path.is_dir():
-            for child_path in full_path.iterdir():
-                if not self._is_safe(child_path):
+        if depth == 1 and target.is_dir:
+            for child in directory_cache.list_dir(full_path) or []:
+                if not self._is_safe_entry(child):
                     continue
-                child_resource = self._build_resource_props(child_path, subpath)
+                child_resource = self._build_resource_props(child, subpath)
                 if child_resource:
                     resources.append(child_resource)
 
         return resources
 
-    def _build_resource_props(self, fs_path: Path, requested_subpath: Path) -> DAVResponse | None:
+    def _build_resource_props(self, info: PathInfo, requested_subpath: Path) -> DAVResponse | None:
         """Build DAVResponse for a single file/directory"""
+        if info.mtime is None or info.size is None:
+            return None
+        
+        fs_path = info.path
         try:
-            stat = fs_path.stat()
-
             try:
                 if requested_subpath in (Path(), Path("/")):
                     rel = fs_path.relative_to(self.root_dir)
@@ -144,7 +198,7 @@ class SharedFileBrowser:
             except ValueError:
                 href = fs_path.relative_to(self.root_dir).as_posix()
 
-            if fs_path.is_dir() and not href.endswith('/'):
+            if info.is_dir and not href.endswith('/'):
                 href += '/'
 
             href = href.replace("./", "/")
@@ -152,13 +206,13 @@ class SharedFileBrowser:
 
             props = [
                 DAVProp("displayname", html.escape(fs_path.name)),
-                DAVProp("getlastmodified", self._format_date(stat.st_mtime)),
+                DAVProp("getlastmodified", self._format_date(info.mtime)),
             ]
 
-            if fs_path.is_file():
-                props.append(DAVProp("getcontentlength", str(stat.st_size)))
+            if info.is_file:
+                props.append(DAVProp("getcontentlength", str(info.size)))
                 props.append(DAVProp("resourcetype", ""))
-            elif fs_path.is_dir():
+            elif info.is_dir:
                 props.append(DAVProp("resourcetype", "<D:collection/>"))
                 props.append(DAVProp("getcontentlength", "0"))
 
@@ -166,7 +220,7 @@ class SharedFileBrowser:
 
             return DAVResponse(href=href, propstats=[propstat])
 
-        except (OSError, ValueError):
+        except ValueError:
             return None
 
     def _format_date(self, timestamp: float) -> str:
@@ -175,18 +229,19 @@ class SharedFileBrowser:
         return dt.strftime("%a, %d %b %Y %H:%M:%S GMT")
     
     def get_file_info(self, subpath: Path) -> tuple[Path, os.stat_result] | None:
-        """Return file path and stat if it's a safe, existing file."""
+        """Return path and stat if it's a safe, existing file or directory (check with `S_ISDIR(stat.st_mode)`)."""
         if not self.is_safe(subpath):
             return None
 
         full_path = self.root_dir / subpath
 
-        if full_path.is_file():
-            try:
-                stat = full_path.stat()
-                return full_path, stat
-            except OSError:
-                return None
+        try:
+            stat = full_path.stat()
+        except OSError:
+            return None
+
+        if S_ISREG(stat.st_mode) or S_ISDIR(stat.st_mode):
+            return full_path, stat
 
         return None
 
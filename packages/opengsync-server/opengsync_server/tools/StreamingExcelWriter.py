@@ -0,0 +1,231 @@
+import datetime
+import tempfile
+from typing import Any, Iterator, Literal
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Side, Border, NamedStyle
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+from .ExcelWriter import BorderStyle
+
+EXCEL_TYPES = (str, int, float, bool, datetime.datetime, datetime.date, datetime.time, datetime.timedelta, np.number, np.bool_)
+
+
+class StreamingExcelWriter:
+    """ Write-only counterpart of `ExcelWriter` with the same sheet/style API.
+
+    The `apply_*` methods only record the styles of a sheet. Each sheet is written once, row by row, into a
+    write-only openpyxl workbook (rows are serialized to disk as they are appended, no cell objects are kept) when
+    the file is requested (`get_bytes`, `save_xlsx`, `iter_bytes`). Styles are registered once per workbook as
+    named styles, column widths are computed from the DataFrames. The workbook is spooled to a temporary file
+    (in memory up to `spool_max_size` bytes) and `iter_bytes` streams it in chunks.
+
+    Styles are combined in the order header/body style, column width (alignment), alternating colors (fill),
+    independent of the order of the `apply_*` calls.
+    """
+    def __init__(self, dfs: dict[str, pd.DataFrame], index: bool = True, spool_max_size: int = 8 * 1024 * 1024):
+        self.dfs = dfs
+        self.index = index
+        self.spool_max_size = spool_max_size
+        self.styles: dict[str, dict[str, dict[str, Any]]] = {sheet_name: {} for sheet_name in dfs.keys()}
+        self._file: tempfile.SpooledTemporaryFile | None = None
+        self._size = 0
+
+    def _set_style(self, sheet_name: str | None, kind: str, **kwargs) -> None:
+        if sheet_name is not None and sheet_name not in self.dfs:
+            raise KeyError(f"Sheet '{sheet_name}' not found in DataFrames")
+        if self._file is not None:
+            raise RuntimeError("Workbook already written, styles must be applied before it is requested.")
+        for sheet in ([sheet_name] if sheet_name is not None else self.dfs.keys()):
+            self.styles[sheet][kind] = kwargs
+
+    def apply_header_style(
+        self, sheet_name: str | None, fill_color: str = "E0E0E0",
+        font_size: int = 12, bold: bool = True, border: bool = True,
+        border_style: BorderStyle = "thin", border_color: str = "000000",
+        alignment: Literal["center", "left", "right"] | None = "center"
+    ):
+        self._set_style(
+            sheet_name, "header", fill_color=fill_color, font_size=font_size, bold=bold, border=border,
+            border_style=border_style, border_color=border_color, alignment=alignment
+        )
+
+    def apply_body_style(
+        self, sheet_name: str | None, fill_color: str = "E0E0E0",
+        font_size: int = 12, bold: bool = True, border: bool = True,
+        border_style: BorderStyle = "thin", border_color: str = "969696",
+        alignment: Literal["center", "left", "right"] | None = None
+    ):
+        self._set_style(
+            sheet_name, "body", fill_color=fill_color, font_size=font_size, bold=bold, border=border,
+            border_style=border_style, border_color=border_color, alignment=alignment
+        )
+
+    def apply_alternating_colors(
+        self, sheet_name: str | None, column: str, index: bool = True,
+        primary_color: str = "E6F3FF", secondary_color: str = "FFFFFF"
+    ):
+        """Apply alternating colors based on a column value"""
+        self._set_style(sheet_name, "alternating", column=column, primary_color=primary_color, secondary_color=secondary_color)
+
+    def apply_column_width(
+        self, sheet_name: str | None, min_width: int = 10, max_width: int = 50, padding: int = 5,
+    ):
+        self._set_style(sheet_name, "width", min_width=min_width, max_width=max_width, padding=padding)
+
+    @staticmethod
+    def _cell_style(
+        name: str, fill_color: str | None = None, font_size: int = 12, bold: bool = True, border: bool = True,
+        border_style: BorderStyle = "thin", border_color: str = "000000", alignment: Alignment | None = None,
+    ) -> NamedStyle:
+        style = NamedStyle(name=name, font=Font(size=font_size, bold=bold))
+        if fill_color is not None:
+            style.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
+        if alignment is not None:
+            style.alignment = alignment
+        if border:
+            side = Side(style=border_style, color=border_color)
+            style.border = Border(left=side, right=side, top=side, bottom=side)
+        return style
+
+    def _sheet_styles(self, wb: Workbook, sheet_name: str) -> tuple[str | None, list[str | None]]:
+        """ registers the named styles of the sheet, returns the header style and the body style(s), one per
+        alternating fill """
+        styles = self.styles[sheet_name]
+        width_alignment = Alignment(wrap_text=False, vertical="top") if "width" in styles else None
+        plain = dict(font_size=11, bold=False, border=False)
+        # like ExcelWriter, sheets without the key column get no alternating fill
+        if (alternating := styles.get("alternating")) is not None and alternating["column"] not in self.dfs[sheet_name].columns:
+            alternating = None
+
+        def register(kind: str, **kwargs) -> str:
+            style = self._cell_style(f"{sheet_name} {kind}"[:255], **kwargs)
+            wb.add_named_style(style)
+            return style.name
+
+        header_style = None
+        if (header := styles.get("header")) is not None:
+            header = dict(header)
+            alignment = header.pop("alignment")
+            header_style = register(
+                "header", alignment=width_alignment or Alignment(horizontal=alignment, vertical=alignment, wrap_text=True), **header
+            )
+        elif width_alignment is not None:
+            header_style = register("header", alignment=width_alignment, **plain)
+
+        if (body := styles.get("body")) is not None:
+            body = dict(body)
+            vertical = body.pop("alignment")
+            alignment = width_alignment or Alignment(horizontal="left", vertical=vertical, wrap_text=True)
+        elif width_alignment is not None or alternating is not None:
+            body = dict(plain)
+            alignment = width_alignment
+        else:
+            return header_style, [None]
+
+        if alternating is not None:
+            body.pop("fill_color", None)
+            return header_style, [
+                register(f"body {i}", fill_color=fill_color, alignment=alignment, **body)
+                for i, fill_color in enumerate((alternating["primary_color"], alternating["secondary_color"]))
+            ]
+        return header_style, [register("body", alignment=alignment, **body)]
+
+    def _frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """ index as first column (if written), missing values as None and values openpyxl can't write as str """
+        if self.index:
+            df = df.reset_index(names=[df.index.name or ""])
+        convert = [
+            column for column, dtype in df.dtypes.items()
+            if not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_dtype(dtype))
+        ]
+        df = df.astype(object).where(df.notna(), None)
+        for column in convert:
+            df[column] = df[column].map(lambda v: v if v is None or isinstance(v, EXCEL_TYPES) else str(v))
+        return df
+
+    def _write_sheet(self, wb: Workbook, sheet_name: str) -> None:
+        df = self.dfs[sheet_name]
+        sheet: WriteOnlyWorksheet = wb.create_sheet(title=sheet_name)  # type: ignore
+        styles = self.styles[sheet_name]
+        header_style, body_styles = self._sheet_styles(wb, sheet_name)
+        frame = self._frame(df)
+        header = ["" if self.index and i == 0 else column for i, column in enumerate(frame.columns)]
+
+        if (width := styles.get("width")) is not None:
+            lengths = frame.apply(lambda values: values.dropna().astype(str).str.len().max()).fillna(0)
+            for i, (column, length) in enumerate(zip(header, lengths), 1):
+                length = max(int(length), len(str(column)))
+                sheet.column_dimensions[get_column_letter(i)].width = min(max(length + width["padding"], width["min_width"]), width["max_width"])
+
+        if len(body_styles) > 1:
+            values = df[styles["alternating"]["column"]].astype(str).reset_index(drop=True)
+            fill_idx = ((values.ne(values.shift()).cumsum() - 1) % 2).tolist()
+        else:
+            fill_idx = [0] * len(frame)
+
+        def styled(value, style: str | None):
+            if style is None:
+                return value
+            cell = WriteOnlyCell(sheet)
+            cell.style = style
+            cell.value = value  # after the style, keeps the date format of datetime values
+            return cell
+
+        sheet.append([styled(column, header_style) for column in header])
+        for row, i in zip(frame.itertuples(index=False, name=None), fill_idx):
+            if (style := body_styles[i]) is None:
+                sheet.append(row)
+            else:
+                sheet.append([styled(value, style) for value in row])
+
+    def write(self) -> int:
+        """ writes the workbook into the spool file (once), returns its size in bytes """
+        if self._file is not None:
+            return self._size
+        wb = Workbook(write_only=True)
+        for sheet_name in self.dfs.keys():
+            self._write_sheet(wb, sheet_name)
+
+        # not a context manager: the file outlives write(), it is read by get_bytes/iter_bytes and closed by close()
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.spool_max_size)  # noqa: SIM115
+        wb.save(self._file)  # type: ignore
+        self._size = self._file.tell()
+        return self._size
+
+    @property
+    def size(self) -> int:
+        return self.write()
+
+    def iter_bytes(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        self.write()
+        assert self._file is not None
+        try:
+            self._file.seek(0)
+            while (chunk := self._file.read(chunk_size)):
+                yield chunk
+        finally:
+            self.close()
+
+    def get_bytes(self) -> bytes:
+        self.write()
+        assert self._file is not None
+        self._file.seek(0)
+        return self._file.read()
+
+    def save_xlsx(self, path: str):
+        with open(path, "wb") as f:
+            for chunk in self.iter_bytes():
+                f.write(chunk)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __del__(self):
+        self.close()
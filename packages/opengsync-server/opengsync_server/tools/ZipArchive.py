@@ -0,0 +1,268 @@
+import os
+import zlib
+import time
+import struct
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, Protocol, Literal
+
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_COUNT_LIMIT = 0xFFFF
+FLAGS = 0x08 | 0x800    # sizes/crc in data descriptor, utf-8 file names
+
+
+class CRCCache(Protocol):
+    def get_many(self, *keys: str) -> list[Any]: ...
+    def set_many(self, mapping: dict[str, Any], timeout: int | None = None) -> Any: ...
+
+
+@dataclass
+class ZipMember:
+    path: Path
+    arcname: bytes
+    size: int
+    mtime_ns: int
+    mode: int
+    offset: int = 0                 # offset of the local header in the archive
+    crc: int | None = None
+
+    @property
+    def zip64(self) -> bool:
+        return self.size >= ZIP32_LIMIT
+
+    @property
+    def cache_key(self) -> str:
+        return f"zip_crc:{self.path.as_posix()}:{self.mtime_ns}:{self.size}"
+
+    @property
+    def dos_datetime(self) -> tuple[int, int]:
+        t = time.localtime(max(self.mtime_ns // 1_000_000_000, 315532800))  # zip can't represent dates before 1980
+        return (
+            (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday,
+        )
+
+    def local_header(self) -> bytes:
+        dos_time, dos_date = self.dos_datetime
+        if self.zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, self.size, self.size)
+            size = ZIP32_LIMIT
+        else:
+            extra = b""
+            size = self.size
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if self.zip64 else 20, FLAGS, 0, dos_time, dos_date,
+            0, size, size, len(self.arcname), len(extra)
+        ) + self.arcname + extra
+
+    @property
+    def descriptor_size(self) -> int:
+        return 24 if self.zip64 else 16
+
+    def descriptor(self) -> bytes:
+        assert self.crc is not None
+        if self.zip64:
+            return struct.pack("<IIQQ", 0x08074B50, self.crc, self.size, self.size)
+        return struct.pack("<IIII", 0x08074B50, self.crc, self.size, self.size)
+
+    def central_header(self, crc: int = 0) -> bytes:
+        dos_time, dos_date = self.dos_datetime
+        extra_fields = []
+        size = self.size
+        offset = self.offset
+        if self.zip64:
+            extra_fields += [self.size, self.size]
+            size = ZIP32_LIMIT
+        if self.offset >= ZIP32_LIMIT:
+            extra_fields.append(self.offset)
+            offset = ZIP32_LIMIT
+        extra = struct.pack(f"<HH{len(extra_fields)}Q", 0x0001, 8 * len(extra_fields), *extra_fields) if extra_fields else b""
+        version = 45 if extra else 20
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, FLAGS, 0, dos_time, dos_date,
+            crc, size, size, len(self.arcname), len(extra), 0, 0, 0, (self.mode & 0xFFFF) << 16, offset
+        ) + self.arcname + extra
+
+
+@dataclass
+class _Segment:
+    start: int
+    end: int
+    kind: Literal["header", "data", "descriptor", "central_directory"]
+    member: ZipMember | None = None
+    content: bytes | None = None
+
+
+class ZipArchive:
+    """ Uncompressed (stored) zip archive with a layout that is computed from the file sizes alone,
+    so that the total size is known up front and any byte range can be produced without streaming
+    the archive from the start. CRCs are computed while streaming, or read from `crc_cache`. """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+        self, files: list[tuple[Path, str]],
+        crc_cache: CRCCache | None = None, crc_cache_timeout: int = 30 * 24 * 60 * 60,
+        max_workers: int = 4, read_ahead: int = 8,
+    ):
+        self.crc_cache = crc_cache
+        self.crc_cache_timeout = crc_cache_timeout
+        self.max_workers = max_workers
+        self.read_ahead = read_ahead
+        self.members: list[ZipMember] = []
+
+        for path, arcname in files:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            self.members.append(ZipMember(
+                path=path, arcname=arcname.encode("utf-8"), size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns, mode=stat.st_mode
+            ))
+
+        self.segments: list[_Segment] = []
+        offset = 0
+        for member in self.members:
+            member.offset = offset
+            header = member.local_header()
+            self.segments.append(_Segment(offset, offset + len(header), "header", member, header))
+            offset += len(header)
+            self.segments.append(_Segment(offset, offset + member.size, "data", member))
+            offset += member.size
+            self.segments.append(_Segment(offset, offset + member.descriptor_size, "descriptor", member))
+            offset += member.descriptor_size
+
+        self.central_directory_offset = offset
+        self.central_directory_size = sum(len(member.central_header()) for member in self.members)
+        self.end_records = self._end_records()
+        self.size = offset + self.central_directory_size + len(self.end_records)
+        self.segments.append(_Segment(offset, self.size, "central_directory"))
+
+    @property
+    def etag(self) -> str:
+        h = hashlib.sha1()
+        for member in self.members:
+            h.update(member.cache_key.encode("utf-8"))
+            h.update(member.arcname)
+        return h.hexdigest()
+
+    def _end_records(self) -> bytes:
+        num_members = len(self.members)
+        cd_offset = self.central_directory_offset
+        cd_size = self.central_directory_size
+        records = b""
+        if num_members >= ZIP32_COUNT_LIMIT or cd_offset >= ZIP32_LIMIT or cd_size >= ZIP32_LIMIT:
+            zip64_end_offset = cd_offset + cd_size
+            records += struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, (3 << 8) | 45, 45, 0, 0,
+                num_members, num_members, cd_size, cd_offset
+            )
+            records += struct.pack("<IIQI", 0x07064B50, 0, zip64_end_offset, 1)
+        records += struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0,
+            min(num_members, ZIP32_COUNT_LIMIT), min(num_members, ZIP32_COUNT_LIMIT),
+            min(cd_size, ZIP32_LIMIT), min(cd_offset, ZIP32_LIMIT), 0
+        )
+        return records
+
+    def _load_cached_crcs(self, members: list[ZipMember]) -> None:
+        if self.crc_cache is None or not (members := [m for m in members if m.crc is None]):
+            return
+        try:
+            crcs = self.crc_cache.get_many(*[m.cache_key for m in members])
+        except Exception:
+            return
+        for member, crc in zip(members, crcs):
+            if crc is not None:
+                member.crc = int(crc)
+
+    def _store_crcs(self, members: list[ZipMember]) -> None:
+        if self.crc_cache is None or not members:
+            return
+        try:
+            self.crc_cache.set_many({m.cache_key: m.crc for m in members}, timeout=self.crc_cache_timeout)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _compute_crc(member: ZipMember) -> int:
+        crc = 0
+        with open(member.path, "rb") as f:
+            while (chunk := f.read(ZipArchive.CHUNK_SIZE)):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
+    def _ensure_crcs(self, members: list[ZipMember], pool: ThreadPoolExecutor) -> None:
+        self._load_cached_crcs(members)
+        if not (missing := [m for m in members if m.crc is None]):
+            return
+        for member, crc in zip(missing, pool.map(self._compute_crc, missing)):
+            member.crc = crc
+        self._store_crcs(missing)
+
+    def _check_unchanged(self, member: ZipMember, fd: int) -> None:
+        stat = os.fstat(fd)
+        if stat.st_size != member.size or stat.st_mtime_ns != member.mtime_ns:
+            raise RuntimeError(f"File changed while building the archive: {member.path}")
+
+    def _iter_data(self, member: ZipMember, start: int, end: int, pool: ThreadPoolExecutor) -> Iterator[bytes]:
+        """ yields member data [start, end), reading ahead with the thread pool """
+        fd = os.open(member.path, os.O_RDONLY)
+        try:
+            self._check_unchanged(member, fd)
+            track_crc = start == 0 and end == member.size and member.crc is None
+            crc = 0
+            pending: deque = deque()
+            offset = start
+            while offset < end or pending:
+                while offset < end and len(pending) < self.read_ahead:
+                    length = min(self.CHUNK_SIZE, end - offset)
+                    pending.append((length, pool.submit(os.pread, fd, length, offset)))
+                    offset += length
+                length, future = pending.popleft()
+                chunk = future.result()
+                if len(chunk) != length:
+                    raise RuntimeError(f"File changed while building the archive: {member.path}")
+                if track_crc:
+                    crc = zlib.crc32(chunk, crc)
+                yield chunk
+            if track_crc:
+                member.crc = crc
+                self._store_crcs([member])
+        finally:
+            # reads that are already running must finish before the fd is closed
+            for _, future in pending:
+                if not future.cancel():
+                    future.exception()
+            os.close(fd)
+
+    def iter_bytes(self, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        """ yields the archive bytes in [start, end) """
+        end = self.size if end is None else min(end, self.size)
+        if start >= end:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for segment in self.segments:
+                if segment.end <= start or segment.start >= end:
+                    continue
+                lo, hi = max(start, segment.start) - segment.start, min(end, segment.end) - segment.start
+
+                if segment.kind == "header":
+                    assert segment.content is not None
+                    yield segment.content[lo:hi]
+                elif segment.kind == "data":
+                    assert segment.member is not None
+                    yield from self._iter_data(segment.member, lo, hi, pool)
+                elif segment.kind == "descriptor":
+                    assert segment.member is not None
+                    self._ensure_crcs([segment.member], pool)
+                    yield segment.member.descriptor()[lo:hi]
+                else:
+                    self._ensure_crcs(self.members, pool)
+                    central_directory = b"".join(m.central_header(m.crc or 0) for m in self.members) + self.end_records
+                    yield central_directory[lo:hi]
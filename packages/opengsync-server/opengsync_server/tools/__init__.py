@@ -4,11 +4,14 @@ from .utils import connect_similar_strings, make_filenameable, parse_float, pars
 from . import io
 from .classproperty import classproperty
 from .RedisMSFFileCache import RedisMSFFileCache
+from .MSFSession import MSFSession
 from .StaticSpreadSheet import StaticSpreadSheet
 from .MailHandler import MailHandler
 from .ExcelWriter import ExcelWriter
+from .StreamingExcelWriter import StreamingExcelWriter
 from .FileBrowser import FileBrowser
 from .SharedFileBrowser import SharedFileBrowser
+from .ZipArchive import ZipArchive
 from .MSFTableHandler import MSFTableHandler
 from .CachedDictionary import CachedDictionary
 
@@ -4,7 +4,7 @@ import inspect
 import itertools
 from pathlib import Path
 from types import NoneType, UnionType
-from typing import get_type_hints, get_origin, get_args, Any, Callable, Literal
+from typing import get_type_hints, get_origin, get_args, Any, Callable, Literal, NamedTuple
 
 from flask import Request
 
@@ -117,82 +117,109 @@ def infer_route(
     return routes, current_user_required, params
 
 
-def validate_argument(value: Any, name: str, type_hint, origin, args):
+class CompiledParameter(NamedTuple):
+    name: str
+    default: Any
+    convert: Callable[[Any], Any]
+
+
+def _raise(message: str) -> Callable[[Any], Any]:
+    def convert(value: Any) -> Any:
+        raise ValueError(message)
+    return convert
+
+
+def _to_bool(name: str) -> Callable[[Any], Any]:
+    def convert(value: Any) -> bool:
+        if isinstance(value, str):
+            if value.lower() in ("true", "1", "yes"):
+                return True
+            elif value.lower() in ("false", "0", "no"):
+                return False
+            raise ValueError(f"Invalid boolean string for parameter: {name}")
+        return bool(value)
+    return convert
+
+
+def _to_json(name: str, expected: type, allow_none: bool) -> Callable[[Any], Any]:
+    type_name = expected.__name__
+    def convert(value: Any) -> Any:
+        if value is None and allow_none:
+            return value
+        if isinstance(value, str):
+            value = json.loads(value)
+        if not isinstance(value, expected):
+            raise ValueError(f"Expected {type_name} or JSON string for parameter: {name}")
+        return value
+    return convert
+
+
+def _optional(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return lambda value: convert(value) if value is not None else None
+
+
+def compile_converter(name: str, type_hint) -> Callable[[Any], Any]:
+    """ resolves the conversion for a type hint once so that requests only apply the returned callable """
+    origin = get_origin(type_hint)
+    args = get_args(type_hint)
+
     if type_hint == int:
-        value = int(value)
+        return int
     elif type_hint == str:
-        value = str(value)
+        return str
     elif origin is Literal:
         if all(isinstance(a, str) for a in args):
-            value = str(value)
+            return str
         elif all(isinstance(a, int) for a in args):
-            value = int(value)
-        else:
-            raise ValueError(f"Unsupported Literal types: {args}")
+            return int
+        return _raise(f"Unsupported Literal types: {args}")
     elif origin is UnionType:
         non_none_args = [a for a in args if a is not NoneType]
-        if len(non_none_args) == 1:
-            base_type = non_none_args[0]
-            if base_type == int:
-                if value is not None:
-                    value = int(value)
-            elif base_type == str:
-                if value is not None:
-                    value = str(value)
-            elif base_type == dict:
+        if len(non_none_args) != 1:
+            return _raise(f"Unsupported Union types: {args}")
+        base_type = non_none_args[0]
+        if base_type == int:
+            return _optional(int)
+        elif base_type == str:
+            return _optional(str)
+        elif base_type == dict:
+            def convert(value: Any) -> Any:
                 if isinstance(value, str):
-                    value = json.loads(value)
+                    return json.loads(value)
                 elif not isinstance(value, dict):
                     raise ValueError(f"Expected dict or JSON string for parameter: {name}")
-            elif get_origin(base_type) is list:
-                if value is not None:
-                    if isinstance(value, str):
-                        value = json.loads(value)
-                    if not isinstance(value, list):
-                        raise ValueError(f"Expected list or JSON string for parameter: {name}")
-            else:
-                raise ValueError(f"Unsupported Optional base type: {base_type}")
-        else:
-            raise ValueError(f"Unsupported Union types: {args}")
+                return value
+            return convert
+        elif get_origin(base_type) is list:
+            return _to_json(name, list, allow_none=True)
+        return _raise(f"Unsupported Optional base type: {base_type}")
     elif type_hint == Path:
-        value = Path(value)
+        return Path
     elif type_hint == bool:
-        if isinstance(value, str):
-            if value.lower() in ("true", "1", "yes"):
-                value = True
-            elif value.lower() in ("false", "0", "no"):
-                value = False
-            else:
-                raise ValueError(f"Invalid boolean string for parameter: {name}")
-        else:
-            value = bool(value)
+        return _to_bool(name)
     elif origin is dict:
-        if isinstance(value, str):
-            value = json.loads(value)
-        if not isinstance(value, dict):
-            raise ValueError(f"Expected dict or JSON string for parameter: {name}")
+        return _to_json(name, dict, allow_none=False)
     elif origin is list:
-        if isinstance(value, str):
-            value = json.loads(value)
-        if not isinstance(value, list):
-            raise ValueError(f"Expected list or JSON string for parameter: {name}")
-    else:
-        raise ValueError(f"Unsupported type hint: {type_hint} ({name}), {origin}")
-    
-    return value
-    
-
-def validate_parameters(func: Callable, request: Request, kwargs: dict) -> tuple[dict, dict]:
-    sig = inspect.signature(func)
+        return _to_json(name, list, allow_none=False)
+    return _raise(f"Unsupported type hint: {type_hint} ({name}), {origin}")
+
+
+def compile_parameters(func: Callable) -> list[CompiledParameter]:
     hints = get_type_hints(func)
+    return [
+        CompiledParameter(name=name, default=param.default, convert=compile_converter(name, hints.get(name, str)))
+        for name, param in inspect.signature(func).parameters.items()
+    ]
 
+
+def validate_parameters(parameters: list[CompiledParameter], request: Request, kwargs: dict) -> tuple[dict, dict]:
     args = dict(request.args)
     form = dict(request.form | request.files)
     json_data: dict = request.get_json(silent=True) or {}
 
     additional_kwargs = args | form | json_data
 
-    for name, param in sig.parameters.items():
+    for name, default, convert in parameters:
         additional_kwargs.pop(name, None)
         if name in kwargs:
             continue
@@ -204,17 +231,12 @@ def validate_parameters(func: Callable, request: Request, kwargs: dict) -> tuple
         elif name in json_data:
             value = json_data.get(name)
         else:
-            if param.default != inspect.Parameter.empty:
-                kwargs[name] = param.default
+            if default is not inspect.Parameter.empty:
+                kwargs[name] = default
                 continue
             else:
                 raise ValueError(f"Missing required parameter: {name}")
-            
-        type_hint = hints.get(name, str)
 
-        value = validate_argument(value, name, type_hint, get_origin(type_hint), get_args(type_hint))
-        kwargs[name] = value
+        kwargs[name] = convert(value)
 
     return kwargs, additional_kwargs
-    
-    
\ No newline at end of file
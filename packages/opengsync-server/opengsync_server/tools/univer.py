@@ -1,14 +1,30 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+from array import array
+
 import pandas as pd
 
 from openpyxl.styles import Font, PatternFill, Alignment, Side, Border, Color
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.cell import Cell, MergedCell
 from openpyxl import Workbook
+from openpyxl.utils import column_index_from_string
 from colorsys import rgb_to_hls, hls_to_rgb
 
 RGBMAX = 0xff  # Corresponds to 255
 HLSMAX = 240  # MS excel's tint function expects that HLS is base 240. see:
 
+SNAPSHOT_VERSION = 1            # bump when the conversion changes, invalidates all stored snapshots
+SNAPSHOT_KEY_PATTERN = re.compile(r"^[0-9a-f]{32}-v\d+$")
+MANIFEST = "workbook.json"
+ROW_WINDOW = 500
+MAX_ROW_WINDOW = 5000
+DEFAULT_ROW_COUNT = 1000        # univer's default sheet size
+
 
 # https://stackoverflow.com/questions/58429823/getting-excel-cell-background-themed-color-as-hex-with-openpyxl
 def get_theme_colors(wb: Workbook):
@@ -179,43 +195,150 @@ def extract_style(theme_colors: list[str], cell: Cell | MergedCell) -> dict:
     return style
 
 
-def xlsx_to_univer_snapshot(path: str) -> tuple[dict, dict]:
+def snapshot_dir(path: str) -> str:
+    """ snapshots of a media file are stored next to it, one subdirectory per content hash """
+    return f"{path}.univer"
+
+
+def snapshot_key(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return f"{h.hexdigest()}-v{SNAPSHOT_VERSION}"
+
+
+def _write_snapshot(path: str, out_dir: str) -> None:
+    """ Converts the workbook once: `workbook.json` holds the snapshot without cell data, the interned styles and
+    column widths, every sheet is written as `{i}.jsonl` (one json line per row) with the byte offsets of the rows
+    in `{i}.idx`, so a row range is read with a single seek. """
     from openpyxl import load_workbook
 
     wb = load_workbook(path, data_only=True)
+    theme_colors: list[str] = get_theme_colors(wb) if wb.loaded_theme else []
+
+    styles: dict[str, dict] = {}                    # interned style id -> univer style
+    interned: dict[str, str] = {}                   # univer style json -> interned style id
+    cell_styles: dict[int, str | None] = {}         # openpyxl cell style id -> interned style id
+
+    def intern(cell: Cell | MergedCell) -> str | None:
+        if (style_id := cell.style_id) not in cell_styles:
+            if not (style := extract_style(theme_colors, cell)):
+                cell_styles[style_id] = None
+            else:
+                key = json.dumps(style, sort_keys=True)
+                if key not in interned:
+                    interned[key] = f"s{len(interned)}"
+                    styles[interned[key]] = style
+                cell_styles[style_id] = interned[key]
+        return cell_styles[style_id]
+
     snapshot = {
         "id": "workbook",
         "name": "Workbook",
         "sheetOrder": wb.sheetnames,
+        "styles": styles,
         "sheets": {},
     }
     col_style = {}
+    rows = {}
 
-    theme_colors: list[str] = get_theme_colors(wb)
-
-    for col_idx, sheet in enumerate(wb.sheetnames):
+    for sheet_idx, sheet in enumerate(wb.sheetnames):
         ws: Worksheet = wb[sheet]
+        col_style[sheet] = {
+            column_index_from_string(letter) - 1: {"width": dimension.width * 7.5 if dimension.width else 64}
+            for letter, dimension in ws.column_dimensions.items()
+        }
+
+        offsets = array("q", [0])
+        with open(os.path.join(out_dir, f"{sheet_idx}.jsonl"), "wb") as f:
+            for row in ws.iter_rows():
+                row_data = {}
+                for cell_idx, cell in enumerate(row):
+                    cell_data = {}
+                    if cell.value is not None:
+                        cell_data["v"] = str(cell.value)
+                    if (style_id := intern(cell)) is not None:
+                        cell_data["s"] = style_id
+                    if cell_data:
+                        row_data[cell_idx] = cell_data
+                f.write(json.dumps(row_data, separators=(",", ":")).encode("utf-8") + b"\n")
+                offsets.append(f.tell())
+        with open(os.path.join(out_dir, f"{sheet_idx}.idx"), "wb") as f:
+            offsets.tofile(f)
+
+        rows[sheet] = len(offsets) - 1
         snapshot["sheets"][sheet] = {
             "id": sheet,
             "name": sheet,
-            "columnCount": len(list(ws.columns)),
-            "cellData": {}, # (row, col)
+            "rowCount": max(rows[sheet], DEFAULT_ROW_COUNT),
+            "columnCount": ws.max_column,
+            "cellData": {},
         }
-        sheet_col_style = {}
-        for col_idx, letter in enumerate(list(ws.column_dimensions)):
-            sheet_col_style[col_idx] = { "width": ws.column_dimensions[letter].width * 7.5 if ws.column_dimensions[letter].width else 64 }
-        
-        col_style[sheet] = sheet_col_style
 
-        for row_idx, row in enumerate(ws.iter_rows()):
-            row_data = {}
-            for cell_idx, cell in enumerate(row):
-                row_data[cell_idx] = {
-                    "v": str(cell.value) if cell.value is not None else "",
-                    "s": extract_style(theme_colors, cell)
-                }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump({"snapshot": snapshot, "style": col_style, "rows": rows}, f)
+
+
+def ensure_snapshot(path: str) -> tuple[str, str]:
+    """ returns the key and directory of the snapshot of the file's current content, converts it if needed """
+    key = snapshot_key(path)
+    root = snapshot_dir(path)
+    out_dir = os.path.join(root, key)
+    if os.path.exists(os.path.join(out_dir, MANIFEST)):
+        return key, out_dir
+
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+    try:
+        _write_snapshot(path, tmp_dir)
+        try:
+            os.rename(tmp_dir, out_dir)
+        except OSError:
+            pass  # converted concurrently by another request
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # snapshots of previous contents of the file
+    for entry in os.listdir(root):
+        if entry != key and SNAPSHOT_KEY_PATTERN.match(entry):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return key, out_dir
+
+
+def remove_snapshots(path: str) -> None:
+    shutil.rmtree(snapshot_dir(path), ignore_errors=True)
+
+
+def read_rows(path: str, key: str, sheet_idx: int, start: int, stop: int) -> bytes:
+    """ rows [start, stop) of a sheet as json object {row_idx: {col_idx: cell_data}}, read without decoding them """
+    if not SNAPSHOT_KEY_PATTERN.match(key):
+        raise ValueError(f"Invalid snapshot key: {key}")
+    if not 0 <= start <= stop:
+        raise ValueError(f"Invalid row window: [{start}, {stop})")
+    out_dir = os.path.join(snapshot_dir(path), key)
+    stop = min(stop, start + MAX_ROW_WINDOW)
+    with open(os.path.join(out_dir, f"{sheet_idx}.idx"), "rb") as f:
+        n_rows = os.fstat(f.fileno()).st_size // 8 - 1
+        start, stop = max(0, min(start, n_rows)), max(0, min(stop, n_rows))
+        f.seek(start * 8)
+        offsets = array("q")
+        offsets.frombytes(f.read((stop - start + 1) * 8))
+    with open(os.path.join(out_dir, f"{sheet_idx}.jsonl"), "rb") as f:
+        f.seek(offsets[0])
+        lines = f.read(offsets[-1] - offsets[0]).splitlines()
+    return b"{" + b",".join(b'"%d":%s' % (start + i, line) for i, line in enumerate(lines)) + b"}"
 
-            snapshot["sheets"][sheet]["cellData"][row_idx] = row_data
 
+def xlsx_to_univer_snapshot(path: str, window: int = ROW_WINDOW) -> dict:
+    """ The stored snapshot (converted on first access) with the cell data of the first `window` rows of the first
+    sheet, further rows and sheets are requested with `read_rows` using the returned key. """
+    key, out_dir = ensure_snapshot(path)
+    with open(os.path.join(out_dir, MANIFEST)) as f:
+        manifest = json.load(f)
 
-    return snapshot, col_style
\ No newline at end of file
+    snapshot = manifest["snapshot"]
+    if snapshot["sheetOrder"]:
+        first = snapshot["sheetOrder"][0]
+        snapshot["sheets"][first]["cellData"] = json.loads(read_rows(path, key, 0, 0, window))
+    return {"key": key, "data": snapshot, "style": manifest["style"], "rows": manifest["rows"], "window": window}
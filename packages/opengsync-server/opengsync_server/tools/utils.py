@@ -10,6 +10,7 @@ import premailer
 
 from flask import render_template
 
+import numpy as np
 import pandas as pd
 
 from opengsync_db import models, exceptions, DBHandler
@@ -48,32 +49,72 @@ def reverse_complement(seq: str | None) -> str:
     complement = {"A": "T", "T": "A", "C": "G", "G": "C", "N": "N", "+": "+"}
     return "".join(complement.get(base, base) for base in reversed(seq))
 
-def _hamming_distance_shared_bases(seq1: str, seq2: str) -> int:
-    """Calculate Hamming distance using only matching positions (shortest shared length)."""
-    min_len = min(len(seq1), len(seq2))
-    return sum(c1 != c2 and c1 != 'N' and c2 != 'N' for c1, c2 in zip(seq1[:min_len], seq2[:min_len]))
-
-
-def min_hamming_distances(seq_list: list[str], rc: Literal["i7", "i5", "both", "i7i5"] | None = None) -> list[int]:
-    distances = []
-    for i, ref in enumerate(seq_list):
-        match rc:
-            case "i7":
-                ref_i7, ref_i5 = ref.split("+") if "+" in ref else (ref, "")
-                ref = reverse_complement(ref_i7) + "+" + ref_i5
-            case "i5":
-                ref_i7, ref_i5 = ref.split("+") if "+" in ref else (ref, "")
-                ref = ref_i7 + "+" + reverse_complement(ref_i5)
-            case "both":
-                ref = reverse_complement(ref)
-            case "i7i5":
-                ref_i7, ref_i5 = ref.split("+") if "+" in ref else (ref, "")
-                ref = reverse_complement(ref_i7) + "+" + reverse_complement(ref_i5)
-            case _:
-                pass
-        other_seqs = seq_list[:i] + seq_list[i + 1:]
-        distances.append(min(_hamming_distance_shared_bases(ref, other) for other in other_seqs))
-    return distances
+RCMode = Literal["i7", "i5", "both", "i7i5"]
+_COMPLEMENT = str.maketrans({"A": "T", "T": "A", "C": "G", "G": "C"})
+_N = ord("N")
+
+
+def _rc_combined_index(seq: str, rc: RCMode | None) -> str:
+    if rc is None:
+        return seq
+    if rc == "both":
+        return seq.translate(_COMPLEMENT)[::-1]
+    
+    i7, i5 = seq.split("+") if "+" in seq else (seq, "")
+    if rc in ("i7", "i7i5"):
+        i7 = i7.translate(_COMPLEMENT)[::-1]
+    if rc in ("i5", "i7i5"):
+        i5 = i5.translate(_COMPLEMENT)[::-1]
+    return i7 + "+" + i5
+
+
+def _encode_sequences(seq_list: list[str], length: int) -> np.ndarray:
+    """ (n, length) uint8 matrix, shorter sequences are padded with 'N' which is ignored in comparisons """
+    data = "".join(seq.ljust(length, "N")[:length] for seq in seq_list).encode("ascii", errors="replace")
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(seq_list), length)
+
+
+def _one_hot(encoded: np.ndarray, alphabet: np.ndarray) -> np.ndarray:
+    return (encoded[:, :, None] == alphabet[None, None, :]).reshape(encoded.shape[0], -1).astype(np.float32)
+
+
+def min_hamming_distance_table(
+    seq_list: list[str], rc: Sequence[RCMode | None] = (None,), chunk_size: int = 1024
+) -> dict[RCMode | None, np.ndarray]:
+    """
+    Minimum N-masked hamming distance of each (optionally reverse complemented) sequence to all other sequences.
+    The other sequences are encoded once and shared between all rc modes, the pairwise mismatch matrix is
+    computed with matrix multiplications in blocks of `chunk_size` rows to keep memory bounded.
+    """
+    n = len(seq_list)
+    if n < 2:
+        raise ValueError("At least two sequences are required to compute hamming distances.")
+    
+    refs = {mode: [_rc_combined_index(seq, mode) for seq in seq_list] for mode in rc}
+    length = max(len(seq) for seqs in [seq_list] + list(refs.values()) for seq in seqs)
+
+    others = _encode_sequences(seq_list, length)
+    alphabet = np.setdiff1d(np.union1d(np.unique(others), np.frombuffer(b"ACGT", dtype=np.uint8)), [_N])
+    others_one_hot = _one_hot(others, alphabet).T
+    others_valid = (others != _N).astype(np.float32).T
+
+    res = {}
+    for mode, ref_seqs in refs.items():
+        encoded = _encode_sequences(ref_seqs, length)
+        distances = np.empty(n, dtype=np.int64)
+        for start in range(0, n, chunk_size):
+            block = encoded[start:start + chunk_size]
+            # mismatch = positions where both bases are not 'N' - positions where both bases are equal and not 'N'
+            mismatches = (block != _N).astype(np.float32) @ others_valid - _one_hot(block, alphabet) @ others_one_hot
+            rows = np.arange(block.shape[0])
+            mismatches[rows, rows + start] = np.inf
+            distances[start:start + block.shape[0]] = mismatches.min(axis=1)
+        res[mode] = distances
+    return res
+
+
+def min_hamming_distances(seq_list: list[str], rc: RCMode | None = None) -> list[int]:
+    return min_hamming_distance_table(seq_list, rc=(rc,))[rc].tolist()
 
 
 def __get_combined_index(df: pd.DataFrame, indices: list[str]) -> pd.Series:
@@ -86,41 +127,8 @@ def __get_combined_index(df: pd.DataFrame, indices: list[str]) -> pd.Series:
     return combined_index.str.lstrip("+")
 
 
-def __check_indices(df: pd.DataFrame, indices: list[str], groupby: str | list[str] | None = None, rc: Literal["i7", "i5", "both", "i7i5"] | None = None) -> pd.DataFrame:
-    df["combined_index"] = ""
-    df["min_hamming_bases"] = None
-
-    if len(df) > 1:
-        if groupby is None:
-            df["combined_index"] = __get_combined_index(df, indices)     
-            if "sequence_i5" in df.columns:
-                same_barcode_in_different_indices = df["sequence_i7"] == df["sequence_i5"]
-                df.loc[same_barcode_in_different_indices, "warning"] = "Same barcode in different indices"
-            
-            df["min_hamming_bases"] = df["combined_index"].apply(lambda x: len(x) - x.count("N") - x.count("+")).min()
-            df["min_hamming_bases"] = min_hamming_distances(df["combined_index"].tolist(), rc=rc)
-        else:
-            for _, _df in df.groupby(groupby):             
-                _df["combined_index"] = __get_combined_index(_df, indices)
-                if "sequence_i5" in _df.columns:
-                    same_barcode_in_different_indices = _df["sequence_i7"] == _df["sequence_i5"]
-                    _df.loc[same_barcode_in_different_indices, "warning"] = "Same barcode in i7 & i5 indices"
-
-                if len(_df) < 2:
-                    _df["min_hamming_bases"] = _df["combined_index"].apply(lambda x: len(x) - x.count("N") - x.count("+")).min()
-                else:
-                    _df["min_hamming_bases"] = min_hamming_distances(_df["combined_index"].tolist(), rc=rc)
-                
-                df.loc[_df.index, "combined_index"] = _df["combined_index"]
-                df.loc[_df.index, "min_hamming_bases"] = _df["min_hamming_bases"]
-    elif len(df) == 1:
-        df["combined_index"] = __get_combined_index(df, indices)
-        df["min_hamming_bases"] = df["combined_index"].apply(lambda x: len(x) - x.count("N") - x.count("+")).min()
-    else:
-        df["combined_index"] = ""
-        df["min_hamming_bases"] = None
-        
-    return df
+def __num_bases(combined_index: pd.Series) -> int:
+    return combined_index.apply(lambda x: len(x) - x.count("N") - x.count("+")).min()
 
 
 def check_indices(df: pd.DataFrame, groupby: str | list[str] | None = None) -> pd.DataFrame:
@@ -132,14 +140,40 @@ def check_indices(df: pd.DataFrame, groupby: str | list[str] | None = None) -> p
     if "sequence_i5" in df.columns and not df["sequence_i5"].isna().all():
         indices.append("sequence_i5")
 
-    df = __check_indices(df, indices=indices, groupby=groupby)
-
-    df["rc_i7_min_hamming_bases"] = __check_indices(df.copy(), indices=indices, groupby=groupby, rc="i7")["min_hamming_bases"]
-    
+    columns: dict[RCMode | None, str] = {None: "min_hamming_bases", "i7": "rc_i7_min_hamming_bases"}
     if "sequence_i5" in df.columns:
-        df["rc_i5_min_hamming_bases"] = __check_indices(df.copy(), indices=indices, groupby=groupby, rc="i5")["min_hamming_bases"]
-        df["rc_min_hamming_bases"] = __check_indices(df.copy(), indices=indices, groupby=groupby, rc="both")["min_hamming_bases"]
-        df["rc_i7i5_min_hamming_bases"] = __check_indices(df.copy(), indices=indices, groupby=groupby, rc="i7i5")["min_hamming_bases"]
+        columns.update({"i5": "rc_i5_min_hamming_bases", "both": "rc_min_hamming_bases", "i7i5": "rc_i7i5_min_hamming_bases"})
+
+    df["combined_index"] = ""
+    for col in columns.values():
+        df[col] = None
+
+    if len(df) == 0:
+        groups = []
+    elif groupby is None or len(df) == 1:
+        groups = [df]
+    else:
+        groups = [_df.copy() for _, _df in df.groupby(groupby)]
+
+    for _df in groups:
+        _df["combined_index"] = __get_combined_index(_df, indices)
+        if "sequence_i5" in _df.columns:
+            same_barcode_in_different_indices = (_df["sequence_i7"] == _df["sequence_i5"]).to_numpy(dtype=bool, na_value=False)
+            df.loc[_df.index[same_barcode_in_different_indices], "warning"] = "Same barcode in different indices" if _df is df else "Same barcode in i7 & i5 indices"
+
+        df.loc[_df.index, "combined_index"] = _df["combined_index"]
+        if len(_df) < 2:
+            num_bases = __num_bases(_df["combined_index"])
+            for col in columns.values():
+                df.loc[_df.index, col] = num_bases
+        else:
+            distances = min_hamming_distance_table(_df["combined_index"].tolist(), rc=list(columns.keys()))
+            for mode, col in columns.items():
+                df.loc[_df.index, col] = distances[mode]
+
+    if (groupby is None and len(df) > 0) or len(df) == 1:
+        for col in columns.values():
+            df[col] = df[col].astype(int)
 
     df.loc[df["min_hamming_bases"] < 1, "error"] = "Hamming distance of 0 between barcode combination in two or more libraries."
     df.loc[df["min_hamming_bases"] < 3, "warning"] = "Small hamming distance between barcode combination in two or more libraries."
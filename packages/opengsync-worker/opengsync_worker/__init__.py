@@ -65,6 +65,11 @@ beat_schedule = {
         "schedule": parse_schedule(config["scheduler"]["upload_folder_clean_schedule"]),
         "args": (upload_folder.as_posix(), upload_folder_file_age_days,),
     },
+    "mail_outbox": {
+        "task": "opengsync_worker.tasks.send_mail_outbox_wrapper",
+        "schedule": parse_schedule(config["scheduler"].get("mail_outbox_interval_sec", 15)),
+        "args": (),
+    },
 }
 
 celery.conf.beat_schedule = beat_schedule
\ No newline at end of file
@@ -1,16 +1,17 @@
-import os
-import traceback
 import yaml
 from pathlib import Path
 
 from loguru import logger
 
-from opengsync_db import DBHandler
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy.exc import OperationalError
 
 from opengsync_worker import celery
+from opengsync_worker.tasks.worker_context import WorkerContext
 from opengsync_worker.tasks.clean_upload_folder import clean_upload_folder
-from opengsync_worker.tasks.rf_scanner import process_run_folder
+from opengsync_worker.tasks.rf_scanner import process_run_folder, RunFolderIndex
 from opengsync_worker.tasks.status_updater import update_statuses
+from opengsync_worker.tasks.mail_outbox import MailOutbox, SMTPConfig, send_mail_outbox
 
 logger.remove()
 
@@ -21,53 +22,76 @@ date = "{time:YYYY-MM-DD}"
 logger.add(logdir / f"{date}.log", level="INFO", colorize=False, rotation="1 day")
 logger.add(logdir / f"{date}.err", level="ERROR", colorize=False, rotation="1 day")
 
+context = WorkerContext(config)
+rf_index = RunFolderIndex(context.r)
+rf_scan_workers = int(config.get("scheduler", {}).get("rf_scan_workers", 1))
+mail_outbox = MailOutbox(context.r)
+smtp_config = SMTPConfig.from_env()
 
-def connect() -> DBHandler:
-    db = DBHandler(logger=logger, auto_commit=True)
-    db.connect(
-        user=os.environ["POSTGRES_USER"],
-        password=os.environ["POSTGRES_PASSWORD"],
-        host=os.environ["POSTGRES_HOST"],
-        port=os.environ["POSTGRES_PORT"],
-        db=os.environ["POSTGRES_DB"],
-    )
-    return db
 
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    context.init()
 
-@celery.task
-def process_run_folder_wrapper(run_folder: str):
-    db = connect()
-    rollback = False
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    context.close()
+
+
+def _retry_on_operational_error(task, metrics):
+    # e.g. database restart/failover: retry instead of waiting for the next beat tick
+    if metrics.status == "error" and metrics.error is not None and metrics.error.startswith(OperationalError.__name__):
+        raise task.retry(countdown=30, max_retries=2)
+
+
+@celery.task(bind=True)
+def process_run_folder_wrapper(self, run_folder: str):
     logger.info("Starting run folder processing task...")
-    try:
-        db.open_session()
-        process_run_folder(Path(run_folder), db)
-    except Exception as e:
-        logger.error(f"\n-------- Exception [ process_run_folder ] --------\n\tError: {e.__repr__()}\n\tMessage: {e}\n\tTraceback: {traceback.format_exc()}\n-------- END ERROR --------")
-        rollback = True
-    finally:
-        db.close_session(rollback=rollback)
+    metrics = context.run(
+        "process_run_folder",
+        lambda db: process_run_folder(Path(run_folder), db, index=rf_index, workers=rf_scan_workers),
+    )
+    _retry_on_operational_error(self, metrics)
 
 
-@celery.task
-def update_statuses_wrapper():
-    db = connect()
-    rollback = False
+@celery.task(bind=True)
+def run_folders_changed_wrapper(self, run_folder: str, run_names: list[str]):
+    """ trigger for file watchers (e.g. inotifywait on RTAComplete.txt), re-scans only the given run folders """
+    logger.info(f"Starting run folder processing task for {len(run_names)} changed run(s)...")
+    # shares the lock with the full scan, both write the same runs
+    metrics = context.run(
+        "process_run_folder",
+        lambda db: process_run_folder(Path(run_folder), db, index=rf_index, workers=rf_scan_workers, changed=run_names),
+    )
+    if metrics.status == "skipped":
+        raise self.retry(countdown=60, max_retries=5)
+    _retry_on_operational_error(self, metrics)
+
+
+@celery.task(bind=True)
+def update_statuses_wrapper(self):
     logger.info("Starting status update task...")
-    try:
-        db.open_session()
-        update_statuses(db)
-    except Exception as e:
-        logger.error(f"\n-------- Exception [ update_statuses ] --------\n\tError: {e.__repr__()}\n\tMessage: {e}\n\tTraceback: {traceback.format_exc()}\n-------- END ERROR --------")
-        rollback = True
-    finally:
-        db.close_session(rollback=rollback)
+    metrics = context.run(
+        "update_statuses",
+        lambda db: sum(len(report.rows) for report in update_statuses(db)),
+    )
+    _retry_on_operational_error(self, metrics)
 
 
 @celery.task
 def clean_upload_folder_wrapper(upload_folder: str, upload_folder_file_age_days: int):
     logger.info("Starting upload folder cleanup task...")
-    try:
-        clean_upload_folder(directory=Path(upload_folder), days_old=upload_folder_file_age_days)
-    except Exception as e:
-        logger.error(f"\n-------- Exception [ clean_upload_folder ] --------\n\tError: {e.__repr__()}\n\tMessage: {e}\n\tTraceback: {traceback.format_exc()}\n-------- END ERROR --------")
+    context.run(
+        "clean_upload_folder",
+        lambda _: clean_upload_folder(directory=Path(upload_folder), days_old=upload_folder_file_age_days),
+        use_db=False,
+    )
+
+
+@celery.task(bind=True)
+def send_mail_outbox_wrapper(self):
+    context.run(
+        "send_mail_outbox",
+        lambda db: send_mail_outbox(db, mail_outbox, smtp_config),
+    )
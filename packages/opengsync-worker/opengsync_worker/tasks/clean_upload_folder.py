@@ -5,10 +5,11 @@ from pathlib import Path
 from . import logger
 
 
-def clean_upload_folder(directory: Path, days_old: int):
+def clean_upload_folder(directory: Path, days_old: int) -> int:
     logger.info(f"Cleaning up files older than {days_old} days in {directory}")
     now = time.time()
     cutoff = now - (days_old * 86400)  # 86400 seconds in a day
+    n_deleted = 0
 
     for root, dirs, files in os.walk(directory):
         for name in files:
@@ -16,6 +17,9 @@ def clean_upload_folder(directory: Path, days_old: int):
             if os.path.isfile(filepath) and os.path.getmtime(filepath) < cutoff:
                 try:
                     os.remove(filepath)
+                    n_deleted += 1
                     logger.info(f"Deleted: {filepath}")
                 except Exception as e:
-                    logger.error(f"Error deleting {filepath}: {e}")
\ No newline at end of file
+                    logger.error(f"Error deleting {filepath}: {e}")
+
+    return n_deleted
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import smtplib
+from dataclasses import dataclass
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+import redis
+import sqlalchemy as sa
+
+from opengsync_db import DBHandler, models
+from opengsync_db.categories import DeliveryStatus
+
+from . import logger
+
+
+@dataclass
+class SMTPConfig:
+    server: str
+    port: int
+    user: str
+    password: str
+    use_tls: bool = True
+
+    @staticmethod
+    def from_env() -> "SMTPConfig | None":
+        if not (server := os.environ.get("MAIL_SERVER")):
+            return None
+        return SMTPConfig(
+            server=server,
+            port=int(os.environ.get("MAIL_PORT", 587)),
+            user=os.environ["MAIL_USER"],
+            password=os.environ["MAIL_PASSWORD"],
+        )
+
+
+class SMTPConnection:
+    """ One SMTP connection (STARTTLS + login once, unless no user is configured) reused for all messages of a batch. Reconnects once if
+    the server closed the connection between messages. """
+    def __init__(self, config: SMTPConfig, timeout: float = 30):
+        self.config = config
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.config.server, self.config.port, timeout=self.timeout)
+        if self.config.use_tls:
+            smtp.starttls()
+        if self.config.user:
+            smtp.login(self.config.user, self.config.password)
+        self._smtp = smtp
+        return smtp
+
+    def send(self, message: MIMEMultipart, sender: str, recipients: list[str]) -> dict:
+        """ returns the refused recipients, {email: (code, response)} """
+        smtp = self._smtp or self._connect()
+        try:
+            return smtp.send_message(message, from_addr=sender, to_addrs=recipients)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = None
+            return self._connect().send_message(message, from_addr=sender, to_addrs=recipients)
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+
+class MailOutbox:
+    """ Worker side of the outbox the server writes to (see opengsync_server.tools.MailHandler.enqueue_email).
+    Messages are due when the score of their id in the queue is in the past, failed attempts are rescheduled
+    with exponential backoff. """
+    MESSAGES_KEY = "mail_outbox:messages"   # hash: message id -> message json
+    QUEUE_KEY = "mail_outbox:queue"         # sorted set: message id -> unix time of next attempt
+    FAILED_KEY = "mail_outbox:failed"       # list: messages given up on, newest first
+    MAX_ATTEMPTS = 8
+    BACKOFF_SECONDS = 60
+    MAX_BACKOFF_SECONDS = 3600
+    MAX_FAILED = 500
+
+    def __init__(self, r: redis.Redis):
+        self.r = r
+
+    def due(self, limit: int) -> list[dict]:
+        if not (message_ids := self.r.zrangebyscore(self.QUEUE_KEY, "-inf", time.time(), start=0, num=limit)):
+            return []
+        messages = []
+        for message_id, data in zip(message_ids, self.r.hmget(self.MESSAGES_KEY, message_ids)):  # type: ignore
+            if data is None:
+                self.r.zrem(self.QUEUE_KEY, message_id)
+                continue
+            messages.append(json.loads(data))
+        return messages
+
+    def done(self, message: dict) -> None:
+        pipe = self.r.pipeline()
+        pipe.zrem(self.QUEUE_KEY, message["id"])
+        pipe.hdel(self.MESSAGES_KEY, message["id"])
+        pipe.execute()
+
+    def fail(self, message: dict, error: str) -> None:
+        logger.error(f"Giving up on email '{message['subject']}' to {message['recipients']} after {message['attempts']} attempt(s): {error}")
+        pipe = self.r.pipeline()
+        pipe.zrem(self.QUEUE_KEY, message["id"])
+        pipe.hdel(self.MESSAGES_KEY, message["id"])
+        pipe.lpush(self.FAILED_KEY, json.dumps(message | {"error": error}))
+        pipe.ltrim(self.FAILED_KEY, 0, self.MAX_FAILED - 1)
+        pipe.execute()
+
+    def retry(self, message: dict, error: str) -> bool:
+        """ reschedules the message, returns False if it ran out of attempts and was moved to the failed list """
+        message["attempts"] += 1
+        if message["attempts"] >= self.MAX_ATTEMPTS:
+            self.fail(message, error)
+            return False
+        delay = min(self.MAX_BACKOFF_SECONDS, self.BACKOFF_SECONDS * 2 ** (message["attempts"] - 1))
+        logger.warning(f"Email '{message['subject']}' to {message['recipients']} failed, retrying in {delay}s: {error}")
+        pipe = self.r.pipeline()
+        pipe.hset(self.MESSAGES_KEY, message["id"], json.dumps(message))
+        pipe.zadd(self.QUEUE_KEY, {message["id"]: time.time() + delay})
+        pipe.execute()
+        return True
+
+
+def _build_message(message: dict) -> MIMEMultipart:
+    mime = MIMEMultipart()
+    mime["From"] = message["sender"]
+    mime["To"] = ", ".join(message["recipients"])
+    mime["Subject"] = message["subject"]
+    mime.attach(MIMEText(message["body"], message["mime_type"]))
+    return mime
+
+
+def _set_delivery_status(db: DBHandler, links: list[tuple[int, str]], status: DeliveryStatus) -> None:
+    if not links:
+        return
+    link = models.links.SeqRequestDeliveryEmailLink
+    db.execute(
+        sa.update(link)
+        .where(sa.tuple_(link.seq_request_id, link.email).in_(links))
+        .values(status_id=status.id)
+    )
+
+
+def send_mail_outbox(db: DBHandler, outbox: MailOutbox, config: SMTPConfig | None, batch_size: int = 100) -> int:
+    """ Sends due outbox messages over one SMTP connection and updates the share-email links per recipient.
+    Returns the number of sent messages. """
+    if config is None:
+        logger.warning("MAIL_SERVER not configured, mail outbox is not sent.")
+        return 0
+
+    if not (messages := outbox.due(batch_size)):
+        return 0
+
+    connection = SMTPConnection(config)
+    dispatched: list[tuple[int, str]] = []
+    failed: list[tuple[int, str]] = []
+    n_sent = 0
+    try:
+        for message in messages:
+            links = [tuple(link) for link in message["delivery_links"]]
+            try:
+                refused = connection.send(_build_message(message), message["sender"], message["recipients"])
+            except smtplib.SMTPRecipientsRefused as e:
+                refused = e.recipients
+                if any(code < 500 for code, _ in refused.values()):
+                    if not outbox.retry(message, str(refused)):
+                        failed.extend(links)  # type: ignore
+                    continue
+            except smtplib.SMTPAuthenticationError as e:
+                if not outbox.retry(message, f"{e.smtp_code} {e.smtp_error!r}"):
+                    failed.extend(links)  # type: ignore
+                break
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500:
+                    outbox.fail(message, f"{e.smtp_code} {e.smtp_error!r}")
+                    failed.extend(links)  # type: ignore
+                elif not outbox.retry(message, f"{e.smtp_code} {e.smtp_error!r}"):
+                    failed.extend(links)  # type: ignore
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                # connection level, the rest of the batch is left for the next run
+                if not outbox.retry(message, f"{e.__class__.__name__}: {e}"):
+                    failed.extend(links)  # type: ignore
+                break
+
+            outbox.done(message)
+            if len(refused) < len(message["recipients"]):
+                n_sent += 1
+            if refused:
+                logger.error(f"Email '{message['subject']}' refused for {refused}")
+            for seq_request_id, email in links:
+                (failed if email in refused else dispatched).append((seq_request_id, email))  # type: ignore
+    finally:
+        connection.close()
+
+    _set_delivery_status(db, dispatched, DeliveryStatus.DISPATCHED)
+    _set_delivery_status(db, failed, DeliveryStatus.FAILED)
+    return n_sent
@@ -1,17 +1,22 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Iterable
 import os
-import glob
+import json
+import multiprocessing
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import pandas as pd
 import interop
 from xml.dom.minidom import parse
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+
+import redis
 
 from opengsync_db.categories import RunStatus, ExperimentStatus, ReadType, LibraryStatus, PoolStatus
 from opengsync_db.core import DBHandler
-from opengsync_db import units
+from opengsync_db import units, models
 
 from . import logger
 
@@ -156,9 +161,312 @@ def parse_metrics(run_folder: Path) -> dict[str, units.Quantity]:
     return quantities
 
 
-def process_run_folder(illumina_run_folder: Path, db: DBHandler):
-    logger.info(f"Processing run folder: {illumina_run_folder}")
-    
+@dataclass(frozen=True)
+class RunFingerprint:
+    run_parameters: tuple[int, int] | None      # (mtime_ns, size)
+    rta_complete: tuple[int, int] | None        # (mtime_ns, size)
+    interop: tuple[int, int, int] | None        # (n_files, total size, max mtime_ns)
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @staticmethod
+    def loads(data: str | bytes) -> "RunFingerprint":
+        values = json.loads(data)
+        return RunFingerprint(**{key: tuple(value) if value is not None else None for key, value in values.items()})
+
+
+def _stat(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def fingerprint(run_folder: Path) -> RunFingerprint:
+    """ cheap change marker of a run folder: a few stat calls instead of parsing RunInfo/InterOp """
+    interop_dir = None
+    try:
+        n_files, size, mtime = 0, 0, 0
+        with os.scandir(run_folder / "InterOp") as it:
+            for entry in it:
+                if entry.is_file():
+                    stat = entry.stat()
+                    n_files, size, mtime = n_files + 1, size + stat.st_size, max(mtime, stat.st_mtime_ns)
+        interop_dir = (n_files, size, mtime)
+    except OSError:
+        pass
+
+    return RunFingerprint(
+        run_parameters=_stat(os.path.join(run_folder, "RunParameters.xml")),
+        rta_complete=_stat(os.path.join(run_folder, "RTAComplete.txt")),
+        interop=interop_dir,
+    )
+
+
+def folder_mtime(run_folder: Path) -> int | None:
+    try:
+        return os.stat(run_folder).st_mtime_ns
+    except OSError:
+        return None
+
+
+class RunFolderIndex:
+    """ Persistent fingerprints of the scanned run folders (redis hashes), falls back to per-process dicts.
+    Folders whose scan did not result in a tracked run (e.g. parse errors) are also marked with the mtime of
+    the folder, the fingerprint does not cover all files a parse depends on (RunInfo.xml, ...). """
+    KEY = "rf_scanner:fingerprints"
+    UNTRACKED_KEY = "rf_scanner:untracked"     # run folder name -> folder mtime_ns at the last scan
+
+    def __init__(self, r: redis.Redis | None = None):
+        self.r = r
+        self._local: dict[str, dict[str, str]] = {self.KEY: {}, self.UNTRACKED_KEY: {}}
+
+    def _get_all(self, key: str) -> dict[str, str]:
+        if self.r is None:
+            data = self._local[key]
+        else:
+            try:
+                data = self.r.hgetall(key)  # type: ignore
+            except redis.RedisError as e:
+                logger.warning(f"Run folder index unavailable, scanning all run folders: {e}")
+                return {}
+        return {name.decode() if isinstance(name, bytes) else name: value for name, value in data.items()}
+
+    def get_all(self) -> dict[str, RunFingerprint]:
+        res = {}
+        for name, value in self._get_all(self.KEY).items():
+            try:
+                res[name] = RunFingerprint.loads(value)
+            except (ValueError, TypeError):
+                continue
+        return res
+
+    def get_untracked(self) -> dict[str, int]:
+        res = {}
+        for name, value in self._get_all(self.UNTRACKED_KEY).items():
+            try:
+                res[name] = int(value)
+            except (ValueError, TypeError):
+                continue
+        return res
+
+    def update(self, fingerprints: dict[str, RunFingerprint], untracked: dict[str, int] | None = None) -> None:
+        """ stores the fingerprints of scanned folders, `untracked` marks the ones that are not tracked runs """
+        if not fingerprints:
+            return
+        mapping = {name: fp.dumps() for name, fp in fingerprints.items()}
+        untracked = {name: str(mtime) for name, mtime in (untracked or {}).items()}
+        tracked = [name for name in fingerprints.keys() if name not in untracked]
+        if self.r is None:
+            self._local[self.KEY].update(mapping)
+            self._local[self.UNTRACKED_KEY].update(untracked)
+            for name in tracked:
+                self._local[self.UNTRACKED_KEY].pop(name, None)
+            return
+        try:
+            pipe = self.r.pipeline()
+            pipe.hset(self.KEY, mapping=mapping)
+            if untracked:
+                pipe.hset(self.UNTRACKED_KEY, mapping=untracked)
+            if tracked:
+                pipe.hdel(self.UNTRACKED_KEY, *tracked)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to update run folder index: {e}")
+
+    def prune(self, run_names: Iterable[str]) -> None:
+        """ removes fingerprints of run folders that no longer exist """
+        if not (names := list(run_names)):
+            return
+        if self.r is None:
+            for name in names:
+                self._local[self.KEY].pop(name, None)
+                self._local[self.UNTRACKED_KEY].pop(name, None)
+            return
+        try:
+            pipe = self.r.pipeline()
+            pipe.hdel(self.KEY, *names)
+            pipe.hdel(self.UNTRACKED_KEY, *names)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to prune run folder index: {e}")
+
+
+@dataclass
+class RunScan:
+    run_folder: Path
+    fingerprint: RunFingerprint
+    status_id: int
+    completed: datetime | None = None
+    parsed_data: dict | None = None
+    metrics: dict[str, units.Quantity] | None = None
+    error: str | None = None
+
+
+def scan_run_folder(run_folder: Path, fp: RunFingerprint) -> RunScan:
+    """ parses a run folder, runs in a pool worker so the result holds only picklable values (enum ids) """
+    completed = None
+    if fp.rta_complete is not None:
+        status = RunStatus.FINISHED
+        completed = datetime.fromtimestamp(os.stat(os.path.join(run_folder, "RTAComplete.txt")).st_ctime)
+    else:
+        status = RunStatus.RUNNING
+
+    scan = RunScan(run_folder=run_folder, fingerprint=fp, status_id=status.id, completed=completed)
+    try:
+        parsed_data = parse_run_folder(run_folder)
+        parsed_data["read_type"] = parsed_data["read_type"].id
+        scan.parsed_data = parsed_data
+    except Exception as e:
+        scan.error = f"Failed to parse run folder '{run_folder}': \n{e}"
+        return scan
+
+    try:
+        scan.metrics = parse_metrics(run_folder)
+    except Exception as e:
+        scan.error = f"Failed to parse metrics of run folder '{run_folder}': \n{e}"
+    return scan
+
+
+def scan_run_folders(run_folders: dict[Path, RunFingerprint], workers: int = 1) -> list[RunScan]:
+    """ parses run folders in a process pool, serially if `workers` <= 1 or the pool cannot be started """
+    items = list(run_folders.items())
+    if workers > 1 and len(items) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(items)), mp_context=multiprocessing.get_context("fork")) as pool:
+                return list(pool.map(scan_run_folder, *zip(*items)))
+        # celery prefork workers are daemonic and may not be allowed to have child processes
+        except (AssertionError, OSError, BrokenProcessPool) as e:
+            logger.warning(f"Process pool unavailable, parsing run folders serially: {e}")
+    return [scan_run_folder(run_folder, fp) for run_folder, fp in items]
+
+
+def _set_sequenced(run: models.SeqRun) -> None:
+    if run.experiment is None:
+        return
+    run.experiment.status = ExperimentStatus.DEMULTIPLEXED if run.experiment.read_qualities else ExperimentStatus.SEQUENCED
+    for pool in run.experiment.pools:
+        if pool.status < PoolStatus.SEQUENCED:
+            pool.status = PoolStatus.SEQUENCED
+        for library in pool.libraries:
+            if library.status < LibraryStatus.SEQUENCED:
+                library.status = LibraryStatus.SEQUENCED
+
+
+def _apply_scan(scan: RunScan, db: DBHandler, active_runs: dict[str, models.SeqRun]) -> None:
+    run_folder = scan.run_folder
+    run_name = run_folder.name
+    status = RunStatus.get(scan.status_id)
+    completed = scan.completed
+
+    if scan.parsed_data is None:
+        logger.warning(scan.error)
+        return
+
+    parsed_data = dict(scan.parsed_data)
+    parsed_data["read_type"] = ReadType.get(parsed_data["read_type"])
+    started = parsed_data.pop("started")
+
+    experiment_name = parsed_data["experiment_name"]
+    logger.info(f"Processing {experiment_name} ({run_name}):")
+
+    if (run := db.seq_runs.get(experiment_name)) is not None:
+        if run.run_folder != run_name:
+            logger.info(f"WARNING: Run folder name mismatch: {run.run_folder} != {run_name}.")
+            if status > run.status:
+                logger.info(f"Updating run folder name to {run_name}.")
+                run.run_folder = run_name
+                db.seq_runs.update(run)
+            else:
+                logger.info("Skipping update due to lower status.")
+                return
+
+        if completed is not None:
+            run.set_timestamp("completed", completed)
+        if started is not None and isinstance(started, datetime):
+            run.set_timestamp("started", started)
+
+        if run.status == RunStatus.FINISHED:
+            _set_sequenced(run)
+
+        # if run folder was removed and then added back, e.g. maintenance.
+        if run.status == RunStatus.ARCHIVED:
+            logger.info(f"Run folder '{run.run_folder}' was unarchived!")
+            run.status = RunStatus.FINISHED
+            _set_sequenced(run)
+            db.seq_runs.update(run)
+            return
+
+        if scan.metrics is None:
+            logger.warning(scan.error)
+            return
+
+        run.status = status
+        run.instrument_name = parsed_data["instrument"]
+        run.flowcell_id = parsed_data["flowcell_id"]
+        run.rta_version = parsed_data["rta_version"]
+        run.read_type = parsed_data["read_type"]
+        run.r1_cycles = parsed_data["r1_cycles"]
+        run.r2_cycles = parsed_data["r2_cycles"]
+        run.i1_cycles = parsed_data["i1_cycles"]
+        run.i2_cycles = parsed_data["i2_cycles"]
+
+        for key, value in scan.metrics.items():
+            run.set_quantity(key, value)
+
+        db.seq_runs.update(run)
+        active_runs[experiment_name] = run
+        logger.info("Updated!")
+    else:
+        if scan.metrics is None:
+            logger.warning(scan.error)
+            return
+
+        run = db.seq_runs.create(
+            experiment_name=experiment_name,
+            status=status,
+            run_folder=run_name,
+            instrument_name=parsed_data["instrument"],
+            flowcell_id=parsed_data["flowcell_id"],
+            rta_version=parsed_data["rta_version"],
+            read_type=parsed_data["read_type"],
+            r1_cycles=parsed_data.get("r1_cycles"),
+            r2_cycles=parsed_data.get("r2_cycles"),
+            i1_cycles=parsed_data.get("i1_cycles"),
+            i2_cycles=parsed_data.get("i2_cycles"),
+            quantities=scan.metrics,
+        )
+        if completed is not None:
+            run.set_timestamp("completed", completed)
+        if started is not None and isinstance(started, datetime):
+            run.set_timestamp("started", started)
+
+        if run.status == RunStatus.FINISHED:
+            _set_sequenced(run)
+        elif run.status == RunStatus.RUNNING:
+            if run.experiment is not None:
+                run.experiment.status = ExperimentStatus.SEQUENCING
+
+        db.seq_runs.update(run)
+
+        active_runs[experiment_name] = run
+        logger.info("Added!")
+
+
+def process_run_folder(
+    illumina_run_folder: Path, db: DBHandler, index: RunFolderIndex | None = None,
+    workers: int = 1, changed: list[str] | None = None
+) -> int:
+    """ Syncs the sequencing runs with the run folder. Only run folders whose fingerprint changed since the last
+    scan are parsed (folders that are not tracked as active runs also when the folder mtime changed), in a pool
+    of `workers` processes.
+    `changed` limits the scan to the given run folder names and re-parses them regardless of their
+    fingerprint, e.g. from a file watcher that saw RTAComplete.txt appear. Returns the number of parsed run folders. """
+    logger.info(f"Processing run folder: {illumina_run_folder}" + (f" (changed: {', '.join(changed)})" if changed else ""))
+    index = index or RunFolderIndex()
+
     active_runs, _ = db.seq_runs.find(
         status_in=[RunStatus.FINISHED, RunStatus.RUNNING],
         limit=None
@@ -166,145 +474,62 @@ def process_run_folder(illumina_run_folder: Path, db: DBHandler):
 
     active_runs = dict([(run.experiment_name, run) for run in active_runs])
 
-    for run in active_runs.values():
-        if not os.path.exists(os.path.join(illumina_run_folder, run.run_folder)):
-            run.status = RunStatus.ARCHIVED
-            if run.experiment is not None:
-                run.experiment.status = ExperimentStatus.ARCHIVED
-                for pool in run.experiment.pools:
-                    if pool.status < PoolStatus.SEQUENCED:
-                        pool.status = PoolStatus.SEQUENCED
-                    for library in pool.libraries:
-                        if library.status < LibraryStatus.SEQUENCED:
-                            library.status = LibraryStatus.SEQUENCED
-            db.seq_runs.update(run)
-            active_runs[run.experiment_name] = run
-            logger.info(f"Archived: {run.experiment_name} ({run.run_folder})")
-    
-    for run_parameters_path in glob.glob(os.path.join(illumina_run_folder, "*", "RunParameters.xml")):
-        run_folder = Path(os.path.dirname(run_parameters_path))
-        run_name = run_folder.name
-        
-        completed = None
-        if os.path.exists(os.path.join(run_folder, "RTAComplete.txt")):
-            status = RunStatus.FINISHED
-            stat = os.stat(os.path.join(run_folder, "RTAComplete.txt"))
-            completed = datetime.fromtimestamp(stat.st_ctime)
-        else:
-            status = RunStatus.RUNNING
-        
-        try:
-            parsed_data = parse_run_folder(run_folder)
-        except Exception as e:
-            logger.warning(f"Failed to parse run folder '{run_folder}': \n{e}")
-            continue
-
-        started = parsed_data.pop("started")
-        
-        experiment_name = parsed_data["experiment_name"]
-        logger.info(f"Processing {experiment_name} ({run_name}):")
-
-        if (run := db.seq_runs.get(experiment_name)) is not None:
-            if run.run_folder != run_name:
-                logger.info(f"WARNING: Run folder name mismatch: {run.run_folder} != {run_name}.")
-                if status > run.status:
-                    logger.info(f"Updating run folder name to {run_name}.")
-                    run.run_folder = run_name
-                    db.seq_runs.update(run)
-                    parsed_data = parse_run_folder(run_folder)
-                else:
-                    logger.info("Skipping update due to lower status.")
-                    continue
-                
-            # if run.status == status:
-            #     logger.info(f"Status: {run.status.display_name} - Up to date!")
-            #     continue
-            
-            if completed is not None:
-                run.set_timestamp("completed", completed)
-            if started is not None and isinstance(started, datetime):
-                run.set_timestamp("started", started)
-            
-            if run.status == RunStatus.FINISHED:
-                if run.experiment is not None:
-                    run.experiment.status = ExperimentStatus.DEMULTIPLEXED if run.experiment.read_qualities else ExperimentStatus.SEQUENCED
-                    for pool in run.experiment.pools:
-                        if pool.status < PoolStatus.SEQUENCED:
-                            pool.status = PoolStatus.SEQUENCED
-                        for library in pool.libraries:
-                            if library.status < LibraryStatus.SEQUENCED:
-                                library.status = LibraryStatus.SEQUENCED
-            
-            # if run folder was removed and then added back, e.g. maintenance.
-            if run.status == RunStatus.ARCHIVED:
-                logger.info(f"Run folder '{run.run_folder}' was unarchived!")
-                run.status = RunStatus.FINISHED
+    if changed is None:
+        for run in active_runs.values():
+            if not os.path.exists(os.path.join(illumina_run_folder, run.run_folder)):
+                run.status = RunStatus.ARCHIVED
+                _set_sequenced(run)
                 if run.experiment is not None:
-                    run.experiment.status = ExperimentStatus.DEMULTIPLEXED if run.experiment.read_qualities else ExperimentStatus.SEQUENCED
-                    for pool in run.experiment.pools:
-                        if pool.status < PoolStatus.SEQUENCED:
-                            pool.status = PoolStatus.SEQUENCED
-                        for library in pool.libraries:
-                            if library.status < LibraryStatus.SEQUENCED:
-                                library.status = LibraryStatus.SEQUENCED
+                    run.experiment.status = ExperimentStatus.ARCHIVED
                 db.seq_runs.update(run)
-                continue
-            
-            metrics = parse_metrics(run_folder)
-            
-            run.status = status
-            run.instrument_name = parsed_data["instrument"]
-            run.flowcell_id = parsed_data["flowcell_id"]
-            run.rta_version = parsed_data["rta_version"]
-            run.read_type = parsed_data["read_type"]
-            run.r1_cycles = parsed_data["r1_cycles"]
-            run.r2_cycles = parsed_data["r2_cycles"]
-            run.i1_cycles = parsed_data["i1_cycles"]
-            run.i2_cycles = parsed_data["i2_cycles"]
-
-            for key, value in metrics.items():
-                run.set_quantity(key, value)
+                active_runs[run.experiment_name] = run
+                logger.info(f"Archived: {run.experiment_name} ({run.run_folder})")
+
+        run_folders = []
+        with os.scandir(illumina_run_folder) as it:
+            for entry in it:
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, "RunParameters.xml")):
+                    run_folders.append(Path(entry.path))
+    else:
+        run_folders = [
+            Path(illumina_run_folder) / Path(name).name for name in changed
+            if os.path.exists(os.path.join(illumina_run_folder, Path(name).name, "RunParameters.xml"))
+        ]
 
-            db.seq_runs.update(run)
-            active_runs[experiment_name] = run
-            logger.info("Updated!")
-        else:
-            metrics = parse_metrics(run_folder)
-                    
-            run = db.seq_runs.create(
-                experiment_name=experiment_name,
-                status=status,
-                run_folder=run_name,
-                instrument_name=parsed_data["instrument"],
-                flowcell_id=parsed_data["flowcell_id"],
-                rta_version=parsed_data["rta_version"],
-                read_type=parsed_data["read_type"],
-                r1_cycles=parsed_data.get("r1_cycles"),
-                r2_cycles=parsed_data.get("r2_cycles"),
-                i1_cycles=parsed_data.get("i1_cycles"),
-                i2_cycles=parsed_data.get("i2_cycles"),
-                quantities=metrics,
-            )
-            if completed is not None:
-                run.set_timestamp("completed", completed)
-            if started is not None and isinstance(started, datetime):
-                run.set_timestamp("started", started)
-
-            if run.status == RunStatus.FINISHED:
-                if run.experiment is not None:
-                    run.experiment.status = ExperimentStatus.DEMULTIPLEXED if run.experiment.read_qualities else ExperimentStatus.SEQUENCED
-                    for pool in run.experiment.pools:
-                        if pool.status < PoolStatus.SEQUENCED:
-                            pool.status = PoolStatus.SEQUENCED
-                        for library in pool.libraries:
-                            if library.status < LibraryStatus.SEQUENCED:
-                                library.status = LibraryStatus.SEQUENCED
-                            
-            elif run.status == RunStatus.RUNNING:
-                if run.experiment is not None:
-                    run.experiment.status = ExperimentStatus.SEQUENCING
-            
-            db.seq_runs.update(run)
+    tracked_folders = set(run.run_folder for run in active_runs.values() if run.status != RunStatus.ARCHIVED)
+    known = index.get_all()
+    untracked = index.get_untracked()
+    to_scan, mtimes = {}, {}
+    for run_folder in sorted(run_folders):
+        fp = fingerprint(run_folder)
+        mtime = folder_mtime(run_folder)
+        if changed is None and known.get(run_folder.name) == fp:
+            if run_folder.name in tracked_folders:
+                continue
+            # not a tracked run at the last scan either, e.g. failed to parse
+            if mtime is not None and untracked.get(run_folder.name) == mtime:
+                continue
+        to_scan[run_folder] = fp
+        mtimes[run_folder.name] = mtime
+
+    logger.info(f"{len(to_scan)}/{len(run_folders)} run folders changed.")
+
+    scans = scan_run_folders(to_scan, workers=workers)
+    for scan in scans:
+        _apply_scan(scan, db, active_runs)
+
+    # fingerprints are only recorded once the runs are committed. Folders that are no tracked run
+    # (failed parses, skipped updates) are retried once the fingerprint or the folder mtime changes.
+    db.commit()
+    tracked_folders = set(run.run_folder for run in active_runs.values() if run.status != RunStatus.ARCHIVED)
+    index.update(
+        {scan.run_folder.name: scan.fingerprint for scan in scans},
+        untracked={
+            scan.run_folder.name: mtime for scan in scans
+            if scan.run_folder.name not in tracked_folders and (mtime := mtimes[scan.run_folder.name]) is not None
+        },
+    )
+    if changed is None:
+        index.prune(set(known.keys()) - set(run_folder.name for run_folder in run_folders))
 
-            active_runs[experiment_name] = run
-            logger.info("Added!")
+    return len(scans)
@@ -1,3 +1,7 @@
+import time
+from dataclasses import dataclass
+from typing import Callable
+
 import sqlalchemy as sa
 
 from opengsync_db.core import DBHandler
@@ -5,93 +9,132 @@ from opengsync_db import categories, models
 
 from . import logger
 
+_SEQUENCED_EXPERIMENT_STATUSES = [
+    categories.ExperimentStatus.SEQUENCED.id,
+    categories.ExperimentStatus.DEMULTIPLEXED.id,
+    categories.ExperimentStatus.ARCHIVED.id,
+]
+
+
+@dataclass
+class PhaseReport:
+    name: str
+    table: str
+    rows: list[tuple[int, int]]     # (id, new status id)
+    seconds: float
+
+
+def __running_experiments() -> sa.Update:
+    return sa.update(models.Experiment).where(
+        models.SeqRun.experiment_name == models.Experiment.name,
+        models.SeqRun.status_id == categories.RunStatus.RUNNING.id,
+        models.Experiment.status_id != categories.ExperimentStatus.SEQUENCING.id,
+    ).values(
+        status_id=categories.ExperimentStatus.SEQUENCING.id
+    ).returning(models.Experiment.id, models.Experiment.status_id)
+
 
-def __find_stored_samples(q):
-    return q.where(
+def __finished_experiments() -> sa.Update:
+    return sa.update(models.Experiment).where(
+        models.SeqRun.experiment_name == models.Experiment.name,
+        models.SeqRun.status_id.in_([categories.RunStatus.FINISHED.id, categories.RunStatus.ARCHIVED.id]),
+        models.Experiment.status_id.in_([
+            categories.ExperimentStatus.DRAFT.id,
+            categories.ExperimentStatus.LOADED.id,
+            categories.ExperimentStatus.SEQUENCING.id,
+        ]),
+    ).values(
+        status_id=sa.case(
+            (models.SeqRun.status_id == categories.RunStatus.ARCHIVED.id, categories.ExperimentStatus.ARCHIVED.id),
+            else_=categories.ExperimentStatus.SEQUENCED.id,
+        )
+    ).returning(models.Experiment.id, models.Experiment.status_id)
+
+
+def __finished_libraries() -> sa.Update:
+    return sa.update(models.Library).where(
+        models.Experiment.id == models.Library.experiment_id,
+        models.Experiment.status_id.in_(_SEQUENCED_EXPERIMENT_STATUSES),
+        models.Library.status_id.in_([
+            categories.LibraryStatus.POOLED.id, categories.LibraryStatus.STORED.id, categories.LibraryStatus.PREPARING.id,
+            categories.LibraryStatus.ACCEPTED.id, categories.LibraryStatus.SUBMITTED.id, categories.LibraryStatus.DRAFT.id,
+        ]),
+    ).values(
+        status_id=categories.LibraryStatus.SEQUENCED.id
+    ).returning(models.Library.id, models.Library.status_id)
+
+
+def __stored_samples() -> sa.Update:
+    return sa.update(models.Sample).where(
+        models.Sample.status_id == categories.SampleStatus.WAITING_DELIVERY.id,
         ~sa.exists().where(
             (models.links.SampleLibraryLink.sample_id == models.Sample.id) &
             (models.Library.id == models.links.SampleLibraryLink.library_id) &
             (models.Library.status_id < categories.LibraryStatus.STORED.id)
-        )
-    )
+        ),
+    ).values(
+        status_id=categories.SampleStatus.STORED.id
+    ).returning(models.Sample.id, models.Sample.status_id)
+
+
+def __sequenced_pools() -> sa.Update:
+    return sa.update(models.Pool).where(
+        models.Experiment.id == models.Pool.experiment_id,
+        models.Experiment.status_id.in_(_SEQUENCED_EXPERIMENT_STATUSES),
+        models.Pool.status_id.in_([categories.PoolStatus.ACCEPTED.id, categories.PoolStatus.STORED.id]),
+    ).values(
+        status_id=categories.PoolStatus.SEQUENCED.id
+    ).returning(models.Pool.id, models.Pool.status_id)
+
 
-def __find_seq_requests_with_stored_samples(q):
-    return q.filter(
+def __seq_requests_with_stored_samples() -> sa.Update:
+    return sa.update(models.SeqRequest).where(
+        models.SeqRequest.status_id == categories.SeqRequestStatus.ACCEPTED.id,
         sa.exists().where(
             (models.Library.seq_request_id == models.SeqRequest.id) &
             (models.links.SampleLibraryLink.library_id == models.Library.id) &
             (models.Sample.id == models.links.SampleLibraryLink.sample_id)
-        )
-    ).filter(
-        sa.and_(
-            ~sa.exists().where(
-                (models.Library.seq_request_id == models.SeqRequest.id) &
-                (models.links.SampleLibraryLink.library_id == models.Library.id) &
-                (models.Sample.id == models.links.SampleLibraryLink.sample_id) &
-                (models.Sample.status_id < categories.SampleStatus.STORED.id)
-            ),
-            ~sa.exists().where(
-                (models.Library.seq_request_id == models.SeqRequest.id) &
-                (models.links.SampleLibraryLink.library_id == models.Library.id) &
-                (models.Library.pool_id == models.Pool.id) &
-                (models.Pool.status_id < categories.PoolStatus.STORED.id)
-            )
-        )
-    )
+        ),
+        ~sa.exists().where(
+            (models.Library.seq_request_id == models.SeqRequest.id) &
+            (models.links.SampleLibraryLink.library_id == models.Library.id) &
+            (models.Sample.id == models.links.SampleLibraryLink.sample_id) &
+            (models.Sample.status_id < categories.SampleStatus.STORED.id)
+        ),
+        ~sa.exists().where(
+            (models.Library.seq_request_id == models.SeqRequest.id) &
+            (models.links.SampleLibraryLink.library_id == models.Library.id) &
+            (models.Library.pool_id == models.Pool.id) &
+            (models.Pool.status_id < categories.PoolStatus.STORED.id)
+        ),
+    ).values(
+        status_id=categories.SeqRequestStatus.SAMPLES_RECEIVED.id
+    ).returning(models.SeqRequest.id, models.SeqRequest.status_id)
+
 
-def __find_seq_requests_with_pooled_libraries(q):
-    return q.where(
+def __seq_requests_with_pooled_libraries() -> sa.Update:
+    return sa.update(models.SeqRequest).where(
+        models.SeqRequest.status_id == categories.SeqRequestStatus.SAMPLES_RECEIVED.id,
         sa.exists().where(
             (models.Library.seq_request_id == models.SeqRequest.id) &
             (models.Library.status_id == categories.LibraryStatus.POOLED.id)
-        )
-    ).where(
+        ),
         ~sa.exists().where(
             (models.Library.seq_request_id == models.SeqRequest.id) &
             (models.Library.status_id < categories.LibraryStatus.POOLED.id)
-        )
-    )
-
-
-def __find_finished_experiments(q):
-    return q.join(
-        models.SeqRun,
-        models.SeqRun.experiment_name == models.Experiment.name,
-    ).where(
-        models.SeqRun.status_id.in_([
-            categories.RunStatus.FINISHED.id, categories.RunStatus.ARCHIVED.id,
-        ])
-    )
-
-
-def __find_finished_libraries(q):
-    return q.join(
-        models.Experiment,
-        models.Experiment.id == models.Library.experiment_id,
-    ).where(
-        models.Experiment.status_id.in_([
-            categories.ExperimentStatus.SEQUENCED.id,
-            categories.ExperimentStatus.DEMULTIPLEXED.id,
-            categories.ExperimentStatus.ARCHIVED.id,
-        ])
-    )
-
-
-def __find_sequenced_pools(q):
-    return q.join(
-        models.Experiment,
-        models.Experiment.id == models.Pool.experiment_id,
-    ).where(
-        models.Experiment.status_id.in_([
-            categories.ExperimentStatus.SEQUENCED.id,
-            categories.ExperimentStatus.DEMULTIPLEXED.id,
-            categories.ExperimentStatus.ARCHIVED.id,
-        ])
-    )
-
-
-def __find_sequenced_seq_requests(q):
-    return q.where(
+        ),
+    ).values(
+        status_id=categories.SeqRequestStatus.PREPARED.id
+    ).returning(models.SeqRequest.id, models.SeqRequest.status_id)
+
+
+def __sequenced_seq_requests() -> sa.Update:
+    return sa.update(models.SeqRequest).where(
+        models.SeqRequest.status_id.in_([
+            categories.SeqRequestStatus.ACCEPTED.id,
+            categories.SeqRequestStatus.SAMPLES_RECEIVED.id,
+            categories.SeqRequestStatus.PREPARED.id,
+        ]),
         sa.exists().where(
             (models.Library.seq_request_id == models.SeqRequest.id) &
             (models.Library.status_id.in_([
@@ -99,154 +142,88 @@ def __find_sequenced_seq_requests(q):
                 categories.LibraryStatus.SHARED.id,
                 categories.LibraryStatus.ARCHIVED.id,
             ]))
-        )
-    ).where(
+        ),
         ~sa.exists().where(
             (models.Library.seq_request_id == models.SeqRequest.id) &
             (models.Library.status_id < categories.LibraryStatus.SEQUENCED.id)
-        )
-    )
+        ),
+    ).values(
+        status_id=categories.SeqRequestStatus.DATA_PROCESSING.id
+    ).returning(models.SeqRequest.id, models.SeqRequest.status_id)
 
 
-def __find_sequenced_projects(q):
-    return q.where(
+def __sequenced_projects() -> sa.Update:
+    return sa.update(models.Project).where(
+        models.Project.status_id == categories.ProjectStatus.PROCESSING.id,
         sa.exists().where(
             (models.Sample.project_id == models.Project.id) &
             (models.links.SampleLibraryLink.sample_id == models.Sample.id) &
             (models.Library.id == models.links.SampleLibraryLink.library_id) &
             (models.Library.status_id >= categories.LibraryStatus.SEQUENCED.id)
-        )
-    ).where(
+        ),
         ~sa.exists().where(
             (models.Sample.project_id == models.Project.id) &
             (models.links.SampleLibraryLink.sample_id == models.Sample.id) &
             (models.Library.id == models.links.SampleLibraryLink.library_id) &
             (models.Library.status_id < categories.LibraryStatus.SEQUENCED.id)
-        )
-    )
+        ),
+    ).values(
+        status_id=categories.ProjectStatus.SEQUENCED.id
+    ).returning(models.Project.id, models.Project.status_id)
 
 
-def __find_finished_seq_requests(q):
-    return q.where(
+def __finished_seq_requests() -> sa.Update:
+    return sa.update(models.SeqRequest).where(
+        models.SeqRequest.status_id == categories.SeqRequestStatus.DATA_PROCESSING.id,
         ~sa.exists().where(
             (models.Library.seq_request_id == models.SeqRequest.id) &
             (models.Library.status_id < categories.LibraryStatus.SHARED.id)
-        )
-    )
-
-
-def update_statuses(db: DBHandler):
+        ),
+    ).values(
+        status_id=categories.SeqRequestStatus.FINISHED.id
+    ).returning(models.SeqRequest.id, models.SeqRequest.status_id)
+
+
+# in dependency order, every phase sees the updates of the previous ones
+PHASES: list[tuple[str, Callable[[], sa.Update]]] = [
+    ("running_experiments", __running_experiments),
+    ("finished_experiments", __finished_experiments),
+    ("finished_libraries", __finished_libraries),
+    ("stored_samples", __stored_samples),
+    ("sequenced_pools", __sequenced_pools),
+    ("seq_requests_with_stored_samples", __seq_requests_with_stored_samples),
+    ("seq_requests_with_pooled_libraries", __seq_requests_with_pooled_libraries),
+    ("sequenced_seq_requests", __sequenced_seq_requests),
+    ("sequenced_projects", __sequenced_projects),
+    ("finished_seq_requests", __finished_seq_requests),
+]
+
+_STATUS_TYPES = {
+    models.Experiment.__tablename__: categories.ExperimentStatus,
+    models.Library.__tablename__: categories.LibraryStatus,
+    models.Sample.__tablename__: categories.SampleStatus,
+    models.Pool.__tablename__: categories.PoolStatus,
+    models.SeqRequest.__tablename__: categories.SeqRequestStatus,
+    models.Project.__tablename__: categories.ProjectStatus,
+}
+
+
+def update_statuses(db: DBHandler) -> list[PhaseReport]:
+    """ propagates statuses with one set-based UPDATE ... RETURNING per phase in the session's transaction """
     logs = ["Checking statuses.."]
-
-    for run in db.seq_runs.find(
-        status=categories.RunStatus.RUNNING, limit=None
-    )[0]:
-        if run.experiment is not None:
-            run.experiment.status = categories.ExperimentStatus.SEQUENCING
-            logs.append(f"Updating experiment {run.experiment.id} status to {run.experiment.status}")
-            db.seq_runs.update(run)
-
-    db.flush()
-
-    for experiment in db.experiments.find(
-        limit=None, custom_query=__find_finished_experiments,
-        status_in=[
-            categories.ExperimentStatus.DRAFT,
-            categories.ExperimentStatus.LOADED,
-            categories.ExperimentStatus.SEQUENCING,
-        ],
-    )[0]:
-        if experiment.seq_run is None:
-            experiment.status = categories.ExperimentStatus.SEQUENCED
-        else:
-            if experiment.seq_run.status == categories.RunStatus.FINISHED:
-                experiment.status = categories.ExperimentStatus.SEQUENCED
-            elif experiment.seq_run.status == categories.RunStatus.ARCHIVED:
-                experiment.status = categories.ExperimentStatus.ARCHIVED
-            else:
-                continue
-            logs.append(f"Updating experiment {experiment.id} status to {experiment.status}")
-            db.experiments.update(experiment)
-
-    db.flush()
-
-    for library in db.libraries.find(
-        status_in=[
-            categories.LibraryStatus.POOLED, categories.LibraryStatus.STORED, categories.LibraryStatus.PREPARING,
-            categories.LibraryStatus.ACCEPTED, categories.LibraryStatus.SUBMITTED, categories.LibraryStatus.DRAFT,
-        ], custom_query=__find_finished_libraries, limit=None
-    )[0]:
-        if library.experiment is not None:
-            library.status = categories.LibraryStatus.SEQUENCED
-            logs.append(f"Updating library {library.id} status to {library.status}")
-            db.libraries.update(library)
-    
-    db.flush()
-
-    for sample in db.samples.find(
-        status=categories.SampleStatus.WAITING_DELIVERY, limit=None,
-        custom_query=__find_stored_samples,
-    )[0]:
-        sample.status = categories.SampleStatus.STORED
-        logs.append(f"Updating sample {sample.id} status to {sample.status}")
-        db.samples.update(sample)
-
-    db.flush()
-
-    for pool in db.pools.find(
-        status_in=[categories.PoolStatus.ACCEPTED, categories.PoolStatus.STORED],
-        custom_query=__find_sequenced_pools, limit=None
-    )[0]:
-        pool.status = categories.PoolStatus.SEQUENCED
-        logs.append(f"Updating pool {pool.id} status to {pool.status}")
-        db.pools.update(pool)
-
-    db.flush()
-
-    for seq_request in db.seq_requests.find(
-        status=categories.SeqRequestStatus.ACCEPTED,
-        custom_query=__find_seq_requests_with_stored_samples, limit=None
-    )[0]:
-        seq_request.status = categories.SeqRequestStatus.SAMPLES_RECEIVED
-        logs.append(f"Updating seq_request {seq_request.id} status to {seq_request.status}")
-        db.seq_requests.update(seq_request)
-
-    db.flush()
-
-    for seq_request in db.seq_requests.find(
-        status=categories.SeqRequestStatus.SAMPLES_RECEIVED,
-        custom_query=__find_seq_requests_with_pooled_libraries, limit=None
-    )[0]:
-        seq_request.status = categories.SeqRequestStatus.PREPARED
-        logs.append(f"Updating seq_request {seq_request.id} status to {seq_request.status}")
-        db.seq_requests.update(seq_request)
-
-    db.flush()
-
-    for seq_request in db.seq_requests.find(
-        status_in=[categories.SeqRequestStatus.ACCEPTED, categories.SeqRequestStatus.SAMPLES_RECEIVED, categories.SeqRequestStatus.PREPARED],
-        custom_query=__find_sequenced_seq_requests, limit=None
-    )[0]:
-        seq_request.status = categories.SeqRequestStatus.DATA_PROCESSING
-        logs.append(f"Updating seq_request {seq_request.id} status to {seq_request.status}")
-        db.seq_requests.update(seq_request)
-
-    db.flush()
-
-    for project in db.projects.iter(
-        status=categories.ProjectStatus.PROCESSING, custom_query=__find_sequenced_projects
-    ):
-        project.status = categories.ProjectStatus.SEQUENCED
-        db.projects.update(project)
-        logs.append(f"Updating project {project.id} status to {project.status}")
-
-    db.flush()
-
-    for seq_request in db.seq_requests.iter(
-        status=categories.SeqRequestStatus.DATA_PROCESSING, custom_query=__find_finished_seq_requests
-    ):
-        seq_request.status = categories.SeqRequestStatus.FINISHED
-        db.seq_requests.update(seq_request)
-        logs.append(f"Updating seq_request {seq_request.id} status to {seq_request.status}")
-
-    logger.info("\n".join(logs))
\ No newline at end of file
+    reports = []
+
+    for name, statement in PHASES:
+        stmt = statement().execution_options(synchronize_session=False)
+        start = time.perf_counter()
+        rows = [(row[0], row[1]) for row in db.execute(stmt).all()]
+        report = PhaseReport(name=name, table=stmt.table.name, rows=rows, seconds=time.perf_counter() - start)  # type: ignore[union-attr]
+        reports.append(report)
+
+        logs.append(f"[{name}] updated {len(rows)} {report.table} row(s) in {report.seconds * 1000:.1f} ms")
+        status_type = _STATUS_TYPES[report.table]
+        for id, status_id in rows:
+            logs.append(f"Updating {report.table} {id} status to {status_type.get(status_id)}")
+
+    logger.info("\n".join(logs))
+    return reports
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import threading
+import traceback
+from datetime import datetime, timezone
+from typing import Callable, Any
+from dataclasses import dataclass, asdict, field
+
+import redis
+from redis.lock import Lock
+from redis.exceptions import LockError, LockNotOwnedError
+
+from opengsync_db import DBHandler, PoolConfig
+
+from . import logger
+
+
+@dataclass
+class TaskMetrics:
+    task: str
+    started: str
+    status: str = "ok"             # 'ok', 'error' or 'skipped' (another run held the lock)
+    duration_seconds: float = 0.0
+    rows: int | None = None
+    error: str | None = None
+    pid: int = field(default_factory=os.getpid)
+
+
+class WorkerContext:
+    """ Per worker process state shared by all tasks: one DBHandler (and engine) created in
+    `worker_process_init` and disposed at shutdown, plus the redis connection for task locks and metrics. """
+    METRICS_KEY = "task_metrics:{task}"
+    LOCK_KEY = "task_lock:{task}"
+    MAX_METRICS = 500
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.r = redis.Redis(host="redis-cache", port=int(os.environ["REDIS_PORT"]), db=5)
+        self._db: DBHandler | None = None
+
+    def init(self) -> None:
+        if self._db is not None:
+            return
+        self._db = DBHandler(logger=logger, auto_commit=True)
+        self._db.connect(
+            user=os.environ["POSTGRES_USER"],
+            password=os.environ["POSTGRES_PASSWORD"],
+            host=os.environ["POSTGRES_HOST"],
+            port=os.environ["POSTGRES_PORT"],
+            db=os.environ["POSTGRES_DB"],
+            pool_config=PoolConfig.from_dict(self.config.get("db")),
+        )
+        logger.info(f"Worker process {os.getpid()} connected to the database.")
+
+    def close(self) -> None:
+        if self._db is None:
+            return
+        self._db.close_connection()
+        self._db = None
+
+    @property
+    def db(self) -> DBHandler:
+        # worker pools without process init signal (solo, threads) connect on first use
+        if self._db is None:
+            self.init()
+        return self._db  # type: ignore
+
+    def record(self, metrics: TaskMetrics) -> None:
+        key = self.METRICS_KEY.format(task=metrics.task)
+        try:
+            pipe = self.r.pipeline()
+            pipe.lpush(key, json.dumps(asdict(metrics)))
+            pipe.ltrim(key, 0, self.MAX_METRICS - 1)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to record metrics of task '{metrics.task}': {e}")
+
+    def _renew_lock(self, task: str, lock: Lock, interval: float, stop: threading.Event) -> None:
+        """ resets the lock's timeout every `interval` seconds until `stop` is set """
+        while not stop.wait(interval):
+            try:
+                lock.reacquire()
+            except LockNotOwnedError:
+                logger.warning(f"Lock of task '{task}' expired while the task was running.")
+                return
+            except redis.RedisError as e:
+                logger.warning(f"Failed to renew the lock of task '{task}': {e}")
+
+    def run(self, task: str, func: Callable[[DBHandler], Any], lock_timeout_seconds: int | None = 300, use_db: bool = True) -> TaskMetrics:
+        """ runs `func` in a session of the shared DBHandler. With `lock_timeout_seconds` the task is a
+        singleton: if another run of it holds the redis lock, this one is skipped. The lock is renewed while
+        the task runs, the timeout only bounds how long the lock of a killed worker blocks the task.
+        Returned ints are recorded as row counts. """
+        metrics = TaskMetrics(task=task, started=datetime.now(timezone.utc).isoformat())
+        start = time.perf_counter()
+
+        lock: Lock | None = None
+        if lock_timeout_seconds is not None:
+            # the renewal thread needs the token, it is not kept thread-local
+            lock = self.r.lock(self.LOCK_KEY.format(task=task), timeout=lock_timeout_seconds, thread_local=False)
+            try:
+                acquired = lock.acquire(blocking=False)
+            except redis.RedisError as e:
+                logger.warning(f"Task lock unavailable, running '{task}' without it: {e}")
+                acquired, lock = True, None
+            if not acquired:
+                logger.info(f"Skipping task '{task}', previous run still in progress.")
+                metrics.status = "skipped"
+                self.record(metrics)
+                return metrics
+
+        stop_renewal = threading.Event()
+        renewal: threading.Thread | None = None
+        if lock is not None:
+            renewal = threading.Thread(
+                target=self._renew_lock, args=(task, lock, lock_timeout_seconds / 3, stop_renewal),  # type: ignore[operator]
+                name=f"lock-renewal-{task}", daemon=True,
+            )
+
+        db = self.db if use_db else None
+        rollback = False
+        if renewal is not None:
+            renewal.start()
+        try:
+            if db is not None:
+                db.open_session()
+            result = func(db)  # type: ignore
+            if isinstance(result, int) and not isinstance(result, bool):
+                metrics.rows = result
+        except Exception as e:
+            logger.error(f"\n-------- Exception [ {task} ] --------\n\tError: {e.__repr__()}\n\tMessage: {e}\n\tTraceback: {traceback.format_exc()}\n-------- END ERROR --------")
+            metrics.status = "error"
+            metrics.error = f"{e.__class__.__name__}: {e}"
+            rollback = True
+        finally:
+            if db is not None:
+                db.close_session(rollback=rollback)
+            if renewal is not None:
+                stop_renewal.set()
+                renewal.join()
+            if lock is not None:
+                try:
+                    lock.release()
+                except LockError:
+                    logger.warning(f"Lock of task '{task}' expired before the task finished.")
+            metrics.duration_seconds = time.perf_counter() - start
+            self.record(metrics)
+
+        logger.info(f"Task '{task}' finished with status '{metrics.status}' in {metrics.duration_seconds:.2f}s ({metrics.rows} rows).")
+        return metrics
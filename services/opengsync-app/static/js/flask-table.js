@@ -182,8 +182,12 @@ class HTMXTable {
         this.$container.on("click", ".pagination .page-item", (e) => {
             e.preventDefault();
             let page = $(e.currentTarget).data("page");
+            let cursor = $(e.currentTarget).data("cursor");
             let state = this._getState();
             state.page = page;
+            if (cursor) {
+                state.cursor = cursor;
+            }
             this._ajax(state);
         });
     }
@@ -20,3 +20,4 @@ def db():
     db.open_session()
     yield db
     db.close_session()
+    db.close_connection()
@@ -115,8 +115,9 @@ def create_feature_kit(
 
 
 def create_sequencer(db: DBHandler) -> models.Sequencer:
+    _uuid = str(uuid.uuid1())
     return db.sequencers.create(
-        name="sequencer",
+        name=_uuid[:32],
         model=SequencerModel.NOVA_SEQ_6000,
     )
 
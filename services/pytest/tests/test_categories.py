@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from opengsync_db import categories as cats
+
+
+def test_map_series():
+    series = pd.Series([0, 7, None, 7.0, cats.LibraryStatus.FAILED])
+    mapped = cats.LibraryStatus.map_series(series)
+    assert mapped.tolist() == [
+        cats.LibraryStatus.DRAFT, cats.LibraryStatus.SHARED, None,
+        cats.LibraryStatus.SHARED, cats.LibraryStatus.FAILED
+    ]
+    assert mapped.index.equals(series.index)
+
+    with pytest.raises(ValueError):
+        cats.LibraryStatus.map_series(pd.Series([1, 999]))
+
+    with pytest.raises(ValueError):
+        cats.LibraryStatus.map_series(pd.Series([1, None]), na_action=None)
+
+
+def test_to_categorical():
+    categorical = cats.PoolStatus.to_categorical(pd.Series([cats.PoolStatus.ACCEPTED.id, None]))
+    assert categorical[0] is cats.PoolStatus.ACCEPTED
+    assert pd.isna(categorical[1])
+    assert list(categorical.categories) == cats.PoolStatus.as_list()
+
+
+def test_lookup_tables():
+    for library_type in cats.LibraryType.as_list():
+        assert cats.LibraryType.get(library_type.id) is library_type
+        assert cats.LibraryType.from_abbreviation(library_type.abbreviation) is not None
+
+    assert cats.AttributeType.get_attribute_by_label("Cell Type") == cats.AttributeType.CELL_TYPE
+    assert cats.AttributeType.get_attribute_by_label("unknown") == cats.AttributeType.CUSTOM
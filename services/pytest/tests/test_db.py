@@ -1,6 +1,11 @@
-from opengsync_db import DBHandler
+from opengsync_db import DBHandler, PoolConfig, ReadPolicy
+from opengsync_db.core import engine_registry
+from opengsync_db.core.ReplicaRouter import ReplicaRouter
 
-from .create_units import create_user
+from opengsync_db import models
+from opengsync_db.categories import LibraryStatus
+
+from .create_units import create_user, create_seq_request, create_library
 
 
 def test_db(db: DBHandler):
@@ -29,4 +34,78 @@ def test_db(db: DBHandler):
 
     db.rollback()
 
-    assert len(db.users.find(limit=None)[0]) == 1
\ No newline at end of file
+    assert len(db.users.find(limit=None)[0]) == 1
+
+def test_read_replica_routing(db: DBHandler):
+    # a second engine to the same (standalone) server acts as replica with zero lag
+    replica = engine_registry.get(db._url, PoolConfig(pool_size=1))
+    db._replica_router = ReplicaRouter(db.engine, replica, ReadPolicy())
+    assert db._replica_router.lag == 0.0
+    assert db.read_engine is replica
+
+    create_user(db)
+    assert db.read_engine is db.engine
+
+    # read-your-writes: reads stay on the primary within the staleness bound after a commit
+    db.commit()
+    assert db.last_write is not None
+    assert db.read_engine is db.engine
+
+    db.last_write -= ReadPolicy().max_lag_seconds
+    assert db.read_engine is replica
+
+    with db.use_primary():
+        assert db.read_engine is db.engine
+    assert db.read_engine is replica
+
+    db._replica_router = ReplicaRouter(db.engine, replica, ReadPolicy(mode="primary"))
+    assert db.read_engine is db.engine
+    replica.dispose()
+
+
+def test_update_invalidates_filtered_reads(db: DBHandler):
+    user = create_user(db)
+    seq_request = create_seq_request(db, user)
+    library = create_library(db, user, seq_request)
+    library_id = library.id
+    db.close_session()
+    db.pop_write_tags()
+
+    # the filtered read does not load the library, it is only attributable to the table
+    db.open_session()
+    db.start_read_tracking()
+    libraries, _ = db.libraries.find(status_in=[LibraryStatus.ACCEPTED], limit=None)
+    filtered_read_tags = db.stop_read_tracking()
+    assert library_id not in [lib.id for lib in libraries]
+
+    db.start_read_tracking()
+    n_accepted = db.session.query(models.Library).where(models.Library.status_id == LibraryStatus.ACCEPTED.id).count()
+    count_read_tags = db.stop_read_tracking()
+
+    library = db.libraries[library_id]
+    library.status = LibraryStatus.ACCEPTED
+    db.libraries.update(library)
+    db.close_session()
+    write_tags = db.pop_write_tags()
+
+    assert filtered_read_tags & write_tags
+    assert count_read_tags & write_tags
+
+    db.open_session()
+    libraries, _ = db.libraries.find(status_in=[LibraryStatus.ACCEPTED], limit=None)
+    assert library_id in [lib.id for lib in libraries]
+    assert db.session.query(models.Library).where(models.Library.status_id == LibraryStatus.ACCEPTED.id).count() == n_accepted + 1
+
+
+def test_unchanged_dirty_object_writes_no_tags(db: DBHandler):
+    user = create_user(db)
+    db.close_session()
+    db.pop_write_tags()
+
+    db.open_session()
+    user = db.users[user.id]
+    user.first_name = user.first_name
+    db.users.update(user)
+    db.close_session()
+    assert models.User.__tablename__ not in db.pop_write_tags()
+    db.open_session()
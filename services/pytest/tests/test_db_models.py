@@ -1,4 +1,8 @@
+import sqlalchemy as sa
+
 from opengsync_db import DBHandler
+from opengsync_db.core.BarcodeIndex import BarcodeIndex, GENERATION
+from opengsync_db.categories import BarcodeType, DataPathType, IndexType
 
 from .create_units import (
     create_user, create_project, create_seq_request, create_sample, create_library,
@@ -66,6 +70,31 @@ def test_mux_links(db: DBHandler):
     assert seq_request.num_libraries == 0
 
 
+
+def test_seq_request_overview_graph(db: DBHandler):
+    user = create_user(db)
+    project = create_project(db, user)
+    seq_request = create_seq_request(db, user)
+    other_request = create_seq_request(db, user)
+
+    libraries = [create_library(db, user, seq_request) for _ in range(3)]
+    other_library = create_library(db, user, other_request)
+    samples = [create_sample(db, user, project) for _ in range(4)]
+
+    for i, sample in enumerate(samples):
+        db.links.link_sample_library(sample.id, libraries[i % 2].id)
+        db.links.link_sample_library(sample.id, other_library.id)
+    db.links.link_sample_library(samples[0].id, libraries[2].id)
+
+    edges = db.seq_requests.get_overview_graph(seq_request.id)
+    assert [(edge.sample_id, edge.library_id) for edge in edges] == sorted(
+        [(sample.id, libraries[i % 2].id) for i, sample in enumerate(samples)] + [(samples[0].id, libraries[2].id)]
+    )
+    num_samples = {edge.library_id: edge.library_num_samples for edge in edges}
+    assert num_samples == {libraries[0].id: 2, libraries[1].id: 2, libraries[2].id: 1}
+    assert all(edge.project_title == project.title for edge in edges)
+    assert db.seq_requests.get_overview_graph(other_request.id)[0].library_num_samples == len(samples)
+
 def test_files(db: DBHandler):
     seq_request = create_seq_request(db, create_user(db))
     NUM_FILES = len(db.media_files.find(limit=None))
@@ -80,6 +109,22 @@ def test_files(db: DBHandler):
     assert len(db.media_files.find(limit=None)) == NUM_FILES
 
 
+def test_data_paths_by_path(db: DBHandler):
+    user = create_user(db)
+    project = create_project(db, user)
+    seq_request = create_seq_request(db, user)
+
+    db.data_paths.create(path="runs/run_1", type=DataPathType.DIRECTORY, project=project)
+    db.data_paths.create(path="runs/run_1", type=DataPathType.DIRECTORY, seq_request=seq_request)
+    db.data_paths.create(path="runs/run_2", type=DataPathType.DIRECTORY, project=project)
+
+    data_paths = db.data_paths.find_by_paths(["runs/run_1", "runs/run_2", "runs/run_3"])
+    assert len(data_paths["runs/run_1"]) == 2
+    assert [data_path.project_id for data_path in data_paths["runs/run_2"]] == [project.id]
+    assert data_paths["runs/run_3"] == []
+    assert db.data_paths.find_by_paths([]) == {}
+
+
 def test_group_affiliations(db: DBHandler):
     user_1 = create_user(db)
     user_2 = create_user(db)
@@ -103,3 +148,49 @@ def test_group_affiliations(db: DBHandler):
     assert len(db.seq_requests.find(user_id=user_2.id, limit=None)[0]) == 1
     assert len(db.projects.find(user_id=user_1.id, limit=None)[0]) == 2
     assert len(db.projects.find(user_id=user_2.id, limit=None)[0]) == 1
+
+
+def test_barcode_index(db: DBHandler):
+    kit = db.index_kits.create(
+        identifier="TEST", name="Test Kit", supported_protocols=[], type=IndexType.DUAL_INDEX
+    )
+    sequences = ["ACGTACGT", "TTTTCCCC", "GGGGAAAA"]
+    for i, sequence in enumerate(sequences):
+        adapter = db.adapters.create(index_kit_id=kit.id, well=f"A{i + 1}")
+        db.barcodes.create(name=f"i7_{i}", sequence=sequence, well=f"A{i + 1}", type=BarcodeType.INDEX_I7, adapter_id=adapter.id)
+    db.commit()
+
+    df = db.pd.query_barcode_sequences("ACGTACGA", limit=2)
+    assert df["sequence"].tolist() == ["ACGTACGT", "GGGGAAAA"]
+    assert df["hamming"].tolist() == [1, 5]
+
+    assert len(db.pd.query_barcode_sequences("ACGTACGA", max_distance=1)) == 1
+    assert db.pd.match_barcodes_to_kit(sequences[:2], BarcodeType.INDEX_I7)["kit_id"].tolist() == [kit.id]
+    assert db.pd.match_barcodes_to_kit(sequences[:2], BarcodeType.INDEX_I5).empty
+    assert db.pd.match_barcodes_to_kit(["ACGTACGT", "AAAAAAAA"], BarcodeType.INDEX_I7).empty
+
+    adapter = db.adapters.create(index_kit_id=kit.id, well="B1")
+    db.barcodes.create(name="i7_3", sequence="AAAAAAAA", well="B1", type=BarcodeType.INDEX_I7, adapter_id=adapter.id)
+    db.commit()
+    assert db.pd.match_barcodes_to_kit(["ACGTACGT", "AAAAAAAA"], BarcodeType.INDEX_I7)["kit_id"].tolist() == [kit.id]
+
+
+def test_barcode_index_generation(db: DBHandler):
+    index = BarcodeIndex(db, check_interval_seconds=0)
+    snapshot = index.snapshot
+    assert snapshot.generation is not None
+    assert index.snapshot is snapshot
+
+    # commits touching barcodes publish a new generation
+    db.index_kits.create(
+        identifier="GEN", name="Generation Kit", supported_protocols=[], type=IndexType.SINGLE_INDEX_I7
+    )
+    db.commit()
+    assert index._generation() > snapshot.generation  # type: ignore[operator]
+
+    # a generation advanced by another process rebuilds the index
+    snapshot = index.snapshot
+    with db.engine.begin() as conn:
+        conn.execute(sa.select(GENERATION.next_value()))
+    assert index.snapshot is not snapshot
+    assert index.snapshot.generation == index._generation()
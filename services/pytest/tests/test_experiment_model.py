@@ -1,9 +1,15 @@
+import math
+
+import numpy as np
+import pandas as pd
+
 from opengsync_db import DBHandler
-from opengsync_db.categories import ExperimentWorkFlow
+from opengsync_db.core import columnar
+from opengsync_db.categories import ExperimentWorkFlow, LibraryType, GenomeRef, BarcodeOrientation
 
 from .create_units import (
     create_user, create_seq_request, create_library, create_pool,
-    create_experiment
+    create_experiment, create_sequencer
 )  # noqa
 
 
@@ -167,4 +173,86 @@ def test_experiment_lanes(db: DBHandler):
     for pool in pools:
         db.refresh(pool)
         assert pool is not None
-        assert len(pool.lane_links) == 0
\ No newline at end of file
+        assert len(pool.lane_links) == 0
+
+def test_flowcell_frame(db: DBHandler):
+    user = create_user(db)
+    seq_request = create_seq_request(db, user)
+    experiment = create_experiment(db, user, ExperimentWorkFlow.NOVASEQ_6K_S4_XP)
+
+    for i in range(6):
+        pool = create_pool(db, user, seq_request)
+        for j in range(5):
+            library = create_library(db, user, seq_request)
+            db.libraries.add_to_pool(library.id, pool.id)
+            if j % 2 == 0:
+                db.libraries.add_index(
+                    library.id, index_kit_i7_id=None, name_i7=f"i7_{i}_{j}", sequence_i7="ACGTACGT",
+                    index_kit_i5_id=None, name_i5=None, sequence_i5=None, orientation=BarcodeOrientation.FORWARD
+                )
+        db.links.link_pool_experiment(experiment.id, pool.id)
+        db.links.add_pool_to_lane(experiment, pool=pool, lane_num=(i % experiment.num_lanes) + 1)
+    db.commit()
+
+    df = db.pd.get_flowcell(experiment.id)
+    expected = pd.read_sql(db.pd._flowcell_query(experiment.id), db.engine)
+    expected["library_type"] = LibraryType.map_series(expected["library_type_id"])
+    expected["reference"] = GenomeRef.map_series(expected["reference_id"])
+    expected["orientation"] = BarcodeOrientation.map_series(expected["orientation_id"])
+    # nullable columns (libraries with and without index) have the pd.read_sql dtypes and missing values
+    assert expected["orientation_id"].isna().any() and expected["orientation_id"].notna().any()
+    expected = expected[df.columns]
+
+    assert len(df) == 30
+    pd.testing.assert_frame_equal(df, expected)
+
+    chunks = list(db.pd.iter_flowcell(experiment.id, batch_size=7))
+    assert [len(chunk) for chunk in chunks] == [7, 7, 7, 7, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+
+    # typed: nullable extension dtypes, arrow strings and categorical enums with the same values
+    typed = db.pd.get_flowcell(experiment.id, typed=True)
+    assert typed["library_id"].dtype == pd.Int64Dtype()
+    assert typed["sequence_i7"].dtype == pd.StringDtype("pyarrow", na_value=np.nan)
+    # columns without any value keep their type
+    assert typed["sequence_i5"].isna().all() and typed["sequence_i5"].dtype == pd.StringDtype("pyarrow", na_value=np.nan)
+    assert isinstance(typed["orientation"].dtype, pd.CategoricalDtype) and typed["orientation"].cat.ordered
+    assert typed["orientation"].isna().sum() == df["orientation"].isna().sum()
+    pd.testing.assert_frame_equal(
+        typed.astype(object).where(typed.notna(), None), df.astype(object).where(df.notna(), None)
+    )
+    assert typed.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+
+    frame = columnar.read_frame(db.pd._flowcell_query(experiment.id), db.engine, typed=True)
+    assert frame["orientation_id"].dtype == pd.Int64Dtype()
+    assert frame["orientation_id"].isna().sum() == expected["orientation"].isna().sum()
+
+    chunks = list(db.pd.iter_flowcell(experiment.id, batch_size=7, typed=True))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), typed)
+
+
+def test_sequencer_pagination(db: DBHandler):
+    NUM_SEQUENCERS = 25
+    for _ in range(NUM_SEQUENCERS):
+        create_sequencer(db)
+
+    n_sequencers = db.sequencers.count()
+    expected = [sequencer.id for sequencer in db.sequencers.find(limit=None, sort_by="id")[0]]
+    assert len(expected) == n_sequencers
+
+    pages = []
+    for page in range(math.ceil(n_sequencers / 10)):
+        sequencers, n_pages = db.sequencers.find(page=page, limit=10, sort_by="id")
+        assert n_pages == math.ceil(n_sequencers / 10)
+        pages.append([sequencer.id for sequencer in sequencers])
+    assert sum(pages, []) == expected
+
+    # an estimate that overshoots: a page past the end returns the actual last page and page count
+    count_for_pages = db.sequencers._count_for_pages
+    db.sequencers._count_for_pages = lambda query, exact=False: count_for_pages(query, exact) if exact else (100 * n_sequencers, False)  # type: ignore
+    try:
+        sequencers, n_pages = db.sequencers.find(page=50, limit=10, sort_by="id")
+    finally:
+        del db.sequencers._count_for_pages
+    assert n_pages == len(pages)
+    assert [sequencer.id for sequencer in sequencers] == pages[-1]
@@ -173,3 +173,51 @@ def test_experiment_link(db: DBHandler):
     db.refresh(experiment)
     assert len(experiment.pools) == 0
     assert len(experiment.libraries) == 0
+
+
+def test_library_keyset_pagination(db: DBHandler):
+    user = create_user(db)
+    seq_request = create_seq_request(db, user)
+    for _ in range(25):
+        create_library(db, user, seq_request)
+
+    expected = [library.id for library in db.libraries.find(limit=None, sort_by="status_id", descending=True)[0]]
+
+    # walk forward with cursors, then back
+    page, cursor, pages = 0, None, []
+    while True:
+        libraries, n_pages = db.libraries.find(page=page, cursor=cursor, limit=10, sort_by="status_id", descending=True)
+        assert n_pages == 3
+        pages.append([library.id for library in libraries])
+        if (cursor := libraries.next_cursor) is None:  # type: ignore
+            break
+        page += 1
+    assert sum(pages, []) == expected
+
+    while (cursor := libraries.prev_cursor) is not None:  # type: ignore
+        page -= 1
+        libraries, _ = db.libraries.find(page=page, cursor=cursor, limit=10, sort_by="status_id", descending=True)
+        assert [library.id for library in libraries] == pages[page]
+
+    # a cursor for another page falls back to OFFSET, pages past the end are clamped
+    stale_cursor = libraries.next_cursor  # type: ignore
+    libraries, _ = db.libraries.find(page=2, cursor=stale_cursor, limit=10, sort_by="status_id", descending=True)
+    assert [library.id for library in libraries] == pages[2]
+    libraries, _ = db.libraries.find(page=7, limit=10, sort_by="status_id", descending=True)
+    assert [library.id for library in libraries] == pages[2]
+
+
+def test_library_fuzzy_search(db: DBHandler):
+    user = create_user(db)
+    seq_request = create_seq_request(db, user)
+    for _ in range(5):
+        create_library(db, user, seq_request)
+    library = create_library(db, user, seq_request)
+    library.name = "Liver_Organoid_ATAC_03"
+    db.libraries.update(library)
+    db.flush()
+
+    libraries, _ = db.libraries.find(name="organoid atac", page=0)
+    assert [lib.id for lib in libraries] == [library.id]
+    assert db.libraries.query(name="LIVER")[0].id == library.id
+    assert db.libraries.find(name="xyzzy", page=0)[0] == []
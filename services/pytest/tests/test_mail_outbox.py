@@ -0,0 +1,164 @@
+import json
+import time
+import socket
+
+import pytest
+import fakeredis
+import sqlalchemy as sa
+from aiosmtpd.controller import Controller
+
+from opengsync_db import DBHandler, models
+from opengsync_db.categories import DeliveryStatus
+from opengsync_worker.tasks.mail_outbox import MailOutbox, SMTPConfig, send_mail_outbox
+
+from .create_units import create_user, create_seq_request
+
+
+class Handler:
+    """ Accepts recipients by local part: 'retry*' -> 451, 'refused*' -> 550. `data_code` answers DATA. """
+    def __init__(self):
+        self.data_code = 250
+        self.received: list[list[str]] = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("retry"):
+            return "451 Try again later"
+        if address.startswith("refused"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.data_code == 451:
+            return "451 Try again later"
+        if self.data_code == 554:
+            return "554 Rejected"
+        self.received.append(list(envelope.rcpt_tos))
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield handler, SMTPConfig(server=controller.hostname, port=controller.port, user="", password="", use_tls=False)
+    controller.stop()
+
+
+def enqueue(outbox: MailOutbox, seq_request: models.SeqRequest, recipients: list[str], attempts: int = 0) -> str:
+    message_id = f"{seq_request.id}-{time.time_ns()}"
+    message = {
+        "id": message_id,
+        "sender": "sender@example.com",
+        "recipients": recipients,
+        "subject": "Data delivery",
+        "body": "body",
+        "mime_type": "plain",
+        "delivery_links": [[seq_request.id, email] for email in recipients],
+        "attempts": attempts,
+        "created": time.time(),
+    }
+    outbox.r.hset(MailOutbox.MESSAGES_KEY, message_id, json.dumps(message))
+    outbox.r.zadd(MailOutbox.QUEUE_KEY, {message_id: time.time()})
+    return message_id
+
+
+def statuses(db: DBHandler, seq_request: models.SeqRequest) -> dict[str, DeliveryStatus]:
+    link = models.links.SeqRequestDeliveryEmailLink
+    rows = db.execute(sa.select(link.email, link.status_id).where(link.seq_request_id == seq_request.id))
+    return {email: DeliveryStatus.get(status_id) for email, status_id in rows}
+
+
+def setup_request(db: DBHandler, recipients: list[str]) -> models.SeqRequest:
+    seq_request = create_seq_request(db, create_user(db))
+    for email in recipients:
+        db.seq_requests.add_share_email(seq_request.id, email)
+    db.flush()
+    return seq_request
+
+
+def test_send(db: DBHandler, smtp):
+    handler, config = smtp
+    outbox = MailOutbox(fakeredis.FakeRedis())
+    recipients = ["a@example.com", "refused@example.com"]
+    seq_request = setup_request(db, recipients)
+    enqueue(outbox, seq_request, recipients)
+
+    assert send_mail_outbox(db, outbox, config) == 1
+    assert handler.received == [["a@example.com"]]
+    assert statuses(db, seq_request) == {
+        "a@example.com": DeliveryStatus.DISPATCHED,
+        "refused@example.com": DeliveryStatus.FAILED,
+    }
+    assert outbox.r.zcard(MailOutbox.QUEUE_KEY) == 0
+    assert outbox.r.hlen(MailOutbox.MESSAGES_KEY) == 0
+
+
+def test_retry_4xx(db: DBHandler, smtp):
+    handler, config = smtp
+    outbox = MailOutbox(fakeredis.FakeRedis())
+    seq_request = setup_request(db, ["retry@example.com"])
+    message_id = enqueue(outbox, seq_request, ["retry@example.com"])
+
+    assert send_mail_outbox(db, outbox, config) == 0
+    assert statuses(db, seq_request) == {"retry@example.com": DeliveryStatus.PENDING}
+    assert outbox.r.zscore(MailOutbox.QUEUE_KEY, message_id) > time.time()
+    assert json.loads(outbox.r.hget(MailOutbox.MESSAGES_KEY, message_id))["attempts"] == 1  # type: ignore
+
+    # not due until the backoff has passed
+    assert outbox.due(10) == []
+
+    # 4xx on DATA is retried as well
+    handler.data_code = 451
+    seq_request = setup_request(db, ["b@example.com"])
+    message_id = enqueue(outbox, seq_request, ["b@example.com"])
+    assert send_mail_outbox(db, outbox, config) == 0
+    assert statuses(db, seq_request) == {"b@example.com": DeliveryStatus.PENDING}
+    assert outbox.r.zscore(MailOutbox.QUEUE_KEY, message_id) > time.time()
+
+
+def test_fail_5xx(db: DBHandler, smtp):
+    handler, config = smtp
+    handler.data_code = 554
+    outbox = MailOutbox(fakeredis.FakeRedis())
+    seq_request = setup_request(db, ["a@example.com"])
+    enqueue(outbox, seq_request, ["a@example.com"])
+
+    assert send_mail_outbox(db, outbox, config) == 0
+    assert handler.received == []
+    assert statuses(db, seq_request) == {"a@example.com": DeliveryStatus.FAILED}
+    assert outbox.r.zcard(MailOutbox.QUEUE_KEY) == 0
+    assert outbox.r.llen(MailOutbox.FAILED_KEY) == 1
+
+
+def test_retries_exhausted(db: DBHandler, smtp):
+    _, config = smtp
+    outbox = MailOutbox(fakeredis.FakeRedis())
+    seq_request = setup_request(db, ["retry@example.com"])
+    enqueue(outbox, seq_request, ["retry@example.com"], attempts=MailOutbox.MAX_ATTEMPTS - 1)
+
+    assert send_mail_outbox(db, outbox, config) == 0
+    assert statuses(db, seq_request) == {"retry@example.com": DeliveryStatus.FAILED}
+    assert outbox.r.zcard(MailOutbox.QUEUE_KEY) == 0
+    assert outbox.r.hlen(MailOutbox.MESSAGES_KEY) == 0
+    failed = json.loads(outbox.r.lindex(MailOutbox.FAILED_KEY, 0))  # type: ignore
+    assert failed["attempts"] == MailOutbox.MAX_ATTEMPTS
+
+
+def test_connection_error_retries_exhausted(db: DBHandler):
+    outbox = MailOutbox(fakeredis.FakeRedis())
+    seq_request = setup_request(db, ["a@example.com"])
+    enqueue(outbox, seq_request, ["a@example.com"], attempts=MailOutbox.MAX_ATTEMPTS - 1)
+
+    # nothing listens on the port
+    config = SMTPConfig(server="127.0.0.1", port=free_port(), user="", password="", use_tls=False)
+    assert send_mail_outbox(db, outbox, config) == 0
+    assert statuses(db, seq_request) == {"a@example.com": DeliveryStatus.FAILED}
+    assert outbox.r.llen(MailOutbox.FAILED_KEY) == 1
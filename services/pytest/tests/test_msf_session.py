@@ -0,0 +1,154 @@
+import io
+import json
+
+import pytest
+import fakeredis
+import pandas as pd
+import pyarrow as pa
+from pyarrow import parquet as pq
+
+from opengsync_server.tools.RedisMSFFileCache import RedisMSFFileCache
+from opengsync_server.tools.MSFSession import MSFSession
+
+
+@pytest.fixture
+def cache() -> RedisMSFFileCache:
+    cache = RedisMSFFileCache()
+    cache.r = fakeredis.FakeStrictRedis()
+    return cache
+
+
+def keys(cache: RedisMSFFileCache) -> set[str]:
+    return {key.decode("utf-8") for key in cache.redis.keys("*")}
+
+
+def members(cache: RedisMSFFileCache, key: str) -> set[str]:
+    return {member.decode("utf-8") for member in cache.redis.smembers(key)}
+
+
+def test_msf_session_index(cache: RedisMSFFileCache):
+    session = MSFSession(cache, "wf", "1")
+    session.set_steps(["a"])
+    session.set_dict(session.dict_key("a", "header"), {"x": 1})
+    session.set_table(session.table_key("a", "library_table"), pd.DataFrame({"x": [1, 2]}))
+    assert keys(cache) == set()  # buffered until flush
+    session.flush()
+
+    assert members(cache, session.index_key) == {session.steps_key, session.dict_key("a", "header")}
+    assert set(cache.redis.hkeys(session.tables_key)) == {session.table_key("a", "library_table").encode()}
+
+    session = MSFSession(cache, "wf", "1")
+    assert session.steps == ["a"]
+    assert session.get_dict(session.dict_key("a", "header")) == {"x": 1}
+    assert session.get_table(session.table_key("a", "library_table"))["x"].tolist() == [1, 2]  # type: ignore
+    assert session.table_names("a") == ["library_table"]
+    assert session.get_table(session.table_key("a", "missing")) is None
+
+    session.delete_step("a")
+    session.flush()
+    assert keys(cache) == {session.steps_key, session.index_key}
+
+    session.delete_all()
+    session.flush()
+    assert keys(cache) == set()
+
+
+def test_msf_session_table_only_no_scan(cache: RedisMSFFileCache, monkeypatch: pytest.MonkeyPatch):
+    session = MSFSession(cache, "wf", "1")
+    session.set_steps(["a"])
+    session.flush()
+    session = MSFSession(cache, "wf", "1")
+    session.set_table(session.table_key("a", "t"), pd.DataFrame({"x": [1]}))
+    session.flush()
+
+    def scan_iter(*args, **kwargs):
+        raise AssertionError("unexpected SCAN")
+
+    monkeypatch.setattr(cache.redis, "scan_iter", scan_iter)
+    session = MSFSession(cache, "wf", "1")
+    assert session.table_names("a") == ["t"]
+
+
+def test_msf_session_dedup(cache: RedisMSFFileCache):
+    table = pd.DataFrame({"x": [1, 2, 3]})
+    session = MSFSession(cache, "wf", "1")
+    session.set_steps(["a", "b"])
+    session.set_table(session.table_key("a", "t"), table)
+    session.flush()
+
+    # carried forward unchanged: same blob
+    session = MSFSession(cache, "wf", "1")
+    session.set_table(session.table_key("b", "t"), session.get_table(session.table_key("a", "t")))  # type: ignore
+    session.flush()
+    tables = cache.redis.hgetall(session.tables_key)
+    assert len(tables) == 2
+    assert len(set(tables.values())) == 1
+    assert len([key for key in keys(cache) if ":blobs:" in key]) == 1
+
+    # changed in one step: the other keeps the blob
+    session = MSFSession(cache, "wf", "1")
+    session.set_table(session.table_key("b", "t"), pd.DataFrame({"x": [4]}))
+    session.flush()
+    assert len([key for key in keys(cache) if ":blobs:" in key]) == 2
+
+    # removing the last reference deletes the blob
+    session = MSFSession(cache, "wf", "1")
+    session.delete_step("b")
+    session.flush()
+    assert len([key for key in keys(cache) if ":blobs:" in key]) == 1
+    assert MSFSession(cache, "wf", "1").get_table(session.table_key("a", "t"))["x"].tolist() == [1, 2, 3]  # type: ignore
+
+
+def write_parquet(cache: RedisMSFFileCache, key: str, table: pd.DataFrame) -> None:
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(table), buffer)
+    cache.redis.set(key, buffer.getvalue())
+
+
+def test_msf_session_legacy(cache: RedisMSFFileCache):
+    # written before the index and the table map existed
+    legacy = MSFSession(cache, "wf", "1")
+    cache.redis.set(legacy.steps_key, json.dumps(["a", "b"]))
+    cache.redis.set(legacy.dict_key("a", "header"), json.dumps({"x": 1}))
+    write_parquet(cache, legacy.table_key("a", "t"), pd.DataFrame({"x": [1, 2]}))
+    write_parquet(cache, legacy.table_key("b", "u"), pd.DataFrame({"y": [3]}))
+
+    session = MSFSession(cache, "wf", "1")
+    assert session.get_dict(session.dict_key("a", "header")) == {"x": 1}
+    assert session.get_table(session.table_key("a", "t"))["x"].tolist() == [1, 2]  # type: ignore
+    assert session.table_names("b") == ["u"]
+
+    # the rebuilt index and the table mapping are persisted
+    assert members(cache, session.index_key) == {session.steps_key, session.dict_key("a", "header")}
+    assert {key.decode(): blob.decode() for key, blob in cache.redis.hgetall(session.tables_key).items()} == {
+        session.table_key("a", "t"): session.table_key("a", "t"),
+        session.table_key("b", "u"): session.table_key("b", "u"),
+    }
+
+    # overwriting a legacy table moves it to a blob
+    session.set_table(session.table_key("b", "u"), pd.DataFrame({"y": [4]}))
+    session.flush()
+    assert session.table_key("b", "u") not in keys(cache)
+    assert MSFSession(cache, "wf", "1").get_table(session.table_key("b", "u"))["y"].tolist() == [4]  # type: ignore
+
+    session = MSFSession(cache, "wf", "1")
+    session.delete_all()
+    session.flush()
+    assert keys(cache) == set()
+
+
+def test_msf_session_legacy_index(cache: RedisMSFFileCache):
+    # index written before the table map existed, tables are in the index
+    legacy = MSFSession(cache, "wf", "1")
+    cache.redis.set(legacy.steps_key, json.dumps(["a"]))
+    write_parquet(cache, legacy.table_key("a", "t"), pd.DataFrame({"x": [1]}))
+    cache.redis.sadd(legacy.index_key, legacy.table_key("a", "t"))
+
+    session = MSFSession(cache, "wf", "1")
+    assert session.table_names("a") == ["t"]
+    assert members(cache, session.index_key) == {session.steps_key}
+    assert cache.redis.hget(session.tables_key, session.table_key("a", "t")) == session.table_key("a", "t").encode()
+
+    session.delete_all()
+    session.flush()
+    assert keys(cache) == set()
@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+
+from opengsync_db import DBHandler
+from opengsync_worker.tasks.rf_scanner import process_run_folder, RunFolderIndex
+
+
+def touch_folder(path: Path) -> None:
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_rf_scanner_skips_unchanged_folders(db: DBHandler, tmp_path: Path):
+    run_folder = tmp_path / "240101_A00000_0001_AHXXXXXXXX"
+    run_folder.mkdir()
+    (run_folder / "RunParameters.xml").write_text("<RunParameters></RunParameters>")
+    index = RunFolderIndex()
+
+    # no RunInfo.xml: parsed, but it does not become a tracked run
+    assert process_run_folder(tmp_path, db, index=index) == 1
+    assert len(db.seq_runs.find(limit=None)[0]) == 0
+    assert run_folder.name in index.get_untracked()
+
+    # unchanged folder is not parsed again
+    assert process_run_folder(tmp_path, db, index=index) == 0
+
+    # files outside of the fingerprint change the folder mtime
+    (run_folder / "RunInfo.xml").write_text("<RunInfo></RunInfo>")
+    touch_folder(run_folder)
+    assert process_run_folder(tmp_path, db, index=index) == 1
+    assert process_run_folder(tmp_path, db, index=index) == 0
+
+    # fingerprint change
+    (run_folder / "RunParameters.xml").write_text("<RunParameters><RunId>1</RunId></RunParameters>")
+    assert process_run_folder(tmp_path, db, index=index) == 1
+
+    # change notifications re-parse regardless of the index
+    assert process_run_folder(tmp_path, db, index=index, changed=[run_folder.name]) == 1
+
+    # removed folders are pruned from the index
+    for path in run_folder.iterdir():
+        path.unlink()
+    run_folder.rmdir()
+    assert process_run_folder(tmp_path, db, index=index) == 0
+    assert index.get_all() == {}
+    assert index.get_untracked() == {}
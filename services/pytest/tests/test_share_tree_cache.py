@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+import fakeredis
+
+from opengsync_server.core.ShareTreeCache import ShareTreeCache
+from opengsync_server.tools.SharedFileBrowser import SharedFileBrowser
+
+
+@pytest.fixture
+def cache() -> ShareTreeCache:
+    cache = ShareTreeCache()
+    cache.r = fakeredis.FakeStrictRedis(decode_responses=True)
+    return cache
+
+
+def tree(cache: ShareTreeCache, root_dir: Path, shared_path: str) -> dict[str, int]:
+    browser = SharedFileBrowser(root_dir, db=None, share_token=None, shared_paths=[shared_path])  # type: ignore[arg-type]
+    return {entry.rel_path: entry.st_size for entry in cache.get_tree(browser)}
+
+
+def test_share_tree_revalidation(cache: ShareTreeCache, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    (tmp_path / "data" / "run" / "sub").mkdir(parents=True)
+    (tmp_path / "data" / "run" / "a.txt").write_text("a")
+
+    walks = []
+    walk = cache._walk
+    monkeypatch.setattr(cache, "_walk", lambda browser, subpath: walks.append(subpath) or walk(browser, subpath))
+
+    assert tree(cache, tmp_path, "data/run").keys() == {"data", "data/run", "data/run/a.txt", "data/run/sub"}
+    assert len(walks) == 1
+
+    # unchanged directories: the snapshot is used
+    tree(cache, tmp_path, "data/run")
+    assert len(walks) == 1
+
+    # files added or removed outside of the app change the directory mtime
+    (tmp_path / "data" / "run" / "sub" / "b.txt").write_text("bb")
+    assert tree(cache, tmp_path, "data/run")["data/run/sub/b.txt"] == 2
+    assert len(walks) == 2
+
+    (tmp_path / "data" / "run" / "a.txt").unlink()
+    assert "data/run/a.txt" not in tree(cache, tmp_path, "data/run")
+    assert len(walks) == 3
+
+    # add_path updates the snapshot and the mtimes of the parent directories
+    (tmp_path / "data" / "run" / "sub" / "c.txt").write_text("ccc")
+    cache.add_path(tmp_path, None, "data/run/sub/c.txt")  # type: ignore[arg-type]
+    assert len(walks) == 4
+    assert tree(cache, tmp_path, "data/run")["data/run/sub/c.txt"] == 3
+    assert len(walks) == 4
@@ -0,0 +1,119 @@
+import sqlalchemy as sa
+
+from opengsync_db import DBHandler, models
+from opengsync_db.categories import (
+    ExperimentStatus, ExperimentWorkFlow, LibraryStatus, PoolStatus, ProjectStatus, ReadType, RunStatus,
+    SampleStatus, SeqRequestStatus
+)
+from opengsync_worker.tasks.status_updater import PHASES, update_statuses
+
+from .create_units import (
+    create_user, create_project, create_seq_request, create_sample, create_library, create_pool, create_experiment
+)
+
+
+def set_values(db: DBHandler, obj, **values) -> None:
+    model = type(obj)
+    db.execute(sa.update(model).where(model.id == obj.id).values(**values))
+
+
+def status(db: DBHandler, obj) -> int:
+    model = type(obj)
+    return db.execute(sa.select(model.status_id).where(model.id == obj.id)).scalar_one()
+
+
+def create_run(db: DBHandler, experiment: models.Experiment, run_status: RunStatus) -> models.SeqRun:
+    return db.seq_runs.create(
+        experiment_name=experiment.name, status=run_status, instrument_name="instrument",
+        run_folder=f"run_{experiment.name}", flowcell_id=f"FC{experiment.id}", read_type=ReadType.PAIRED_END,
+        r1_cycles=1, i1_cycles=1, r2_cycles=1, i2_cycles=1,
+    )
+
+
+def test_update_statuses(db: DBHandler):
+    user = create_user(db)
+
+    # experiments follow their runs
+    running = create_experiment(db, user, ExperimentWorkFlow.NOVASEQ_6K_S4_XP)
+    create_run(db, running, RunStatus.RUNNING)
+    finished = create_experiment(db, user, ExperimentWorkFlow.NOVASEQ_6K_S4_XP)
+    set_values(db, finished, status_id=ExperimentStatus.LOADED.id)
+    create_run(db, finished, RunStatus.FINISHED)
+    archived = create_experiment(db, user, ExperimentWorkFlow.NOVASEQ_6K_S4_XP)
+    set_values(db, archived, status_id=ExperimentStatus.SEQUENCING.id)
+    create_run(db, archived, RunStatus.ARCHIVED)
+    no_run = create_experiment(db, user, ExperimentWorkFlow.NOVASEQ_6K_S4_XP)
+
+    # sequenced on the finished experiment: library -> sample -> pool -> request -> project, each phase
+    # depends on the updates of the previous ones
+    project = create_project(db, user)
+    set_values(db, project, status_id=ProjectStatus.PROCESSING.id)
+    sequenced_request = create_seq_request(db, user)
+    set_values(db, sequenced_request, status_id=SeqRequestStatus.ACCEPTED.id)
+    pool = create_pool(db, user, sequenced_request)
+    set_values(db, pool, status_id=PoolStatus.ACCEPTED.id, experiment_id=finished.id)
+    library = create_library(db, user, sequenced_request)
+    set_values(db, library, status_id=LibraryStatus.POOLED.id, experiment_id=finished.id, pool_id=pool.id)
+    sample = create_sample(db, user, project)
+    set_values(db, sample, status_id=SampleStatus.WAITING_DELIVERY.id)
+    db.links.link_sample_library(sample.id, library.id)
+
+    # all libraries pooled
+    pooled_request = create_seq_request(db, user)
+    set_values(db, pooled_request, status_id=SeqRequestStatus.SAMPLES_RECEIVED.id)
+    pooled_library = create_library(db, user, pooled_request)
+    set_values(db, pooled_library, status_id=LibraryStatus.POOLED.id)
+
+    # all libraries shared
+    shared_request = create_seq_request(db, user)
+    set_values(db, shared_request, status_id=SeqRequestStatus.DATA_PROCESSING.id)
+    shared_library = create_library(db, user, shared_request)
+    set_values(db, shared_library, status_id=LibraryStatus.SHARED.id)
+
+    # sample of a library that is still being prepared: nothing changes
+    waiting_project = create_project(db, user)
+    set_values(db, waiting_project, status_id=ProjectStatus.PROCESSING.id)
+    waiting_request = create_seq_request(db, user)
+    set_values(db, waiting_request, status_id=SeqRequestStatus.ACCEPTED.id)
+    waiting_library = create_library(db, user, waiting_request)
+    set_values(db, waiting_library, status_id=LibraryStatus.PREPARING.id)
+    waiting_sample = create_sample(db, user, waiting_project)
+    set_values(db, waiting_sample, status_id=SampleStatus.WAITING_DELIVERY.id)
+    db.links.link_sample_library(waiting_sample.id, waiting_library.id)
+    db.flush()
+
+    reports = update_statuses(db)
+    assert [report.name for report in reports] == [name for name, _ in PHASES]
+    assert {report.name: sorted(report.rows) for report in reports} == {
+        "running_experiments": [(running.id, ExperimentStatus.SEQUENCING.id)],
+        "finished_experiments": sorted([
+            (finished.id, ExperimentStatus.SEQUENCED.id), (archived.id, ExperimentStatus.ARCHIVED.id)
+        ]),
+        "finished_libraries": [(library.id, LibraryStatus.SEQUENCED.id)],
+        "stored_samples": [(sample.id, SampleStatus.STORED.id)],
+        "sequenced_pools": [(pool.id, PoolStatus.SEQUENCED.id)],
+        "seq_requests_with_stored_samples": [(sequenced_request.id, SeqRequestStatus.SAMPLES_RECEIVED.id)],
+        "seq_requests_with_pooled_libraries": [(pooled_request.id, SeqRequestStatus.PREPARED.id)],
+        "sequenced_seq_requests": [(sequenced_request.id, SeqRequestStatus.DATA_PROCESSING.id)],
+        "sequenced_projects": [(project.id, ProjectStatus.SEQUENCED.id)],
+        "finished_seq_requests": [(shared_request.id, SeqRequestStatus.FINISHED.id)],
+    }
+    assert all(report.seconds >= 0 for report in reports)
+
+    assert status(db, running) == ExperimentStatus.SEQUENCING.id
+    assert status(db, finished) == ExperimentStatus.SEQUENCED.id
+    assert status(db, archived) == ExperimentStatus.ARCHIVED.id
+    assert status(db, no_run) == ExperimentStatus.DRAFT.id
+    assert status(db, library) == LibraryStatus.SEQUENCED.id
+    assert status(db, sample) == SampleStatus.STORED.id
+    assert status(db, pool) == PoolStatus.SEQUENCED.id
+    assert status(db, sequenced_request) == SeqRequestStatus.DATA_PROCESSING.id
+    assert status(db, project) == ProjectStatus.SEQUENCED.id
+    assert status(db, pooled_request) == SeqRequestStatus.PREPARED.id
+    assert status(db, shared_request) == SeqRequestStatus.FINISHED.id
+    assert status(db, waiting_sample) == SampleStatus.WAITING_DELIVERY.id
+    assert status(db, waiting_request) == SeqRequestStatus.ACCEPTED.id
+    assert status(db, waiting_project) == ProjectStatus.PROCESSING.id
+
+    # a second run finds nothing to update
+    assert all(report.rows == [] for report in update_statuses(db))
@@ -0,0 +1,72 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from opengsync_server.tools import ExcelWriter, StreamingExcelWriter
+
+
+def frames() -> dict[str, pd.DataFrame]:
+    pools = pd.DataFrame({
+        "experiment_name": ["exp_a", "exp_a", "exp_b", "exp_c", "exp_c", "exp_a"],
+        "pool_name": ["pool 1", "pool 2", "a much longer pool name than the others", "pool 4", "pool 5", "pool 6"],
+        "num_m_reads": [100, 250, 80, 12, 5, 1],
+        "molarity": [1.5, np.nan, 2.25, 3.0, 0.5, 10.0],
+        "loaded": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-02-01", "2024-03-01", "2024-03-02", "2024-04-01"]),
+    })
+    # no 'experiment_name' column, no alternating fill
+    lanes = pd.DataFrame({"lane": [1, 2], "phi_x": [0.01, 0.02]})
+    return {"pools": pools, "lanes": lanes}
+
+
+def apply_styles(writer: ExcelWriter | StreamingExcelWriter) -> None:
+    writer.apply_header_style(sheet_name=None)
+    writer.apply_body_style(sheet_name=None)
+    writer.apply_column_width(sheet_name=None, max_width=30)
+    writer.apply_alternating_colors(sheet_name=None, column="experiment_name", primary_color="A4CBFA")
+
+
+def cells(data: bytes) -> dict[str, dict]:
+    wb = load_workbook(io.BytesIO(data))
+    return {
+        ws.title: {
+            "values": [[cell.value for cell in row] for row in ws.iter_rows()],
+            "fills": [[cell.fill.fgColor.rgb for cell in row] for row in ws.iter_rows()],
+            "widths": {letter: dim.width for letter, dim in ws.column_dimensions.items()},
+        }
+        for ws in wb.worksheets
+    }
+
+
+def test_streaming_excel_writer_matches_excel_writer(tmp_path: Path):
+    writer = ExcelWriter(frames())
+    apply_styles(writer)
+    expected = cells(writer.get_bytes())
+
+    streamed = StreamingExcelWriter(frames(), spool_max_size=1024)
+    apply_styles(streamed)
+    result = cells(streamed.get_bytes())
+
+    assert result.keys() == expected.keys()
+    for sheet_name in expected.keys():
+        assert result[sheet_name]["values"] == expected[sheet_name]["values"]
+        assert result[sheet_name]["fills"] == expected[sheet_name]["fills"]
+        assert result[sheet_name]["widths"] == expected[sheet_name]["widths"]
+
+    fills = [row[1] for row in result["pools"]["fills"][1:]]
+    assert fills == ["00A4CBFA", "00A4CBFA", "00FFFFFF", "00A4CBFA", "00A4CBFA", "00FFFFFF"]
+    assert result["pools"]["widths"]["C"] == 30
+
+    # streamed in chunks, spooled to disk above spool_max_size
+    data = streamed.get_bytes()
+    assert streamed._file._rolled  # type: ignore[union-attr]
+    assert streamed.size == len(data)
+    assert b"".join(streamed.iter_bytes(chunk_size=1000)) == data
+
+    path = tmp_path / "export.xlsx"
+    writer = StreamingExcelWriter(frames())
+    apply_styles(writer)
+    writer.save_xlsx(path.as_posix())
+    assert cells(path.read_bytes())["lanes"] == result["lanes"]
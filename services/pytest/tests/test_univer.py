@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+from opengsync_server.tools import univer
+
+
+def test_univer_snapshot_rows(tmp_path: Path):
+    path = (tmp_path / "table.xlsx").as_posix()
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "a"  # type: ignore
+    for i in range(1200):
+        ws.append([i, f"row {i}"])  # type: ignore
+    wb.create_sheet("b").append(["x"])
+    wb.save(path)
+
+    res = univer.xlsx_to_univer_snapshot(path, window=100)
+    assert res["rows"] == {"a": 1200, "b": 1}
+    assert res["data"]["sheetOrder"] == ["a", "b"]
+    cells = res["data"]["sheets"]["a"]["cellData"]
+    assert list(cells) == [str(i) for i in range(100)]
+    assert cells["99"]["1"]["v"] == "row 99"
+    assert res["data"]["sheets"]["b"]["cellData"] == {}
+
+    # stored snapshot is reused until the file changes
+    assert univer.xlsx_to_univer_snapshot(path)["key"] == res["key"]
+
+    # windows are clamped to the sheet
+    rows = json.loads(univer.read_rows(path, res["key"], 0, 1150, 1300))
+    assert list(rows) == [str(i) for i in range(1150, 1200)]
+    assert rows["1199"]["0"]["v"] == "1199"
+    assert json.loads(univer.read_rows(path, res["key"], 0, 5, 5)) == {}
+    assert json.loads(univer.read_rows(path, res["key"], 1, 0, 10))["0"]["0"]["v"] == "x"
+
+    with pytest.raises(ValueError):
+        univer.read_rows(path, res["key"], 0, 10, 5)
+    with pytest.raises(ValueError):
+        univer.read_rows(path, "../../etc", 0, 0, 10)
+    with pytest.raises(FileNotFoundError):
+        univer.read_rows(path, res["key"], 2, 0, 10)
+
+    wb.create_sheet("c")
+    wb.save(path)
+    key = univer.xlsx_to_univer_snapshot(path)["key"]
+    assert key != res["key"]
+    with pytest.raises(FileNotFoundError):
+        univer.read_rows(path, res["key"], 0, 0, 10)
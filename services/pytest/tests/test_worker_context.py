@@ -0,0 +1,76 @@
+import json
+import time
+
+import pytest
+import fakeredis
+
+from opengsync_worker.tasks.worker_context import WorkerContext
+
+
+@pytest.fixture
+def context() -> WorkerContext:
+    context = WorkerContext({})
+    context.r = fakeredis.FakeRedis()
+    return context
+
+
+def metrics(context: WorkerContext, task: str) -> list[dict]:
+    return [json.loads(data) for data in context.r.lrange(WorkerContext.METRICS_KEY.format(task=task), 0, -1)]  # type: ignore
+
+
+def test_worker_context_metrics(context: WorkerContext, monkeypatch: pytest.MonkeyPatch):
+    assert context.run("task", lambda _: 42, use_db=False).rows == 42
+    assert context.run("task", lambda _: True, use_db=False).rows is None
+
+    def fail(_):
+        raise ValueError("boom")
+
+    result = context.run("task", fail, use_db=False)
+    assert result.status == "error"
+    assert result.error == "ValueError: boom"
+
+    recorded = metrics(context, "task")
+    assert [m["status"] for m in recorded] == ["error", "ok", "ok"]    # newest first
+    assert [m["rows"] for m in recorded] == [None, None, 42]
+    assert all(m["duration_seconds"] >= 0 for m in recorded)
+
+    monkeypatch.setattr(WorkerContext, "MAX_METRICS", 3)
+    context.run("task", lambda _: 1, use_db=False)
+    assert [m["rows"] for m in metrics(context, "task")] == [1, None, None]
+
+
+def test_worker_context_lock(context: WorkerContext):
+    key = WorkerContext.LOCK_KEY.format(task="task")
+    nested = []
+
+    def task(_):
+        assert context.r.exists(key)
+        nested.append(context.run("task", lambda _: 1, use_db=False))
+        # other tasks are not blocked
+        nested.append(context.run("other", lambda _: 2, use_db=False))
+
+    assert context.run("task", task, use_db=False).status == "ok"
+    assert [m.status for m in nested] == ["skipped", "ok"]
+    assert not context.r.exists(key)
+    assert [m["status"] for m in metrics(context, "task")] == ["ok", "skipped"]
+
+    # without a timeout the task is not locked
+    def unlocked(_):
+        assert not context.r.exists(key)
+
+    assert context.run("task", unlocked, lock_timeout_seconds=None, use_db=False).status == "ok"
+
+
+def test_worker_context_lock_renewal(context: WorkerContext):
+    key = WorkerContext.LOCK_KEY.format(task="task")
+
+    def task(_):
+        # runs for longer than the lock timeout
+        time.sleep(2.5)
+        assert context.r.exists(key)
+        return context.run("task", lambda _: 1, use_db=False).status
+
+    result = context.run("task", task, lock_timeout_seconds=1, use_db=False)
+    assert result.status == "ok"
+    assert [m["status"] for m in metrics(context, "task")] == ["ok", "skipped"]
+    assert not context.r.exists(key)
@@ -0,0 +1,107 @@
+import io
+import zlib
+import zipfile
+from pathlib import Path
+
+from opengsync_server.tools.ZipArchive import ZipArchive, ZIP32_LIMIT
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, *keys: str) -> list:
+        return [self.data.get(key) for key in keys]
+
+    def set_many(self, mapping: dict, timeout: int | None = None) -> None:
+        self.data.update(mapping)
+
+
+class ArchiveReader(io.RawIOBase):
+    """ seekable file over ZipArchive.iter_bytes, only the requested ranges are produced """
+    def __init__(self, archive: ZipArchive):
+        self.archive = archive
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self.pos = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.archive.size}[whence] + offset
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def readinto(self, buffer) -> int:
+        data = b"".join(self.archive.iter_bytes(self.pos, self.pos + len(buffer)))
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+
+def test_zip_archive_roundtrip(tmp_path: Path):
+    contents = {
+        "a.txt": b"hello",
+        "empty": b"",
+        "sub/über.bin": bytes(range(256)) * 5000,
+    }
+    files = []
+    for arcname, data in contents.items():
+        (path := tmp_path / arcname.replace("/", "_")).write_bytes(data)
+        files.append((path, arcname))
+    files.append((tmp_path / "missing", "missing"))
+
+    cache = DictCache()
+    archive = ZipArchive(files, crc_cache=cache)
+    data = b"".join(archive.iter_bytes())
+    assert len(data) == archive.size
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.namelist() == list(contents.keys())
+        assert zf.testzip() is None
+        for arcname, content in contents.items():
+            assert zf.read(arcname) == content
+            assert zf.getinfo(arcname).CRC == zlib.crc32(content)
+            assert zf.getinfo(arcname).file_size == len(content)
+
+    # crcs computed while streaming are cached
+    assert sorted(cache.data.values()) == sorted(zlib.crc32(content) for content in contents.values())
+
+    # ranges, including ones that start inside member data, use the cached crcs
+    archive = ZipArchive(files, crc_cache=cache)
+    cuts = [0, 7, 40, 1000, archive.size - 30, archive.size]
+    assert b"".join(b"".join(archive.iter_bytes(lo, hi)) for lo, hi in zip(cuts, cuts[1:])) == data
+    assert archive.etag == ZipArchive(files).etag
+
+
+def test_zip_archive_zip64(tmp_path: Path):
+    # sparse file above the zip32 limit, its crc is taken from the cache instead of reading 4 GiB
+    big = tmp_path / "big"
+    with open(big, "wb") as f:
+        f.truncate(ZIP32_LIMIT + 1)
+    small = tmp_path / "small"
+    small.write_bytes(b"after the large member")
+
+    cache = DictCache()
+    archive = ZipArchive([(big, "big"), (small, "small")], crc_cache=cache)
+    big_member, small_member = archive.members
+    assert big_member.zip64
+    assert small_member.offset > ZIP32_LIMIT
+    cache.data[big_member.cache_key] = 0x12345678
+
+    with zipfile.ZipFile(ArchiveReader(archive)) as zf:
+        assert zf.namelist() == ["big", "small"]
+        info = zf.getinfo("big")
+        assert info.file_size == ZIP32_LIMIT + 1
+        assert info.CRC == 0x12345678
+        # the local header of the second member is beyond 4 GiB, read and crc checked by zipfile
+        assert zf.read("small") == b"after the large member"
+        assert zf.getinfo("small").CRC == zlib.crc32(b"after the large member")
+        assert zf.getinfo("small").header_offset == small_member.offset
+
+    # a range inside the large member
+    assert b"".join(archive.iter_bytes(ZIP32_LIMIT - 10, ZIP32_LIMIT + 10)) == bytes(20)